@@ -0,0 +1,97 @@
+"""
+Benchmark for webhook signature verification on large payloads
+
+Compares, for a payload arriving in ASGI-sized chunks:
+  * buffering the whole body, then verify_webhook_signature() with the
+    secret encoded on every call (previous behaviour)
+  * a WebhookSignatureVerifier fed chunk by chunk as the body streams in
+
+Reports throughput and the peak memory allocated while verifying.
+
+Usage:
+    python benchmarks/bench_hmac.py [--size-mb 5] [--chunk-kb 64] [--iterations N]
+"""
+import argparse
+import hashlib
+import hmac
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+SECRET = "benchmark-webhook-secret"
+
+
+def make_chunks(size: int, chunk_size: int) -> list[bytes]:
+    """A JSON-ish payload split like an ASGI server would deliver it"""
+    payload = b'{"action":"synchronize","data":"' + os.urandom(size // 2).hex().encode() + b'"}'
+    return [payload[i:i + chunk_size] for i in range(0, len(payload), chunk_size)]
+
+
+def verify_buffered(chunks: list[bytes], signature: str) -> bool:
+    from mercur_e.security import verify_webhook_signature
+
+    body = b"".join(chunks)
+    return verify_webhook_signature(body, signature, SECRET)
+
+
+def verify_streaming(verifier, chunks: list[bytes], signature: str) -> bool:
+    check = verifier.start(signature)
+    for chunk in chunks:
+        check.update(chunk)
+    return check.verify()
+
+
+def measure(name: str, func, size: int, iterations: int) -> None:
+    assert func(), f"{name} rejected a valid signature"
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    throughput = size * iterations / elapsed / 1024 / 1024
+    per_call = elapsed / iterations * 1000
+    print(
+        f"{name:<34} {per_call:>8.2f} ms/payload  {throughput:>8.0f} MB/s  "
+        f"peak {peak / 1024:>8.1f} KiB"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('--size-mb', type=float, default=5.0)
+    parser.add_argument('--chunk-kb', type=int, default=64)
+    parser.add_argument('--iterations', type=int, default=50)
+    args = parser.parse_args()
+
+    from mercur_e.security import WebhookSignatureVerifier
+
+    chunks = make_chunks(int(args.size_mb * 1024 * 1024), args.chunk_kb * 1024)
+    size = sum(len(chunk) for chunk in chunks)
+    signature = "sha256=" + hmac.new(SECRET.encode(), b"".join(chunks), hashlib.sha256).hexdigest()
+    verifier = WebhookSignatureVerifier(SECRET)
+
+    print(f"Signature verification, {size / 1024 / 1024:.1f} MB payload in "
+          f"{len(chunks)} chunks, {args.iterations} iterations\n")
+    measure(
+        "Buffered body, key per call",
+        lambda: verify_buffered(chunks, signature),
+        size,
+        args.iterations,
+    )
+    measure("Streaming, pre-keyed verifier", lambda: verify_streaming(verifier, chunks, signature),
+            size, args.iterations)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Micro-benchmark for GitHub App JWT generation
+
+Compares the per-call cost of:
+  * signing from the PEM string on every call (previous behaviour)
+  * signing with a pre-loaded RSA key object
+  * GitHubAppAuth.generate_jwt(), which reuses the signed token
+
+Usage:
+    python benchmarks/bench_jwt.py [--iterations N]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import timeit
+
+import jwt
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+
+def make_private_key_pem() -> str:
+    """Generate a throwaway 2048-bit RSA key like the ones GitHub issues"""
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    return key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.TraditionalOpenSSL,
+        serialization.NoEncryption()
+    ).decode('utf-8')
+
+
+def report(name: str, seconds: float, iterations: int) -> None:
+    per_call = seconds / iterations * 1_000_000
+    print(f"{name:<32} {per_call:>10.1f} µs/call  ({iterations / seconds:>10.0f} calls/s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('--iterations', type=int, default=200)
+    args = parser.parse_args()
+
+    pem = make_private_key_pem()
+    with tempfile.NamedTemporaryFile('w', suffix='.pem', delete=False) as f:
+        f.write(pem)
+        key_path = f.name
+
+    try:
+        from mercur_e.config import settings
+        settings.github_app_id = 123456
+        settings.github_app_private_key_path = key_path
+
+        from mercur_e.github_auth import GitHubAppAuth
+        auth = GitHubAppAuth()
+        key = auth.private_key
+
+        def sign_with_pem():
+            now = int(time.time())
+            jwt.encode({'iat': now, 'exp': now + 600, 'iss': 123456}, pem, algorithm='RS256')
+
+        def sign_with_key_object():
+            now = int(time.time())
+            jwt.encode({'iat': now, 'exp': now + 600, 'iss': 123456}, key, algorithm='RS256')
+
+        n = args.iterations
+        print(f"JWT generation, {n} iterations\n")
+        report("PEM string, signed per call", timeit.timeit(sign_with_pem, number=n), n)
+        report("Key object, signed per call", timeit.timeit(sign_with_key_object, number=n), n)
+        report("generate_jwt() (cached)", timeit.timeit(auth.generate_jwt, number=n * 100), n * 100)
+    finally:
+        os.unlink(key_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,669 @@
+"""
+End-to-end webhook ingestion benchmark
+
+Replays a corpus of signed webhook deliveries (issue_comment commands,
+pull_request and push events, from a couple of KB up to several MB)
+against the FastAPI app in-process, with its lifespan, queue and workers
+running. api.github.com is replaced by a local stub with configurable
+latency and rate-limit headers, so results do not depend on the network.
+
+Reports, per payload class:
+  * /webhook ingest latency (p50/p95/p99) and events/s
+  * queued processing latency per event type
+  * slash command latency per command
+  * peak memory
+
+Results are written as JSON tagged with the git commit, and a previous
+result can be compared against to make regressions visible:
+
+    python benchmarks/bench_webhook.py --output before.json
+    git checkout my-branch
+    python benchmarks/bench_webhook.py --compare before.json
+
+Recorded payloads can be replayed with --corpus DIR. Each file holds one
+JSON payload and is named after its event, e.g. push-monorepo.json.
+
+Usage:
+    python benchmarks/bench_webhook.py [--iterations N] [--concurrency N]
+        [--api-latency-ms MS] [--rate-limit N] [--sizes small,medium,large,xlarge]
+        [--corpus DIR] [--output FILE] [--compare FILE] [--threshold PCT]
+"""
+
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+SECRET = "benchmark-webhook-secret"
+INSTALLATION_ID = 4242
+REPOSITORY = {
+    "id": 1,
+    "full_name": "octo-org/monorepo",
+    "name": "monorepo",
+    "owner": {"login": "octo-org"},
+    "default_branch": "main",
+}
+SENDER = {"login": "octocat", "id": 1, "type": "User"}
+GRAPHQL_PULL_REQUEST = {
+    "number": 7,
+    "title": "Add streaming parser",
+    "state": "OPEN",
+    "merged": False,
+    "isDraft": False,
+    "mergeable": "MERGEABLE",
+    "additions": 420,
+    "deletions": 36,
+    "changedFiles": 2,
+    "headRefName": "feature/parser",
+    "headRefOid": "a" * 40,
+    "author": {"login": "octocat"},
+    "allCommits": {"totalCount": 4},
+    "comments": {"totalCount": 2},
+    "reviews": {"nodes": [{"comments": {"totalCount": 3}}]},
+    "labels": {"nodes": [{"name": "enhancement"}]},
+    "files": {
+        "totalCount": 2,
+        "pageInfo": {"hasNextPage": False, "endCursor": None},
+        "nodes": [
+            {"path": "src/parser.py", "additions": 400, "deletions": 30, "changeType": "MODIFIED"},
+            {
+                "path": "tests/test_parser.py",
+                "additions": 20,
+                "deletions": 6,
+                "changeType": "MODIFIED",
+            },
+        ],
+    },
+    "headCommit": {
+        "nodes": [
+            {
+                "commit": {
+                    "statusCheckRollup": {
+                        "state": "SUCCESS",
+                        "contexts": {
+                            "totalCount": 1,
+                            "nodes": [
+                                {
+                                    "__typename": "CheckRun",
+                                    "name": "build",
+                                    "status": "COMPLETED",
+                                    "conclusion": "SUCCESS",
+                                }
+                            ],
+                        },
+                    }
+                }
+            }
+        ]
+    },
+}
+SIZE_CLASSES = {
+    "small": 2 * 1024,
+    "medium": 200 * 1024,
+    "large": 2 * 1024 * 1024,
+    "xlarge": 8 * 1024 * 1024,
+}
+
+
+def configure_environment(workdir: str, write_rate: float) -> None:
+    """Settings for an isolated in-process app; explicit environment variables win"""
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    key_path = os.path.join(workdir, "app.pem")
+    with open(key_path, "wb") as f:
+        f.write(
+            key.private_bytes(
+                serialization.Encoding.PEM,
+                serialization.PrivateFormat.TraditionalOpenSSL,
+                serialization.NoEncryption(),
+            )
+        )
+
+    defaults = {
+        "GITHUB_APP_ID": "1",
+        "GITHUB_APP_PRIVATE_KEY_PATH": key_path,
+        "GITHUB_WEBHOOK_SECRET": SECRET,
+        "WEBHOOK_QUEUE_BACKEND": "memory",
+        "WEBHOOK_QUEUE_MAX_DEPTH": "0",
+        "INSTALLATION_DISCOVERY": "false",
+        "STATE_BACKEND": "none",
+        "TRACE_EXPORTER": "none",
+        "GITHUB_WRITE_RATE": str(write_rate),
+        "GITHUB_WRITE_BURST": str(max(1.0, write_rate)),
+        "LOG_LEVEL": "WARNING",
+        "LOG_FILE": os.path.join(workdir, "bench.log"),
+    }
+    for name, value in defaults.items():
+        os.environ.setdefault(name, value)
+
+
+# Corpus
+
+
+def _padding(size: int) -> str:
+    """Text that compresses and escapes like real descriptions and commit messages"""
+    line = "Refactor the request pipeline and update the integration tests accordingly. "
+    return (line * (size // len(line) + 1))[:size]
+
+
+def _issue(number: int, pull_request: bool = False) -> dict[str, Any]:
+    issue = {
+        "number": number,
+        "title": f"Issue {number}",
+        "state": "open",
+        "user": SENDER,
+        "labels": [{"name": "bug"}, {"name": "ci"}],
+        "comments": 3,
+        "body": _padding(600),
+    }
+    if pull_request:
+        issue["pull_request"] = {
+            "url": f"https://api.github.com/repos/octo-org/monorepo/pulls/{number}"
+        }
+    return issue
+
+
+def issue_comment(command: str, size: int, pull_request: bool = False) -> dict[str, Any]:
+    payload = {
+        "action": "created",
+        "issue": _issue(7, pull_request),
+        "comment": {"id": 1, "body": command, "user": SENDER},
+        "repository": REPOSITORY,
+        "sender": SENDER,
+        "installation": {"id": INSTALLATION_ID},
+    }
+    payload["issue"]["body"] = _padding(max(0, size - len(json.dumps(payload))))
+    return payload
+
+
+def pull_request_opened(size: int) -> dict[str, Any]:
+    payload = {
+        "action": "opened",
+        "number": 7,
+        "pull_request": {
+            "number": 7,
+            "title": "Add streaming parser",
+            "state": "open",
+            "user": SENDER,
+            "head": {"ref": "feature/parser", "sha": "a" * 40},
+            "base": {"ref": "main", "sha": "b" * 40},
+            "mergeable": True,
+            "merged": False,
+            "draft": False,
+            "body": "",
+        },
+        "repository": REPOSITORY,
+        "sender": SENDER,
+        "installation": {"id": INSTALLATION_ID},
+    }
+    payload["pull_request"]["body"] = _padding(max(0, size - len(json.dumps(payload))))
+    return payload
+
+
+def push(size: int) -> dict[str, Any]:
+    commit_template = {
+        "message": _padding(200),
+        "author": {"name": "Octo Cat", "email": "octocat@example.com"},
+        "added": [f"src/module_{i}.py" for i in range(5)],
+        "modified": [f"tests/test_module_{i}.py" for i in range(10)],
+        "removed": [],
+    }
+    per_commit = len(json.dumps(commit_template)) + 60
+    commits = [
+        {"id": hashlib.sha1(str(i).encode()).hexdigest(), **commit_template}
+        for i in range(max(1, size // per_commit))
+    ]
+    return {
+        "ref": "refs/heads/main",
+        "before": "c" * 40,
+        "after": "d" * 40,
+        "commits": commits,
+        "head_commit": commits[-1],
+        "pusher": {"name": "octocat"},
+        "repository": REPOSITORY,
+        "sender": SENDER,
+        "installation": {"id": INSTALLATION_ID},
+    }
+
+
+def build_corpus(sizes: list[str]) -> list[tuple[str, str, bytes]]:
+    """Deliveries as (name, event, body)"""
+    corpus = []
+    for size_class in sizes:
+        size = SIZE_CLASSES[size_class]
+        corpus.append((f"push/{size_class}", "push", push(size)))
+        corpus.append((f"pull_request/{size_class}", "pull_request", pull_request_opened(size)))
+        if size_class == "small":
+            corpus.append(("issue_comment/report", "issue_comment", issue_comment("/report", size)))
+            corpus.append(
+                ("issue_comment/pr-report", "issue_comment", issue_comment("/report", size, True))
+            )
+            corpus.append(
+                ("issue_comment/test", "issue_comment", issue_comment("/test ci.yml", size))
+            )
+            corpus.append(
+                ("issue_comment/merge", "issue_comment", issue_comment("/merge squash", size, True))
+            )
+    return [(name, event, json.dumps(payload).encode()) for name, event, payload in corpus]
+
+
+def load_corpus(directory: str) -> list[tuple[str, str, bytes]]:
+    """Recorded payloads, one per file, named <event>[-<label>].json"""
+    corpus = []
+    for filename in sorted(os.listdir(directory)):
+        if filename.endswith(".json"):
+            stem = filename[: -len(".json")]
+            with open(os.path.join(directory, filename), "rb") as f:
+                corpus.append((stem, stem.split("-", 1)[0], f.read()))
+    return corpus
+
+
+# Stubbed GitHub API
+
+
+class GitHubStub:
+    """Answers the GitHub API calls the bot makes, after a fixed latency"""
+
+    def __init__(self, latency: float, limit: int, remaining: int):
+        self.latency = latency
+        self.limit = limit
+        self.remaining = remaining
+        self.calls: dict[str, int] = defaultdict(int)
+
+    def _headers(self) -> dict[str, str]:
+        self.remaining = max(0, self.remaining - 1)
+        return {
+            "X-RateLimit-Limit": str(self.limit),
+            "X-RateLimit-Remaining": str(self.remaining),
+            "X-RateLimit-Reset": str(int(time.time()) + 3600),
+            "X-RateLimit-Resource": "core",
+        }
+
+    def _route(self, method: str, path: str) -> tuple[int, Any]:
+        if path.endswith("/access_tokens"):
+            expires_at = datetime.now(timezone.utc) + timedelta(hours=1)
+            return 201, {
+                "token": "ghs_benchmark",
+                "expires_at": expires_at.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            }
+        if path.endswith("/graphql"):
+            return 200, {"data": {"repository": {"pullRequest": GRAPHQL_PULL_REQUEST}}}
+        if path.endswith("/dispatches"):
+            return 204, None
+        if path.endswith("/actions/workflows"):
+            return 200, {
+                "total_count": 1,
+                "workflows": [
+                    {"id": 1, "name": "CI", "path": ".github/workflows/ci.yml", "state": "active"}
+                ],
+            }
+        if path.endswith("/merge"):
+            return 200, {
+                "merged": True,
+                "sha": "e" * 40,
+                "message": "Pull Request successfully merged",
+            }
+        if path.endswith("/comments") and method == "POST":
+            return 201, {"id": 1}
+        if path.endswith("/status"):
+            return 200, {"state": "success", "statuses": [], "total_count": 0}
+        if path.endswith("/check-runs"):
+            return 200, {"total_count": 0, "check_runs": []}
+        if "/pulls/" in path:
+            return 200, {
+                "number": 7,
+                "title": "Add streaming parser",
+                "state": "open",
+                "head": {"ref": "feature/parser", "sha": "a" * 40},
+                "mergeable": True,
+                "merged": False,
+                "draft": False,
+            }
+        return 200, {}
+
+    async def __call__(self, request):
+        import httpx
+
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        status, body = self._route(request.method, request.url.path)
+        self.calls[f"{request.method} {request.url.path}"] += 1
+        if body is None:
+            return httpx.Response(status, headers=self._headers())
+        return httpx.Response(status, json=body, headers=self._headers())
+
+
+# Statistics
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    """Nearest-rank percentile"""
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+def summarize(samples: list[float], wall: float | None = None) -> dict[str, float]:
+    summary = {
+        "count": len(samples),
+        "mean_ms": round(sum(samples) / len(samples) * 1000, 3),
+        "p50_ms": round(percentile(samples, 50) * 1000, 3),
+        "p95_ms": round(percentile(samples, 95) * 1000, 3),
+        "p99_ms": round(percentile(samples, 99) * 1000, 3),
+    }
+    if wall:
+        summary["events_per_s"] = round(len(samples) / wall, 1)
+    return summary
+
+
+def git_revision() -> dict[str, Any]:
+    root = os.path.join(os.path.dirname(__file__), "..")
+    try:
+        sha = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=root, capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = bool(
+            subprocess.run(
+                ["git", "status", "--porcelain", "--untracked-files=no"],
+                cwd=root,
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stdout.strip()
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return {"sha": "unknown", "dirty": None}
+    return {"sha": sha, "dirty": dirty}
+
+
+# Benchmark
+
+
+async def run_benchmark(
+    args: argparse.Namespace, corpus: list[tuple[str, str, bytes]]
+) -> dict[str, Any]:
+    import httpx
+    from mercur_e import main
+    from mercur_e.commands import CommandHandler
+    from mercur_e.github_auth import github_auth
+
+    stub = GitHubStub(args.api_latency_ms / 1000, args.rate_limit, args.rate_limit_remaining)
+    github_auth.client_pool.transport = httpx.MockTransport(stub)
+
+    processing: dict[str, list[float]] = defaultdict(list)
+    commands: dict[str, list[float]] = defaultdict(list)
+    processed = 0
+    done = asyncio.Event()
+    expected = 0
+
+    # Time queued processing and commands by wrapping their entry points
+    process_queued_delivery = main.process_queued_delivery
+
+    async def timed_processing(event_type: str, body: bytes):
+        nonlocal processed
+        start = time.perf_counter()
+        try:
+            await process_queued_delivery(event_type, body)
+        finally:
+            processing[event_type].append(time.perf_counter() - start)
+            processed += 1
+            if processed >= expected:
+                done.set()
+
+    execute = CommandHandler.execute
+
+    async def timed_execute(self, command, *a, **kw):
+        start = time.perf_counter()
+        try:
+            return await execute(self, command, *a, **kw)
+        finally:
+            commands[command].append(time.perf_counter() - start)
+
+    main.process_queued_delivery = timed_processing
+    CommandHandler.execute = timed_execute
+
+    signed = [
+        (name, event, body, "sha256=" + hmac.new(SECRET.encode(), body, hashlib.sha256).hexdigest())
+        for name, event, body in corpus
+    ]
+    ingest: dict[str, list[float]] = defaultdict(list)
+    errors: dict[str, int] = defaultdict(int)
+
+    async def send(deliveries, latencies):
+        nonlocal expected
+        pending = list(deliveries) * args.repeat
+        expected += len(pending)
+        done.clear()
+
+        async def sender():
+            while pending:
+                name, event, body, signature = pending.pop()
+                headers = {
+                    "Content-Type": "application/json",
+                    "X-GitHub-Event": event,
+                    "X-GitHub-Delivery": str(uuid.uuid4()),
+                    "X-Hub-Signature-256": signature,
+                }
+                start = time.perf_counter()
+                response = await client.post("/webhook", content=body, headers=headers)
+                latencies[name].append(time.perf_counter() - start)
+                if response.status_code >= 300:
+                    errors[f"{name}:{response.status_code}"] += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(sender() for _ in range(args.concurrency)))
+        return time.perf_counter() - start
+
+    async def drain():
+        if processed < expected:
+            await asyncio.wait_for(done.wait(), timeout=args.drain_timeout)
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with (
+        main.app.router.lifespan_context(main.app),
+        httpx.AsyncClient(transport=transport, base_url="http://bench") as client,
+    ):
+        for _ in range(args.warmup):
+            await send(signed, defaultdict(list))
+        await drain()
+        processing.clear()
+        commands.clear()
+
+        if args.trace_memory:
+            tracemalloc.start()
+        wall = 0.0
+        for _ in range(args.iterations):
+            wall += await send(signed, ingest)
+        await drain()
+
+    python_peak = None
+    if args.trace_memory:
+        python_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    main.process_queued_delivery = process_queued_delivery
+    CommandHandler.execute = execute
+
+    all_ingest = [sample for samples in ingest.values() for sample in samples]
+    return {
+        "ingest": {
+            "all": summarize(all_ingest, wall),
+            **{name: summarize(samples) for name, samples in sorted(ingest.items())},
+        },
+        "processing": {event: summarize(samples) for event, samples in sorted(processing.items())},
+        "commands": {
+            f"/{command}": summarize(samples) for command, samples in sorted(commands.items())
+        },
+        "memory": {
+            "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+            "python_peak_mb": (
+                round(python_peak / 1024 / 1024, 1) if python_peak is not None else None
+            ),
+        },
+        "github_api_calls": sum(stub.calls.values()),
+        "errors": dict(errors),
+    }
+
+
+def print_results(results: dict[str, Any]) -> None:
+    header = f"{'':<28} {'count':>7} {'mean':>9} {'p50':>9} {'p95':>9} {'p99':>9} {'ev/s':>9}"
+    for section in ("ingest", "processing", "commands"):
+        print(f"\n{section} (ms)\n{header}")
+        for name, stats in results[section].items():
+            print(
+                f"{name:<28} {stats['count']:>7} {stats['mean_ms']:>9.2f} {stats['p50_ms']:>9.2f} "
+                f"{stats['p95_ms']:>9.2f} {stats['p99_ms']:>9.2f} "
+                f"{stats.get('events_per_s', ''):>9}"
+            )
+    memory = results["memory"]
+    print(
+        f"\nmemory: max RSS {memory['max_rss_mb']} MB"
+        + (
+            f", Python peak {memory['python_peak_mb']} MB"
+            if memory["python_peak_mb"] is not None
+            else ""
+        )
+    )
+    print(f"GitHub API calls: {results['github_api_calls']}")
+    if results["errors"]:
+        print(f"non-2xx responses: {results['errors']}")
+
+
+def compare(baseline: dict[str, Any], current: dict[str, Any], threshold: float) -> bool:
+    """Print changes against a baseline; True if anything regressed beyond threshold percent"""
+    print(f"\nComparison with {baseline['git']['sha'][:12]} (regression threshold {threshold:g}%)")
+    regressed = False
+    for section in ("ingest", "processing", "commands"):
+        for name, stats in current["results"][section].items():
+            before = baseline["results"].get(section, {}).get(name)
+            if not before:
+                continue
+            for metric in ("p50_ms", "p95_ms", "p99_ms", "events_per_s"):
+                if metric not in stats or not before.get(metric):
+                    continue
+                change = (stats[metric] - before[metric]) / before[metric] * 100
+                # Latencies should go down, throughput up; sub-0.1 ms latency changes are noise
+                if metric == "events_per_s":
+                    worse = change < -threshold
+                else:
+                    worse = change > threshold and stats[metric] - before[metric] >= 0.1
+                regressed |= worse
+                marker = "  REGRESSION" if worse else ""
+                print(
+                    f"  {section} {name:<26} {metric:<13} {before[metric]:>10.2f} → "
+                    f"{stats[metric]:>10.2f} ({change:+6.1f}%){marker}"
+                )
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--iterations", type=int, default=3, help="measured passes over the corpus")
+    parser.add_argument("--warmup", type=int, default=1, help="unmeasured passes before measuring")
+    parser.add_argument("--repeat", type=int, default=20, help="copies of each payload per pass")
+    parser.add_argument("--concurrency", type=int, default=8, help="concurrent webhook senders")
+    parser.add_argument(
+        "--api-latency-ms", type=float, default=20.0, help="stubbed GitHub API latency"
+    )
+    parser.add_argument(
+        "--rate-limit", type=int, default=5000, help="X-RateLimit-Limit of the stub"
+    )
+    parser.add_argument(
+        "--rate-limit-remaining", type=int, default=5000, help="initial X-RateLimit-Remaining"
+    )
+    parser.add_argument(
+        "--write-rate",
+        type=float,
+        default=1000.0,
+        help="REST writes/s per installation; 1 is the production pacing",
+    )
+    parser.add_argument(
+        "--sizes", default="small,medium,large", help=f"payload classes: {','.join(SIZE_CLASSES)}"
+    )
+    parser.add_argument("--corpus", help="directory of recorded payloads instead of generated ones")
+    parser.add_argument(
+        "--trace-memory", action="store_true", help="also report the Python heap peak (slower)"
+    )
+    parser.add_argument("--drain-timeout", type=float, default=300.0)
+    parser.add_argument("--output", help="write the results as JSON")
+    parser.add_argument("--compare", help="baseline JSON from a previous --output")
+    parser.add_argument(
+        "--threshold", type=float, default=10.0, help="regression threshold in percent"
+    )
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="mercur-e-bench-")
+    configure_environment(workdir, args.write_rate)
+
+    corpus = load_corpus(args.corpus) if args.corpus else build_corpus(args.sizes.split(","))
+    corpus_bytes = sum(len(body) for _, _, body in corpus)
+    print(
+        f"Webhook benchmark: {len(corpus)} payloads ({corpus_bytes / 1024 / 1024:.1f} MB) × "
+        f"{args.repeat} × {args.iterations} passes, concurrency {args.concurrency}, "
+        f"API latency {args.api_latency_ms:g} ms"
+    )
+
+    results = asyncio.run(run_benchmark(args, corpus))
+    print_results(results)
+
+    report = {
+        "benchmark": "webhook",
+        "git": git_revision(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {
+            key: getattr(args, key)
+            for key in (
+                "iterations",
+                "warmup",
+                "repeat",
+                "concurrency",
+                "api_latency_ms",
+                "rate_limit",
+                "rate_limit_remaining",
+                "write_rate",
+                "sizes",
+                "corpus",
+            )
+        },
+        "corpus": {name: len(body) for name, _, body in corpus},
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline["config"] != report["config"]:
+            print(
+                "\nWarning: baseline was run with different options; numbers may not be comparable"
+            )
+        if compare(baseline, report, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+In-memory caching primitives for MERCUR-E
+"""
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Iterator
+
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Bounded LRU mapping whose entries optionally expire.
+
+    Lookups and inserts are O(1). When the cache is full the least
+    recently used entry is evicted. Hit and miss counters are kept for
+    ``get`` calls so callers can report cache effectiveness.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        ttl: float | None = None,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[Hashable, tuple[float | None, Any]] = OrderedDict()
+
+    def _lookup(self, key: Hashable) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            return _MISSING
+
+        expires_at, value = entry
+        if expires_at is not None and expires_at <= self.clock():
+            del self._data[key]
+            return _MISSING
+
+        self._data.move_to_end(key)
+        return value
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value, or default when missing or expired"""
+        value = self._lookup(key)
+        if value is _MISSING:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return value
+
+    def peek(self, key: Hashable, default: Any = None) -> Any:
+        """Like get, but without updating the hit/miss counters"""
+        value = self._lookup(key)
+        return default if value is _MISSING else value
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None) -> None:
+        """
+        Cache a value
+
+        Args:
+            key: Cache key
+            value: Value to store
+            ttl: Lifetime in seconds, overriding the cache default
+        """
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = self.clock() + ttl if ttl is not None else None
+
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Remove an entry and return its value"""
+        entry = self._data.pop(key, None)
+        return default if entry is None else entry[1]
+
+    def clear(self) -> None:
+        """Remove every entry"""
+        self._data.clear()
+
+    def keys(self) -> Iterator[Hashable]:
+        """Iterate over cached keys, including ones that may have expired"""
+        return iter(list(self._data))
+
+    def stats(self) -> dict[str, Any]:
+        """Size and hit/miss counters"""
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self._lookup(key) is not _MISSING
+
+    def __len__(self) -> int:
+        return len(self._data)
@@ -1,13 +1,20 @@
 """
 Command handlers for GitHub bot slash commands
 """
+import asyncio
 import re
+import time
 from typing import Any
-from github import Github
-from github.Repository import Repository
-from github.PullRequest import PullRequest
-from github.Issue import Issue
 from loguru import logger
+from .github_client import GitHubClient
+from .metrics import COMMAND_SECONDS
+from .models import Issue, PullRequest, Repository
+from .profiling import record_phase
+from .pull_requests import load_pull_request
+from .ratelimit import Priority, RateLimitExceeded, with_priority
+from .status import head_status_cache
+from .tracing import tracer
+from .workflows import workflow_indexes
 
 
 class CommandParser:
@@ -43,9 +50,140 @@ class CommandParser:
 class CommandHandler:
     """Handle bot commands"""
     
-    def __init__(self, github_client: Github, repo: Repository):
+    # Commands that must see the effects of every command before them
+    SEQUENTIAL_COMMANDS = frozenset({'merge'})
+    # Commands that change the repository and must not be repeated by a retry
+    SIDE_EFFECT_COMMANDS = frozenset({'test', 'merge'})
+    KNOWN_COMMANDS = frozenset({'test', 'merge', 'report'})
+    
+    def __init__(self, github_client: GitHubClient, repo: Repository):
         self.github = github_client
         self.repo = repo
+        self.repo_name = repo.full_name
+    
+    async def execute(
+        self,
+        command: str,
+        pr: PullRequest | None = None,
+        issue: Issue | None = None,
+        args: str = ""
+    ) -> dict[str, Any]:
+        """
+        Dispatch a single parsed command to its handler
+        
+        Args:
+            command: Command name without the slash
+            pr: Pull request data (if applicable)
+            issue: Issue data (if applicable)
+            args: Command arguments
+        
+        Returns:
+            Result dictionary with status and message
+        """
+        logger.info("Executing command: /{} {}", command, args)
+        
+        name = command if command in self.KNOWN_COMMANDS else 'unknown'
+        start = time.perf_counter()
+        outcome = 'error'
+        attributes = {'command': name, 'repository': self.repo_name}
+        with tracer.span(f"command /{name}", attributes=attributes) as span:
+            try:
+                result = await self._dispatch(command, pr, issue, args)
+                outcome = 'success' if result.get('success') else 'failure'
+                return result
+            finally:
+                elapsed = time.perf_counter() - start
+                COMMAND_SECONDS.observe(elapsed, name, outcome)
+                record_phase(f"/{name}", elapsed)
+                span.set_attribute('outcome', outcome)
+    
+    async def _dispatch(
+        self,
+        command: str,
+        pr: PullRequest | None,
+        issue: Issue | None,
+        args: str
+    ) -> dict[str, Any]:
+        if command == 'test':
+            return await self.handle_test_command(pr, issue, args)
+        elif command == 'merge':
+            if not pr:
+                return {'success': False, 'message': '❌ /merge can only be used on pull requests'}
+            return await self.handle_merge_command(pr, args)
+        elif command == 'report':
+            return await self.handle_report_command(pr, issue, args)
+        else:
+            return {'success': False, 'message': f'❌ Unknown command: /{command}'}
+    
+    async def run_commands(
+        self,
+        commands: list[dict[str, Any]],
+        pr: dict[str, Any] | None = None,
+        issue: dict[str, Any] | None = None
+    ) -> list[dict[str, Any]]:
+        """
+        Execute parsed commands, concurrently where they are independent
+        
+        Consecutive commands run together. A sequential command such as
+        /merge waits for every command before it, and the commands after it
+        wait for it to finish.
+        
+        Args:
+            commands: Commands as returned by CommandParser.parse_commands
+            pr: Pull request data (if applicable)
+            issue: Issue data (if applicable)
+        
+        Returns:
+            Result dictionaries in command order
+        
+        Raises:
+            RateLimitExceeded: If a command was shed before any command with
+                side effects ran, so the whole delivery can be retried later
+        """
+        stages: list[list[dict[str, Any]]] = []
+        for cmd in commands:
+            sequential = cmd['command'] in self.SEQUENTIAL_COMMANDS
+            if (
+                stages and not sequential
+                and stages[-1][-1]['command'] not in self.SEQUENTIAL_COMMANDS
+            ):
+                stages[-1].append(cmd)
+            else:
+                stages.append([cmd])
+        
+        results = []
+        side_effects = False
+        for stage in stages:
+            side_effects |= any(cmd['command'] in self.SIDE_EFFECT_COMMANDS for cmd in stage)
+            outcomes = await asyncio.gather(*(
+                self.execute(cmd['command'], pr, issue, cmd['args']) for cmd in stage
+            ), return_exceptions=True)
+            for cmd, outcome in zip(stage, outcomes):
+                if isinstance(outcome, RateLimitExceeded) and side_effects:
+                    # A retry would repeat /test or /merge; report the deferral instead
+                    outcome = {
+                        'success': False,
+                        'message': f"⏳ /{cmd['command']} skipped: GitHub rate limit low, "
+                                   f"retry after {outcome.retry_after}"
+                    }
+                elif isinstance(outcome, BaseException):
+                    raise outcome
+                results.append(outcome)
+        return results
+    
+    @staticmethod
+    def render_results(results: list[dict[str, Any]]) -> str:
+        """Combine command results into the body of one comment"""
+        if len(results) == 1:
+            result = results[0]
+            return result.get('report') or result['message']
+        
+        body = "### 🤖 Command Results\n\n"
+        body += "".join(f"- {result['message']}\n" for result in results)
+        for result in results:
+            if result.get('report'):
+                body += f"\n---\n\n{result['report']}"
+        return body
     
     async def handle_test_command(
         self,
@@ -57,8 +195,8 @@ class CommandHandler:
         Handle /test command - trigger GitHub Actions workflow
         
         Args:
-            pr: Pull request object (if applicable)
-            issue: Issue object (if applicable)
+            pr: Pull request data (if applicable)
+            issue: Issue data (if applicable)
             args: Command arguments (workflow name, branch, etc.)
         
         Returns:
@@ -67,18 +205,16 @@ class CommandHandler:
         try:
             # Parse arguments
             workflow_name = args if args else "ci.yml"
-            ref = pr.head.ref if pr else self.repo.default_branch
+            if pr:
+                ref = (await pr.load(self.github, self.repo_name)).head_ref
+            else:
+                ref = self.repo.default_branch
             
-            logger.info(f"Triggering workflow '{workflow_name}' on ref '{ref}'")
+            logger.info("Triggering workflow '{}' on ref '{}'", workflow_name, ref)
             
             # Get workflow
-            workflows = self.repo.get_workflows()
-            target_workflow = None
-            
-            for workflow in workflows:
-                if workflow.path.endswith(workflow_name) or workflow.name == workflow_name:
-                    target_workflow = workflow
-                    break
+            index = await workflow_indexes.get(self.github, self.repo_name)
+            target_workflow = index.find(workflow_name)
             
             if not target_workflow:
                 return {
@@ -87,7 +223,11 @@ class CommandHandler:
                 }
             
             # Trigger workflow
-            success = target_workflow.create_dispatch(ref=ref)
+            success = await self.github.create_workflow_dispatch(
+                self.repo_name,
+                target_workflow['id'],
+                ref=ref
+            )
             
             if success:
                 message = f"✅ Triggered workflow '{workflow_name}' on branch '{ref}'"
@@ -112,7 +252,7 @@ class CommandHandler:
         Handle /merge command - merge pull request
         
         Args:
-            pr: Pull request object
+            pr: Pull request data
             args: Merge method (squash, merge, rebase)
         
         Returns:
@@ -122,9 +262,10 @@ class CommandHandler:
             # Parse merge method
             merge_method = args.lower() if args in ['squash', 'merge', 'rebase'] else 'squash'
             
-            logger.info(f"Attempting to merge PR #{pr.number} using {merge_method} method")
+            logger.info("Attempting to merge PR #{} using {} method", pr.number, merge_method)
             
             # Check if PR is mergeable
+            await pr.load(self.github, self.repo_name)
             if pr.mergeable is False:
                 return {
                     'success': False,
@@ -135,24 +276,27 @@ class CommandHandler:
             # reviews = pr.get_reviews()
             # approved = any(review.state == 'APPROVED' for review in reviews)
             
-            # Check CI status
-            commit = pr.get_commits().reversed[0]
-            statuses = commit.get_combined_status()
+            # Check CI status; not from the cache, a check may have been re-run since
+            statuses = await head_status_cache.get(
+                self.github, self.repo_name, pr.head_sha, fresh=True
+            )
             
-            if statuses.state not in ['success', 'pending']:
+            if statuses['state'] not in ['success', 'pending']:
                 return {
                     'success': False,
-                    'message': f"❌ Cannot merge: CI checks are {statuses.state}"
+                    'message': f"❌ Cannot merge: CI checks are {statuses['state']}"
                 }
             
             # Perform merge
-            merge_result = pr.merge(
+            merge_result = await self.github.merge_pull(
+                self.repo_name,
+                pr.number,
                 merge_method=merge_method,
                 commit_title=f"Merge PR #{pr.number}: {pr.title}",
                 commit_message=f"Merged via GitHub Bot using {merge_method} method"
             )
             
-            if merge_result.merged:
+            if merge_result.get('merged'):
                 message = f"✅ Successfully merged PR #{pr.number} using {merge_method} method"
                 logger.info(message)
                 return {'success': True, 'message': message}
@@ -166,6 +310,7 @@ class CommandHandler:
             logger.error(error_msg)
             return {'success': False, 'message': error_msg}
     
+    @with_priority(Priority.BACKGROUND)
     async def handle_report_command(
         self,
         pr: PullRequest | None = None,
@@ -173,15 +318,16 @@ class CommandHandler:
         args: str = ""
     ) -> dict[str, Any]:
         """
-        Handle /report command - post status report
+        Handle /report command - generate status report
         
         Args:
-            pr: Pull request object (if applicable)
-            issue: Issue object (if applicable)
+            pr: Pull request data (if applicable)
+            issue: Issue data (if applicable)
             args: Report type or custom message
         
         Returns:
-            Result dictionary with status and message
+            Result dictionary with status, message and the report body
+            under 'report', to be posted with the other command results
         """
         try:
             target = pr or issue
@@ -191,49 +337,56 @@ class CommandHandler:
                     'message': "❌ No PR or issue context for report"
                 }
             
-            logger.info(f"Generating report for {'PR' if pr else 'issue'} #{target.number}")
+            logger.info("Generating report for {} #{}", 'PR' if pr else 'issue', target.number)
             
             # Generate report based on type
             if pr:
-                report = self._generate_pr_report(pr, args)
+                report = await self._generate_pr_report(pr, args)
             else:
                 report = self._generate_issue_report(issue, args)
             
-            # Post comment
-            target.create_comment(report)
-            
-            message = f"✅ Posted report on {'PR' if pr else 'issue'} #{target.number}"
+            message = f"✅ Generated report for {'PR' if pr else 'issue'} #{target.number}"
             logger.info(message)
-            return {'success': True, 'message': message}
+            return {'success': True, 'message': message, 'report': report}
             
+        except RateLimitExceeded:
+            # Shed to leave quota for interactive work; the delivery is retried later
+            raise
         except Exception as e:
             error_msg = f"❌ Error generating report: {str(e)}"
             logger.error(error_msg)
             return {'success': False, 'message': error_msg}
     
-    def _generate_pr_report(self, pr: PullRequest, report_type: str) -> str:
-        """Generate PR status report"""
+    async def _generate_pr_report(self, pr: PullRequest, report_type: str) -> str:
+        """Generate PR status report from a single GraphQL fetch"""
+        details = await load_pull_request(self.github, self.repo_name, pr.number)
+        statuses = details['ci']
+        
         report = f"## 📊 Pull Request Report\n\n"
-        report += f"**PR:** #{pr.number} - {pr.title}\n"
-        report += f"**Author:** @{pr.user.login}\n"
-        report += f"**Status:** {pr.state}\n"
-        report += f"**Mergeable:** {'✅ Yes' if pr.mergeable else '❌ No'}\n\n"
+        report += f"**PR:** #{details['number']} - {details['title']}\n"
+        report += f"**Author:** @{details['user']['login']}\n"
+        report += f"**Status:** {details['state']}\n"
+        report += f"**Mergeable:** {'✅ Yes' if details['mergeable'] else '❌ No'}\n\n"
         
         # CI Status
-        commit = pr.get_commits().reversed[0]
-        statuses = commit.get_combined_status()
-        report += f"**CI Status:** {statuses.state}\n\n"
+        report += f"**CI Status:** {statuses['state']}\n\n"
         
         # Check details
-        if statuses.statuses:
+        if statuses['statuses'] or statuses['check_runs']:
             report += "### Check Details\n"
-            for status in statuses.statuses:
-                emoji = "✅" if status.state == "success" else "❌" if status.state == "failure" else "⏳"
-                report += f"- {emoji} **{status.context}**: {status.state}\n"
+            for status in statuses['statuses']:
+                emoji = {"success": "✅", "failure": "❌"}.get(status['state'], "⏳")
+                report += f"- {emoji} **{status['context']}**: {status['state']}\n"
+            for run in statuses['check_runs']:
+                state = run['conclusion'] or run['status']
+                emoji = "✅" if state == "success" else "⏳" if run['status'] != "completed" else "❌"
+                report += f"- {emoji} **{run['name']}**: {state}\n"
         
         # Files changed
-        report += f"\n**Files Changed:** {pr.changed_files}\n"
-        report += f"**Additions:** +{pr.additions} | **Deletions:** -{pr.deletions}\n"
+        report += f"\n**Files Changed:** {details['changed_files']}\n"
+        report += (
+            f"**Additions:** +{details['additions']} | **Deletions:** -{details['deletions']}\n"
+        )
         
         return report
     
@@ -17,10 +17,91 @@ class Settings(BaseSettings):
     )
     github_webhook_secret: str | None = Field(default=None, env="GITHUB_WEBHOOK_SECRET")
     
+    # Additional active webhook secrets for rotation (comma-separated), and/or
+    # a file with one secret per line that is reloaded when it changes
+    github_webhook_secrets: str | None = Field(default=None, env="GITHUB_WEBHOOK_SECRETS")
+    github_webhook_secrets_file: str | None = Field(default=None, env="GITHUB_WEBHOOK_SECRETS_FILE")
+    webhook_secrets_reload_interval: float = Field(
+        default=10.0, env="WEBHOOK_SECRETS_RELOAD_INTERVAL"
+    )
+    
+    # Installation tokens are re-minted this many seconds before they expire
+    github_token_refresh_margin: float = Field(default=300.0, env="GITHUB_TOKEN_REFRESH_MARGIN")
+    github_token_refresh_interval: float = Field(default=30.0, env="GITHUB_TOKEN_REFRESH_INTERVAL")
+    
+    # Repository → installation ID cache
+    installation_cache_size: int = Field(default=10000, env="INSTALLATION_CACHE_SIZE")
+    installation_cache_ttl: float = Field(default=86400.0, env="INSTALLATION_CACHE_TTL")
+    installation_discovery: bool = Field(default=True, env="INSTALLATION_DISCOVERY")
+    
+    # GitHub API connection pool
+    github_http_max_connections: int = Field(default=20, env="GITHUB_HTTP_MAX_CONNECTIONS")
+    github_http_max_keepalive: int = Field(default=10, env="GITHUB_HTTP_MAX_KEEPALIVE")
+    github_http_keepalive_expiry: float = Field(default=30.0, env="GITHUB_HTTP_KEEPALIVE_EXPIRY")
+    github_http_idle_timeout: float = Field(default=300.0, env="GITHUB_HTTP_IDLE_TIMEOUT")
+    github_http2: bool = Field(default=True, env="GITHUB_HTTP2")
+    
+    # Conditional-request (ETag) cache for GitHub REST reads
+    github_http_cache: bool = Field(default=True, env="GITHUB_HTTP_CACHE")
+    github_http_cache_size: int = Field(default=1000, env="GITHUB_HTTP_CACHE_SIZE")
+    github_http_cache_max_entry_bytes: int = Field(
+        default=1024 * 1024,
+        env="GITHUB_HTTP_CACHE_MAX_ENTRY_BYTES"
+    )
+    github_http_cache_path: str | None = Field(default=None, env="GITHUB_HTTP_CACHE_PATH")
+    
+    # Per-SHA CI status cache (settled states / pending states)
+    head_status_ttl: float = Field(default=600.0, env="HEAD_STATUS_TTL")
+    head_status_pending_ttl: float = Field(default=15.0, env="HEAD_STATUS_PENDING_TTL")
+    
+    # Workflow index used by /test (also invalidated by pushes to .github/workflows/)
+    workflow_index_ttl: float = Field(default=3600.0, env="WORKFLOW_INDEX_TTL")
+    
+    # GitHub API rate-limit scheduling
+    ratelimit_background_reserve: float = Field(default=0.2, env="RATELIMIT_BACKGROUND_RESERVE")
+    ratelimit_max_wait: float = Field(default=60.0, env="RATELIMIT_MAX_WAIT")
+    ratelimit_background_max_wait: float = Field(default=5.0, env="RATELIMIT_BACKGROUND_MAX_WAIT")
+    github_write_rate: float = Field(default=1.0, env="GITHUB_WRITE_RATE")
+    github_write_burst: float = Field(default=3.0, env="GITHUB_WRITE_BURST")
+    
+    # Webhook queue
+    webhook_queue_backend: str = Field(default="sqlite", env="WEBHOOK_QUEUE_BACKEND")
+    webhook_queue_path: str = Field(default="./data/webhooks.db", env="WEBHOOK_QUEUE_PATH")
+    webhook_queue_max_depth: int = Field(default=10000, env="WEBHOOK_QUEUE_MAX_DEPTH")
+    webhook_workers: int = Field(default=4, env="WEBHOOK_WORKERS")
+    webhook_max_attempts: int = Field(default=5, env="WEBHOOK_MAX_ATTEMPTS")
+    webhook_retry_backoff: float = Field(default=2.0, env="WEBHOOK_RETRY_BACKOFF")
+    webhook_retry_backoff_max: float = Field(default=300.0, env="WEBHOOK_RETRY_BACKOFF_MAX")
+    
+    # Webhook delivery deduplication
+    webhook_dedup_size: int = Field(default=10000, env="WEBHOOK_DEDUP_SIZE")
+    webhook_dedup_ttl: float = Field(default=72 * 3600, env="WEBHOOK_DEDUP_TTL")
+    webhook_dedup_path: str | None = Field(default=None, env="WEBHOOK_DEDUP_PATH")
+    
+    # Largest accepted webhook body (GitHub caps payloads at 25 MB)
+    webhook_max_body_size: int = Field(default=25 * 1024 * 1024, env="WEBHOOK_MAX_BODY_SIZE")
+    
+    # Handled webhook events: comma-separated "event" or "event:action" entries
+    webhook_events: str = Field(
+        default=(
+            "issue_comment:created,pull_request:opened,pull_request:synchronize,push,"
+            "installation,installation_repositories"
+        ),
+        env="WEBHOOK_EVENTS"
+    )
+    
     # Server Configuration
     host: str = Field(default="0.0.0.0", env="HOST")
     port: int = Field(default=8000, env="PORT")
     debug: bool = Field(default=False, env="DEBUG")
+    workers: int = Field(default=1, env="WORKERS")
+    
+    # State shared by worker processes (tokens, delivery IDs, rate limits):
+    # "auto" (sqlite when WORKERS > 1), "sqlite", "redis", "memory" or "none"
+    state_backend: str = Field(default="auto", env="STATE_BACKEND")
+    state_path: str = Field(default="./data/state.db", env="STATE_PATH")
+    state_redis_url: str | None = Field(default=None, env="STATE_REDIS_URL")
+    ratelimit_sync_interval: float = Field(default=1.0, env="RATELIMIT_SYNC_INTERVAL")
     
     # PAM Authentication
     pam_service: str = Field(default="login", env="PAM_SERVICE")
@@ -33,6 +114,24 @@ class Settings(BaseSettings):
     # Logging
     log_level: str = Field(default="INFO", env="LOG_LEVEL")
     log_file: str = Field(default="./logs/githubbot.log", env="LOG_FILE")
+    # "text" or "json" (one JSON object per line)
+    log_format: str = Field(default="text", env="LOG_FORMAT")
+    # Write logs from a background thread; records beyond the buffer are dropped
+    log_async: bool = Field(default=True, env="LOG_ASYNC")
+    log_buffer_size: int = Field(default=10000, env="LOG_BUFFER_SIZE")
+    
+    # Prometheus metrics at /metrics
+    metrics_enabled: bool = Field(default=True, env="METRICS_ENABLED")
+    
+    # Request tracing: "none", "jsonl" (local file) or "otlp" (OTLP/HTTP collector)
+    trace_exporter: str = Field(default="none", env="TRACE_EXPORTER")
+    trace_sample_rate: float = Field(default=0.1, env="TRACE_SAMPLE_RATE")
+    trace_file: str = Field(default="./logs/traces.jsonl", env="TRACE_FILE")
+    trace_otlp_endpoint: str = Field(default="http://localhost:4318", env="TRACE_OTLP_ENDPOINT")
+    
+    # Profiling: /admin/profile (PAM-protected) and slow-delivery logging
+    profile_max_duration: float = Field(default=60.0, env="PROFILE_MAX_DURATION")
+    slow_webhook_threshold: float | None = Field(default=None, env="SLOW_WEBHOOK_THRESHOLD")
     
     # Security
     allowed_origins: str = Field(default="*", env="ALLOWED_ORIGINS")
@@ -0,0 +1,154 @@
+"""
+Webhook delivery deduplication for MERCUR-E
+
+GitHub redelivers webhooks and proxies retry timed-out requests, so the
+same X-GitHub-Delivery ID can arrive more than once. The deduplicator
+remembers recently accepted IDs so repeats are acknowledged without being
+dispatched again.
+"""
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from .cache import TTLCache
+from .state import StateStore
+
+
+class SQLiteDeliveryStore:
+    """Persistent set of delivery IDs with a time-to-live"""
+
+    PURGE_EVERY = 1000
+
+    def __init__(self, path: str, ttl: float):
+        self.ttl = ttl
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._inserts = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS seen_deliveries ("
+            "delivery_id TEXT PRIMARY KEY, seen_at REAL NOT NULL)"
+        )
+
+    def add(self, delivery_id: str) -> bool:
+        """Record a delivery ID; returns False if it was already recorded"""
+        now = time.time()
+        with self._lock:
+            # Expired rows count as unseen and are overwritten
+            cursor = self._conn.execute(
+                "INSERT INTO seen_deliveries (delivery_id, seen_at) VALUES (?, ?) "
+                "ON CONFLICT (delivery_id) DO UPDATE SET seen_at = excluded.seen_at "
+                "WHERE seen_deliveries.seen_at <= ?",
+                (delivery_id, now, now - self.ttl)
+            )
+            added = cursor.rowcount > 0
+
+            self._inserts += 1
+            if self._inserts % self.PURGE_EVERY == 0:
+                self._conn.execute(
+                    "DELETE FROM seen_deliveries WHERE seen_at <= ?", (now - self.ttl,)
+                )
+            return added
+
+    def discard(self, delivery_id: str) -> None:
+        """Forget a delivery ID"""
+        with self._lock:
+            self._conn.execute("DELETE FROM seen_deliveries WHERE delivery_id = ?", (delivery_id,))
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class DeliveryDeduplicator:
+    """
+    Bounded index of recently accepted delivery IDs.
+
+    The in-memory LRU answers repeats in O(1). When a persistent store is
+    configured, IDs missed by the LRU (e.g. after a restart) are checked
+    against it too. With a ``shared`` state store, an ID accepted by one
+    worker process is recognised as a repeat by all the others.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 10000,
+        ttl: float = 72 * 3600,
+        store: SQLiteDeliveryStore | None = None,
+        shared: StateStore | None = None
+    ):
+        self.ttl = ttl
+        self._recent = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.store = store
+        self.shared = shared
+        self.hits = 0
+        self.misses = 0
+
+    async def check_and_mark(self, delivery_id: str | None) -> bool:
+        """
+        Record a delivery ID
+
+        Args:
+            delivery_id: X-GitHub-Delivery header value
+
+        Returns:
+            True if the delivery was already seen and should be skipped
+        """
+        if not delivery_id:
+            return False
+
+        if delivery_id in self._recent:
+            self.hits += 1
+            return True
+
+        # Mark before awaiting the store so concurrent repeats see it
+        self._recent.set(delivery_id, True)
+        stored = False
+        try:
+            if self.store is not None:
+                if not await asyncio.to_thread(self.store.add, delivery_id):
+                    self.hits += 1
+                    return True
+                stored = True
+            if self.shared is not None and not await self.shared.add(
+                f"delivery:{delivery_id}", b"1", self.ttl
+            ):
+                self.hits += 1
+                return True
+        except BaseException:
+            # Not accepted: a redelivery must not be mistaken for a repeat
+            self._recent.pop(delivery_id)
+            if stored:
+                await asyncio.to_thread(self.store.discard, delivery_id)
+            raise
+
+        self.misses += 1
+        return False
+
+    async def forget(self, delivery_id: str | None) -> None:
+        """Unmark a delivery that could not be accepted, so a retry is processed"""
+        if not delivery_id:
+            return
+        self._recent.pop(delivery_id)
+        if self.store is not None:
+            await asyncio.to_thread(self.store.discard, delivery_id)
+        if self.shared is not None:
+            await self.shared.delete(f"delivery:{delivery_id}")
+
+    def stats(self) -> dict[str, int]:
+        """Hit and miss counters"""
+        return {
+            'size': len(self._recent),
+            'hits': self.hits,
+            'misses': self.misses
+        }
+
+    def close(self) -> None:
+        if self.store is not None:
+            self.store.close()
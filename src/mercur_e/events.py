@@ -0,0 +1,67 @@
+"""
+Webhook event allow-list for MERCUR-E
+
+Deliveries for events (or actions) the bot does not handle are dropped as
+early as possible: the event name comes from the X-GitHub-Event header,
+before the body is read, and the action is taken from the start of the
+raw body, where GitHub serializes it, without decoding the JSON.
+"""
+import re
+from typing import Any
+
+
+# GitHub puts "action" first in the payloads of events that have one
+ACTION_PATTERN = re.compile(rb'\A\s*\{\s*"action"\s*:\s*"([^"\\]*)"')
+
+
+class EventFilter:
+    """
+    Allow-list of webhook events and, optionally, their actions.
+
+    The spec is a comma-separated list of ``event`` (every action) or
+    ``event:action`` entries, e.g. ``issue_comment:created,push``.
+    """
+
+    def __init__(self, spec: str):
+        self.allowed: dict[str, frozenset[str] | None] = {}
+        for entry in spec.split(','):
+            entry = entry.strip()
+            if not entry:
+                continue
+            event, _, action = entry.partition(':')
+            if not action or self.allowed.get(event, frozenset()) is None:
+                self.allowed[event] = None
+            else:
+                self.allowed[event] = self.allowed.get(event, frozenset()) | {action}
+
+    @property
+    def events(self) -> list[str]:
+        """Allowed event names"""
+        return list(self.allowed)
+
+    def allows_event(self, event: str | None) -> bool:
+        """Whether any action of the event is handled"""
+        return event in self.allowed
+
+    def allows(self, event: str | None, action: str | None) -> bool:
+        """Whether the event/action pair is handled; a missing action passes"""
+        if event not in self.allowed:
+            return False
+        actions = self.allowed[event]
+        return actions is None or action is None or action in actions
+
+    def allows_body(self, event: str | None, body: bytes) -> bool:
+        """
+        Cheap check of a raw delivery body without decoding it
+
+        Returns True when the action cannot be found at the start of the
+        body; the decoded payload is checked again with ``allows_payload``.
+        """
+        if self.allowed.get(event) is None:
+            return self.allows_event(event)
+        match = ACTION_PATTERN.match(body)
+        return self.allows(event, match.group(1).decode() if match else None)
+
+    def allows_payload(self, event: str | None, payload: dict[str, Any]) -> bool:
+        """Check a decoded payload"""
+        return self.allows(event, payload.get('action'))
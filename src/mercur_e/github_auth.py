@@ -3,94 +3,309 @@ GitHub App Authentication and API Client for MERCUR-E
 """
 import time
 import jwt
-import requests
-from github import Github, GithubIntegration
+from datetime import datetime
+from functools import cached_property
 from typing import Any
+from cryptography.hazmat.primitives.asymmetric.rsa import RSAPrivateKey
+from cryptography.hazmat.primitives.serialization import load_pem_private_key
 from loguru import logger
+from .cache import TTLCache
 from .config import settings
+from .github_client import GitHubClient, GitHubClientPool, GitHubAPIError
+from .http_cache import ResponseCache, SQLiteResponseStore
+from .ratelimit import RateLimitScheduler
+from .state import StateStore
+from .tokens import InstallationTokenManager
 
 
 class GitHubAppAuth:
     """Handle GitHub App authentication and token management"""
-    
+
+    JWT_LIFETIME = 10 * 60  # GitHub's maximum app JWT lifetime
+    JWT_CLOCK_SKEW = 60  # Backdate iat to tolerate clock drift
+    JWT_REFRESH_MARGIN = 60  # Re-sign this many seconds before expiry
+
     def __init__(self):
         self.app_id = settings.github_app_id
-        self.private_key = settings.get_private_key()
-        self.integration = GithubIntegration(self.app_id, self.private_key)
-        self._installation_tokens: dict[int, dict[str, Any]] = {}
-    
+        self._jwt: str | None = None
+        self._jwt_expires_at = 0.0
+        self.installation_ids = TTLCache(
+            maxsize=settings.installation_cache_size,
+            ttl=settings.installation_cache_ttl
+        )
+        # With several workers, the repository → installation map lives here
+        self.shared: StateStore | None = None
+        self.token_manager = InstallationTokenManager(
+            self._create_installation_token,
+            refresh_margin=settings.github_token_refresh_margin,
+            refresh_interval=settings.github_token_refresh_interval
+        )
+        self.response_cache = None
+        if settings.github_http_cache:
+            self.response_cache = ResponseCache(
+                maxsize=settings.github_http_cache_size,
+                max_entry_bytes=settings.github_http_cache_max_entry_bytes,
+                store=(
+                    SQLiteResponseStore(
+                        settings.github_http_cache_path,
+                        max_entries=settings.github_http_cache_size
+                    )
+                    if settings.github_http_cache_path else None
+                )
+            )
+        self.rate_limiter = RateLimitScheduler(
+            background_reserve=settings.ratelimit_background_reserve,
+            max_wait=settings.ratelimit_max_wait,
+            background_max_wait=settings.ratelimit_background_max_wait,
+            write_rate=settings.github_write_rate,
+            write_burst=settings.github_write_burst,
+            sync_interval=settings.ratelimit_sync_interval
+        )
+        self.client_pool = GitHubClientPool(
+            self.get_installation_token,
+            max_connections=settings.github_http_max_connections,
+            max_keepalive_connections=settings.github_http_max_keepalive,
+            keepalive_expiry=settings.github_http_keepalive_expiry,
+            idle_timeout=settings.github_http_idle_timeout,
+            http2=settings.github_http2,
+            cache=self.response_cache,
+            scheduler=self.rate_limiter
+        )
+
+    @cached_property
+    def private_key(self) -> RSAPrivateKey:
+        """GitHub App private key, read and parsed once on first use"""
+        return load_pem_private_key(settings.get_private_key().encode('utf-8'), password=None)
+
     def generate_jwt(self) -> str:
-        """Generate JWT for GitHub App authentication"""
+        """
+        Generate JWT for GitHub App authentication.
+        The signed token is reused until shortly before it expires.
+        """
         now = int(time.time())
+        if self._jwt is not None and self._jwt_expires_at - self.JWT_REFRESH_MARGIN > now:
+            return self._jwt
+
         payload = {
-            'iat': now,
-            'exp': now + (10 * 60),  # JWT expires in 10 minutes
+            'iat': now - self.JWT_CLOCK_SKEW,
+            'exp': now + self.JWT_LIFETIME - self.JWT_CLOCK_SKEW,
             'iss': self.app_id
         }
-        
+
         token = jwt.encode(
             payload,
             self.private_key,
             algorithm='RS256'
         )
-        
+
+        self._jwt = token
+        self._jwt_expires_at = payload['exp']
         return token
-    
-    def get_installation_token(self, installation_id: int) -> str:
+
+    def _app_headers(self) -> dict[str, str]:
+        """Headers for requests authenticated as the GitHub App itself"""
+        return {
+            'Authorization': f'Bearer {self.generate_jwt()}',
+            'Accept': 'application/vnd.github+json'
+        }
+
+    async def get_installation_token(self, installation_id: int) -> str:
         """
         Get installation access token for a specific installation.
-        Caches tokens and refreshes when expired.
+        Tokens are cached until shortly before GitHub's reported expiry.
         """
-        # Check if we have a cached token that's still valid
-        if installation_id in self._installation_tokens:
-            cached = self._installation_tokens[installation_id]
-            if cached['expires_at'] > time.time() + 60:  # 1 min buffer
-                return cached['token']
-        
-        # Get new token
+        return await self.token_manager.get(installation_id)
+
+    async def _create_installation_token(self, installation_id: int) -> tuple[str, float]:
+        """Mint a new installation token; returns the token and its expiry timestamp"""
         try:
-            token = self.integration.get_access_token(installation_id).token
-            
-            # Cache the token (GitHub tokens expire after 1 hour)
-            self._installation_tokens[installation_id] = {
-                'token': token,
-                'expires_at': time.time() + (60 * 60)  # 1 hour
-            }
-            
+            response = await self.client_pool.app_session.post(
+                f'/app/installations/{installation_id}/access_tokens',
+                headers=self._app_headers()
+            )
+
+            if response.status_code != 201:
+                raise GitHubAPIError(response.status_code, response.text, response)
+
+            data = response.json()
+            expires_at = datetime.fromisoformat(
+                data['expires_at'].replace('Z', '+00:00')
+            ).timestamp()
+
             logger.info(f"Generated new installation token for installation {installation_id}")
-            return token
-            
+            return data['token'], expires_at
+
         except Exception as e:
             logger.error(f"Failed to get installation token: {e}")
             raise
-    
-    def get_github_client(self, installation_id: int) -> Github:
-        """Get authenticated GitHub client for an installation"""
-        token = self.get_installation_token(installation_id)
-        return Github(token)
-    
-    def get_installation_id_for_repo(self, owner: str, repo: str) -> Optional[int]:
-        """Get installation ID for a specific repository"""
+
+    def _app_client(self) -> GitHubClient:
+        """Client authenticated as the GitHub App (JWT), sharing the app session"""
+        return GitHubClient(
+            self.generate_jwt(),
+            http=self.client_pool.app_session,
+            auth_scheme='Bearer'
+        )
+
+    async def get_github_client(self, installation_id: int) -> GitHubClient:
+        """Get the pooled, authenticated GitHub client for an installation"""
+        return await self.client_pool.get(installation_id)
+
+    def start(self, shared: StateStore | None = None) -> None:
+        """
+        Start background token refresh
+
+        Args:
+            shared: State store shared with other worker processes, if any
+        """
+        self.shared = shared
+        self.token_manager.shared = shared
+        self.rate_limiter.shared = shared
+        self.token_manager.start()
+
+    async def close(self) -> None:
+        """Stop background work and close pooled HTTP sessions"""
+        await self.token_manager.stop()
+        await self.client_pool.aclose()
+        if self.response_cache is not None:
+            self.response_cache.close()
+
+    async def get_installation_id_for_repo(self, owner: str, repo: str) -> int | None:
+        """Get installation ID for a specific repository, using the cache when possible"""
+        key = f"{owner}/{repo}".lower()
+        installation_id = await self._cached_installation(key)
+        if installation_id is not None:
+            return installation_id
+
         try:
-            jwt_token = self.generate_jwt()
-            headers = {
-                'Authorization': f'Bearer {jwt_token}',
-                'Accept': 'application/vnd.github.v3+json'
-            }
-            
-            url = f'https://api.github.com/repos/{owner}/{repo}/installation'
-            response = requests.get(url, headers=headers)
-            
+            response = await self.client_pool.app_session.get(
+                f'/repos/{owner}/{repo}/installation',
+                headers=self._app_headers()
+            )
+
             if response.status_code == 200:
-                return response.json()['id']
+                installation_id = response.json()['id']
+                await self.remember_installation(key, installation_id)
+                return installation_id
             else:
                 logger.error(f"Failed to get installation ID: {response.status_code}")
                 return None
-                
+
         except Exception as e:
             logger.error(f"Error getting installation ID: {e}")
             return None
 
+    async def _cached_installation(self, key: str) -> int | None:
+        # The shared map is authoritative: another worker may have seen the repository removed
+        if self.shared is not None:
+            try:
+                raw = await self.shared.get(f"installation:{key}")
+                return int(raw) if raw is not None else None
+            except Exception as e:
+                logger.warning(f"Shared installation lookup failed for {key}: {e}")
+        return self.installation_ids.get(key)
+
+    async def remember_installation(self, full_name: str, installation_id: int) -> None:
+        """Record which installation a repository belongs to"""
+        key = full_name.lower()
+        known = self.installation_ids.peek(key) == installation_id
+        self.installation_ids.set(key, installation_id)
+        # Every event carries the mapping; only publish it when it is news to this worker
+        if self.shared is not None and not known:
+            try:
+                await self.shared.set(
+                    f"installation:{key}",
+                    str(installation_id).encode(),
+                    settings.installation_cache_ttl
+                )
+            except Exception as e:
+                logger.warning(f"Shared installation store failed for {key}: {e}")
+
+    async def forget_repository(self, full_name: str) -> None:
+        """Drop a repository from the installation map of every worker"""
+        key = full_name.lower()
+        self.installation_ids.pop(key)
+        if self.shared is not None:
+            try:
+                await self.shared.delete(f"installation:{key}")
+            except Exception as e:
+                logger.warning(f"Shared installation removal failed for {key}: {e}")
+
+    async def forget_installation(
+        self,
+        installation_id: int,
+        repositories: list[dict[str, Any]] | None = None
+    ) -> None:
+        """Drop every cached repository of an installation and its token"""
+        names = {repository['full_name'].lower() for repository in repositories or []}
+        names.update(
+            key for key in self.installation_ids.keys()
+            if self.installation_ids.peek(key) == installation_id
+        )
+        for name in names:
+            await self.forget_repository(name)
+        self.token_manager.invalidate(installation_id)
+
+    async def handle_installation_event(self, event_type: str, payload: dict[str, Any]) -> None:
+        """
+        Keep the repository → installation cache fresh from webhook events
+
+        Args:
+            event_type: installation or installation_repositories
+            payload: Event payload
+        """
+        action = payload.get('action')
+        installation_id = payload['installation']['id']
+
+        if event_type == 'installation':
+            if action in ('deleted', 'suspend'):
+                await self.forget_installation(installation_id, payload.get('repositories'))
+                return
+            added, removed = payload.get('repositories') or [], []
+        else:
+            added = payload.get('repositories_added') or []
+            removed = payload.get('repositories_removed') or []
+
+        for repository in added:
+            await self.remember_installation(repository['full_name'], installation_id)
+        for repository in removed:
+            await self.forget_repository(repository['full_name'])
+
+        logger.info(
+            f"Installation {installation_id} {action}: "
+            f"{len(added)} repositories added, {len(removed)} removed"
+        )
+
+    async def discover_installations(self) -> int:
+        """
+        Pre-warm the repository → installation cache by listing every
+        installation of the app and the repositories it can access.
+
+        Returns:
+            Number of repositories cached
+        """
+        count = 0
+        try:
+            installations = [
+                installation
+                async for installation in self._app_client().paginate('/app/installations')
+            ]
+            for installation in installations:
+                installation_id = installation['id']
+                gh = await self.get_github_client(installation_id)
+                repositories = gh.paginate('/installation/repositories', item_key='repositories')
+                async for repository in repositories:
+                    await self.remember_installation(repository['full_name'], installation_id)
+                    count += 1
+
+            logger.info(
+                f"Discovered {count} repositories across {len(installations)} installation(s)"
+            )
+        except Exception as e:
+            logger.error(f"Installation discovery failed: {e}")
+
+        return count
+
 
 # Global auth instance
 github_auth = GitHubAppAuth()
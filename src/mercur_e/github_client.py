@@ -0,0 +1,513 @@
+"""
+Asyncio-native GitHub REST and GraphQL API client for MERCUR-E
+"""
+import time
+import importlib.util
+from typing import Any, AsyncIterator, Awaitable, Callable
+import httpx
+from loguru import logger
+from .http_cache import ResponseCache
+from .metrics import GITHUB_REQUEST_SECONDS, GITHUB_REQUESTS, normalize_route
+from .profiling import record_phase
+from .ratelimit import RateLimitExceeded, RateLimitScheduler
+from .tracing import tracer
+
+
+GITHUB_API_URL = "https://api.github.com"
+GITHUB_API_VERSION = "2022-11-28"
+
+# HTTP statuses reported for GraphQL errors, which GitHub returns with 200
+GRAPHQL_ERROR_STATUS = {
+    'NOT_FOUND': 404,
+    'FORBIDDEN': 403,
+    'RATE_LIMITED': 429
+}
+
+# HTTP/2 needs the optional h2 package (pip install "httpx[http2]")
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+class GitHubAPIError(Exception):
+    """Raised when the GitHub API returns an error response"""
+
+    def __init__(self, status_code: int, message: str, response: httpx.Response | None = None):
+        super().__init__(f"GitHub API error {status_code}: {message}")
+        self.status_code = status_code
+        self.message = message
+        self.response = response
+
+
+def is_transient_error(exc: Exception) -> bool:
+    """Whether a failed GitHub call is worth retrying later"""
+    if isinstance(exc, (httpx.TransportError, RateLimitExceeded)):
+        return True
+    if isinstance(exc, GitHubAPIError):
+        if exc.status_code >= 500 or exc.status_code == 429:
+            return True
+        if exc.status_code == 403 and exc.response is not None:
+            # Primary and secondary rate limits are reported as 403
+            return (
+                exc.response.headers.get('x-ratelimit-remaining') == '0'
+                or 'retry-after' in exc.response.headers
+            )
+    return False
+
+
+class GitHubClient:
+    """
+    Async GitHub REST client authenticated as a single installation.
+
+    Responses are returned as plain JSON dictionaries. The underlying
+    httpx session is only closed by this client when it created it.
+    When a ResponseCache is given, GET requests are revalidated with
+    conditional headers and 304 answers are served from the cache. When a
+    RateLimitScheduler is given, requests are admitted against the
+    installation's remaining quota. ``scope`` identifies the installation
+    for both.
+    """
+
+    def __init__(
+        self,
+        token: str,
+        http: httpx.AsyncClient | None = None,
+        base_url: str = GITHUB_API_URL,
+        timeout: float = 30.0,
+        auth_scheme: str = "token",
+        cache: ResponseCache | None = None,
+        scheduler: RateLimitScheduler | None = None,
+        scope: Any = None
+    ):
+        self.token = token
+        self.auth_scheme = auth_scheme
+        self.cache = cache
+        self.scheduler = scheduler
+        self.scope = scope
+        self.base_url = base_url.rstrip('/')
+        # GitHub Enterprise serves REST under /api/v3 and GraphQL under /api/graphql
+        if self.base_url.endswith('/api/v3'):
+            self.graphql_url = f"{self.base_url[:-len('/v3')]}/graphql"
+        else:
+            self.graphql_url = f"{self.base_url}/graphql"
+        self._owns_http = http is None
+        self._http = http or httpx.AsyncClient(base_url=self.base_url, timeout=timeout)
+        # Requests in progress and when the last one ended; pools only evict idle clients
+        self.in_flight = 0
+        self.last_used = time.monotonic()
+
+    async def __aenter__(self) -> "GitHubClient":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """Close the HTTP session if this client owns it"""
+        if self._owns_http:
+            await self._http.aclose()
+
+    def _headers(self, extra: dict[str, str] | None = None) -> dict[str, str]:
+        headers = {
+            'Authorization': f'{self.auth_scheme} {self.token}',
+            'Accept': 'application/vnd.github+json',
+            'X-GitHub-Api-Version': GITHUB_API_VERSION,
+        }
+        if extra:
+            headers.update(extra)
+        return headers
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        params: dict[str, Any] | None = None,
+        json: Any = None,
+        headers: dict[str, str] | None = None
+    ) -> httpx.Response:
+        """
+        Send a request to the GitHub API
+
+        Args:
+            method: HTTP method
+            path: API path (e.g. /repos/{owner}/{repo}) or absolute URL
+            params: Query string parameters
+            json: JSON request body
+            headers: Additional request headers
+
+        Returns:
+            The httpx response
+
+        Raises:
+            GitHubAPIError: If GitHub responds with a 4xx/5xx status
+        """
+        url = path if path.startswith('http') else f"{self.base_url}{path}"
+        request = self._http.build_request(
+            method,
+            url,
+            params=params,
+            json=json,
+            headers=self._headers(headers)
+        )
+
+        cache_key = cached = None
+        if method == 'GET' and self.cache is not None:
+            cache_key = self.cache.key(self.scope, request.url)
+            cached = await self.cache.lookup(cache_key)
+            if cached is not None:
+                request.headers.update(cached.conditional_headers())
+
+        response = await self._send(request)
+
+        if cache_key is not None:
+            if response.status_code == 304 and cached is not None:
+                self.cache.record_hit(cached)
+                return cached.to_response(response)
+            if response.status_code == 200:
+                self.cache.record_miss()
+                await self.cache.update(cache_key, response)
+
+        if response.status_code >= 400:
+            try:
+                message = response.json().get('message', response.text)
+            except ValueError:
+                message = response.text
+            logger.warning("{} {} failed with {}: {}", method, path, response.status_code, message)
+            raise GitHubAPIError(response.status_code, message, response)
+
+        return response
+
+    async def _send(self, request: httpx.Request) -> httpx.Response:
+        """Send a request, marking the client busy so a pool does not close it meanwhile"""
+        route = normalize_route(request.url.path)
+        start = time.perf_counter()
+        self.in_flight += 1
+        try:
+            return await self._send_traced(request, route, start)
+        finally:
+            self.in_flight -= 1
+            self.last_used = time.monotonic()
+
+    async def _send_traced(
+        self,
+        request: httpx.Request,
+        route: str,
+        start: float
+    ) -> httpx.Response:
+        """Send a request, recording its latency, status and trace span by route"""
+        with tracer.span(
+            f"{request.method} {route}",
+            kind='client',
+            attributes={'http.request.method': request.method, 'http.route': route}
+        ) as span:
+            try:
+                response = await self._send_scheduled(request)
+            except Exception:
+                GITHUB_REQUESTS.inc(request.method, route, 'error')
+                raise
+            finally:
+                elapsed = time.perf_counter() - start
+                GITHUB_REQUEST_SECONDS.observe(elapsed, request.method, route)
+                record_phase('github_api', elapsed)
+            GITHUB_REQUESTS.inc(request.method, route, str(response.status_code))
+            span.set_attribute('http.response.status_code', response.status_code)
+            remaining = response.headers.get('x-ratelimit-remaining')
+            if remaining is not None:
+                span.set_attribute('github.ratelimit.remaining', int(remaining))
+        return response
+
+    async def _send_scheduled(self, request: httpx.Request) -> httpx.Response:
+        """Send a request through the rate-limit scheduler"""
+        if self.scheduler is None:
+            return await self._http.send(request)
+
+        resource = 'graphql' if request.url.path.endswith('/graphql') else 'core'
+        await self.scheduler.acquire(self.scope, request.method, resource)
+        response = await self._http.send(request)
+        self.scheduler.update(self.scope, response, resource)
+
+        # Secondary rate limit: wait out Retry-After once, if the priority allows it
+        if self.scheduler.retry_delay(self.scope, response, resource) is not None:
+            await self.scheduler.acquire(self.scope, request.method, resource)
+            response = await self._http.send(request)
+            self.scheduler.update(self.scope, response, resource)
+
+        return response
+
+    async def get_json(self, path: str, params: dict[str, Any] | None = None) -> Any:
+        """GET a path and return the decoded JSON body"""
+        response = await self.request('GET', path, params=params)
+        return response.json()
+
+    async def graphql(self, query: str, variables: dict[str, Any] | None = None) -> dict[str, Any]:
+        """
+        Run a GraphQL query
+
+        Args:
+            query: GraphQL query document
+            variables: Query variables
+
+        Returns:
+            The ``data`` object of the response
+
+        Raises:
+            GitHubAPIError: If the request fails or GitHub reports query errors
+        """
+        response = await self.request(
+            'POST',
+            self.graphql_url,
+            json={'query': query, 'variables': variables or {}}
+        )
+        payload = response.json()
+
+        errors = payload.get('errors')
+        if errors:
+            message = '; '.join(error.get('message', 'unknown error') for error in errors)
+            status_code = GRAPHQL_ERROR_STATUS.get(errors[0].get('type'), 400)
+            logger.warning("GraphQL query failed: {}", message)
+            raise GitHubAPIError(status_code, message, response)
+
+        return payload['data']
+
+    async def paginate(
+        self,
+        path: str,
+        params: dict[str, Any] | None = None,
+        item_key: str | None = None,
+        per_page: int = 100
+    ) -> AsyncIterator[dict[str, Any]]:
+        """
+        Iterate over every item of a paginated list endpoint
+
+        Args:
+            path: API path of the list endpoint
+            params: Query string parameters
+            item_key: Key holding the items when the endpoint wraps them in an object
+            per_page: Page size requested from GitHub
+        """
+        url: str | None = path
+        page_params = {**(params or {}), 'per_page': per_page}
+
+        while url:
+            response = await self.request('GET', url, params=page_params)
+            data = response.json()
+            items = data[item_key] if item_key else data
+            for item in items:
+                yield item
+
+            # Follow the Link header; the next URL already carries the query string
+            url = response.links.get('next', {}).get('url')
+            page_params = None
+
+    # Repositories
+
+    async def get_repo(self, full_name: str) -> dict[str, Any]:
+        """Get a repository by its owner/name"""
+        return await self.get_json(f"/repos/{full_name}")
+
+    # Issues and pull requests
+
+    async def get_issue(self, full_name: str, number: int) -> dict[str, Any]:
+        """Get an issue"""
+        return await self.get_json(f"/repos/{full_name}/issues/{number}")
+
+    async def get_pull(self, full_name: str, number: int) -> dict[str, Any]:
+        """Get a pull request"""
+        return await self.get_json(f"/repos/{full_name}/pulls/{number}")
+
+    async def create_comment(self, full_name: str, number: int, body: str) -> dict[str, Any]:
+        """Create a comment on an issue or pull request"""
+        response = await self.request(
+            'POST',
+            f"/repos/{full_name}/issues/{number}/comments",
+            json={'body': body}
+        )
+        return response.json()
+
+    async def merge_pull(
+        self,
+        full_name: str,
+        number: int,
+        merge_method: str = "merge",
+        commit_title: str | None = None,
+        commit_message: str | None = None
+    ) -> dict[str, Any]:
+        """Merge a pull request"""
+        body: dict[str, Any] = {'merge_method': merge_method}
+        if commit_title is not None:
+            body['commit_title'] = commit_title
+        if commit_message is not None:
+            body['commit_message'] = commit_message
+
+        response = await self.request('PUT', f"/repos/{full_name}/pulls/{number}/merge", json=body)
+        return response.json()
+
+    # Statuses
+
+    async def get_combined_status(self, full_name: str, ref: str) -> dict[str, Any]:
+        """Get the combined commit status for a ref"""
+        return await self.get_json(f"/repos/{full_name}/commits/{ref}/status")
+
+    async def get_check_runs(self, full_name: str, ref: str) -> list[dict[str, Any]]:
+        """Get the check runs of a ref (first 100, which covers the overall state)"""
+        data = await self.get_json(
+            f"/repos/{full_name}/commits/{ref}/check-runs",
+            params={'per_page': 100}
+        )
+        return data.get('check_runs', [])
+
+    # Actions
+
+    async def get_workflows(self, full_name: str) -> list[dict[str, Any]]:
+        """Get every workflow of a repository"""
+        return [
+            workflow async for workflow in self.paginate(
+                f"/repos/{full_name}/actions/workflows",
+                item_key='workflows'
+            )
+        ]
+
+    async def create_workflow_dispatch(
+        self,
+        full_name: str,
+        workflow_id: int | str,
+        ref: str,
+        inputs: dict[str, Any] | None = None
+    ) -> bool:
+        """Trigger a workflow_dispatch event; returns True when GitHub accepted it"""
+        response = await self.request(
+            'POST',
+            f"/repos/{full_name}/actions/workflows/{workflow_id}/dispatches",
+            json={'ref': ref, 'inputs': inputs or {}}
+        )
+        return response.status_code == 204
+
+    async def get_workflow_runs(self, full_name: str, limit: int = 10) -> list[dict[str, Any]]:
+        """Get the most recent workflow runs of a repository"""
+        data = await self.get_json(
+            f"/repos/{full_name}/actions/runs",
+            params={'per_page': limit}
+        )
+        return data.get('workflow_runs', [])[:limit]
+
+
+class GitHubClientPool:
+    """
+    Pool of keep-alive GitHub clients keyed by installation ID.
+
+    Each installation gets its own httpx session so connections to
+    api.github.com are reused across events. When the installation token
+    rotates, the pooled client is updated in place instead of rebuilt.
+    Sessions idle for longer than ``idle_timeout`` seconds are closed.
+    """
+
+    def __init__(
+        self,
+        token_provider: Callable[[int], Awaitable[str]],
+        base_url: str = GITHUB_API_URL,
+        max_connections: int = 20,
+        max_keepalive_connections: int = 10,
+        keepalive_expiry: float = 30.0,
+        idle_timeout: float = 300.0,
+        http2: bool = True,
+        timeout: float = 30.0,
+        cache: ResponseCache | None = None,
+        scheduler: RateLimitScheduler | None = None,
+        transport: httpx.AsyncBaseTransport | None = None
+    ):
+        self.token_provider = token_provider
+        self.cache = cache
+        self.scheduler = scheduler
+        self.base_url = base_url
+        self.idle_timeout = idle_timeout
+        self.http2 = http2 and HTTP2_AVAILABLE
+        self.timeout = timeout
+        # Replaces the network, e.g. with an httpx.MockTransport in benchmarks
+        self.transport = transport
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        )
+        self._clients: dict[int, GitHubClient] = {}
+        self._app_session: httpx.AsyncClient | None = None
+
+        if http2 and not HTTP2_AVAILABLE:
+            logger.debug("h2 package not installed; GitHub API sessions will use HTTP/1.1")
+
+    def new_session(self) -> httpx.AsyncClient:
+        """Create an httpx session with the pool's connection settings"""
+        return httpx.AsyncClient(
+            base_url=self.base_url,
+            limits=self.limits,
+            http2=self.http2,
+            timeout=self.timeout,
+            transport=self.transport
+        )
+
+    @property
+    def app_session(self) -> httpx.AsyncClient:
+        """Shared session for requests authenticated as the GitHub App"""
+        if self._app_session is None or self._app_session.is_closed:
+            self._app_session = self.new_session()
+        return self._app_session
+
+    async def get(self, installation_id: int) -> GitHubClient:
+        """
+        Get the pooled client for an installation
+
+        Args:
+            installation_id: GitHub App installation ID
+
+        Returns:
+            A client whose token is valid for the installation
+        """
+        await self.evict_idle()
+        token = await self.token_provider(installation_id)
+
+        client = self._clients.get(installation_id)
+        if client is None:
+            client = GitHubClient(
+                token,
+                http=self.new_session(),
+                base_url=self.base_url,
+                cache=self.cache,
+                scheduler=self.scheduler,
+                scope=installation_id
+            )
+            self._clients[installation_id] = client
+            logger.debug("Opened GitHub session for installation {}", installation_id)
+        elif client.token != token:
+            # Token rotated: keep the warm connections, swap the credentials
+            client.token = token
+
+        client.last_used = time.monotonic()
+        return client
+
+    async def evict_idle(self) -> int:
+        """Close sessions with no request in flight and none within the idle timeout"""
+        cutoff = time.monotonic() - self.idle_timeout
+        idle = [
+            iid for iid, client in self._clients.items()
+            if client.in_flight == 0 and client.last_used < cutoff
+        ]
+
+        for installation_id in idle:
+            await self._close(installation_id)
+            logger.debug("Evicted idle GitHub session for installation {}", installation_id)
+
+        return len(idle)
+
+    async def _close(self, installation_id: int) -> None:
+        client = self._clients.pop(installation_id, None)
+        if client is not None:
+            await client._http.aclose()
+
+    async def aclose(self) -> None:
+        """Close every pooled session"""
+        for installation_id in list(self._clients):
+            await self._close(installation_id)
+        if self._app_session is not None:
+            await self._app_session.aclose()
+            self._app_session = None
+
+    def __len__(self) -> int:
+        return len(self._clients)
@@ -0,0 +1,196 @@
+"""
+Conditional-request response cache for GitHub REST reads
+
+GET responses carrying an ETag or Last-Modified header are stored, and
+later requests for the same URL send If-None-Match / If-Modified-Since.
+GitHub answers unchanged resources with 304, which does not count
+against the rate limit, and the cached body is served instead.
+"""
+import asyncio
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any
+import httpx
+from .cache import TTLCache
+from .state import open_private_database
+
+
+@dataclass
+class CachedResponse:
+    """Validators and body of a cached GET response"""
+    etag: str | None
+    last_modified: str | None
+    body: bytes
+    content_type: str | None = None
+    link: str | None = None
+
+    def conditional_headers(self) -> dict[str, str]:
+        """Request headers that revalidate this entry"""
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+    def to_response(self, not_modified: httpx.Response) -> httpx.Response:
+        """Rebuild a 200 response from the cache for a 304 answer"""
+        headers = dict(not_modified.headers)
+        if self.content_type:
+            headers['content-type'] = self.content_type
+        if self.link:
+            headers['link'] = self.link
+        headers.pop('content-length', None)
+        headers.pop('content-encoding', None)
+        return httpx.Response(200, headers=headers, content=self.body, request=not_modified.request)
+
+
+class SQLiteResponseStore:
+    """
+    On-disk second tier for the response cache.
+
+    Holds at most ``max_entries`` responses; the least recently used are
+    pruned. ``stored_at`` is refreshed on every read, so it records last use.
+    """
+
+    PRUNE_EVERY = 100
+
+    def __init__(self, path: str, max_entries: int = 1000):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._writes = 0
+        # Cached bodies can hold private repository data; keep them from other users
+        self._conn = open_private_database(path)
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS http_cache ("
+            "key TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, body BLOB NOT NULL, "
+            "content_type TEXT, link TEXT, stored_at REAL NOT NULL)"
+        )
+        with self._lock:
+            self._prune()
+
+    def get(self, key: str) -> CachedResponse | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, last_modified, body, content_type, link "
+                "FROM http_cache WHERE key = ?",
+                (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE http_cache SET stored_at = ? WHERE key = ?", (time.time(), key)
+            )
+        return CachedResponse(row[0], row[1], bytes(row[2]), row[3], row[4])
+
+    def put(self, key: str, entry: CachedResponse) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO http_cache "
+                "(key, etag, last_modified, body, content_type, link, stored_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, entry.etag, entry.last_modified, entry.body,
+                 entry.content_type, entry.link, time.time())
+            )
+            self._writes += 1
+            if self._writes % self.PRUNE_EVERY == 0:
+                self._prune()
+
+    def _prune(self) -> None:
+        """Drop the least recently used entries beyond max_entries; call with the lock held"""
+        self._conn.execute(
+            "DELETE FROM http_cache WHERE key IN ("
+            "SELECT key FROM http_cache ORDER BY stored_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM http_cache").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class ResponseCache:
+    """
+    Two-tier (memory LRU, optional SQLite) store of validated GET responses.
+
+    Entries are keyed by the caller's scope (the installation ID, so
+    responses never leak between installations) and the full request URL.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1000,
+        max_entry_bytes: int = 1024 * 1024,
+        store: SQLiteResponseStore | None = None
+    ):
+        self._memory = TTLCache(maxsize=maxsize)
+        self.max_entry_bytes = max_entry_bytes
+        self.store = store
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+
+    @staticmethod
+    def key(scope: Any, url: httpx.URL | str) -> str:
+        return f"{scope}:{url}"
+
+    async def lookup(self, key: str) -> CachedResponse | None:
+        """Find a cached entry to revalidate"""
+        entry = self._memory.peek(key)
+        if entry is None and self.store is not None:
+            entry = await asyncio.to_thread(self.store.get, key)
+            if entry is not None:
+                self._memory.set(key, entry)
+        return entry
+
+    async def update(self, key: str, response: httpx.Response) -> None:
+        """Store a fresh 200 response if it carries validators"""
+        etag = response.headers.get('etag')
+        last_modified = response.headers.get('last-modified')
+        if not etag and not last_modified:
+            return
+
+        body = response.content
+        if len(body) > self.max_entry_bytes:
+            return
+
+        entry = CachedResponse(
+            etag,
+            last_modified,
+            body,
+            response.headers.get('content-type'),
+            response.headers.get('link')
+        )
+        self._memory.set(key, entry)
+        if self.store is not None:
+            await asyncio.to_thread(self.store.put, key, entry)
+
+    def record_hit(self, entry: CachedResponse) -> None:
+        """Count a 304 served from the cache"""
+        self.hits += 1
+        self.bytes_saved += len(entry.body)
+
+    def record_miss(self) -> None:
+        """Count a cacheable GET that had to be fetched in full"""
+        self.misses += 1
+
+    def stats(self) -> dict[str, Any]:
+        """Hit ratio and bytes saved"""
+        requests = self.hits + self.misses
+        return {
+            'entries': len(self._memory),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / requests, 4) if requests else 0.0,
+            'bytes_saved': self.bytes_saved
+        }
+
+    def close(self) -> None:
+        if self.store is not None:
+            self.store.close()
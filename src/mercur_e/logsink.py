@@ -0,0 +1,261 @@
+"""
+Non-blocking logging for MERCUR-E
+
+Log calls made on the event loop only format the record and put it on a
+bounded buffer. A writer thread drains the buffer in batches and does the
+terminal and file I/O, including rotation. When the buffer is full,
+records are dropped and counted rather than blocking the caller.
+"""
+import atexit
+import glob
+import json
+import os
+import queue
+import sys
+import threading
+import time
+import traceback
+from datetime import datetime
+from typing import Any, Callable, TextIO
+from loguru import logger
+
+
+STDERR_FORMAT = (
+    "<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | "
+    "<cyan>{name}</cyan>:<cyan>{function}</cyan> - <level>{message}</level>"
+)
+FILE_FORMAT = "{time:YYYY-MM-DD HH:mm:ss.SSS} | {level: <8} | {name}:{function}:{line} - {message}"
+
+_STOP = object()
+
+
+def json_format(record: dict[str, Any]) -> str:
+    """loguru format function rendering a record as one JSON line"""
+    entry = {
+        'time': record['time'].isoformat(),
+        'level': record['level'].name,
+        'logger': record['name'],
+        'function': record['function'],
+        'line': record['line'],
+        'message': record['message']
+    }
+    extra = {key: value for key, value in record['extra'].items() if key != '_json'}
+    if extra:
+        entry['extra'] = extra
+    if record['exception'] is not None:
+        entry['exception'] = ''.join(traceback.format_exception(*record['exception']))
+
+    record['extra']['_json'] = json.dumps(entry, default=str)
+    return "{extra[_json]}\n"
+
+
+class RotatingFileWriter:
+    """
+    Log file rotated by size; rotated files are removed after ``retention_days``
+
+    Several worker processes can share the file: each reopens it when
+    another one has rotated it, so they keep appending to the same file.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        rotation_bytes: int = 10 * 1024 * 1024,
+        retention_days: float = 30.0
+    ):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self.rotation_bytes = rotation_bytes
+        self.retention_days = retention_days
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def __call__(self, lines: list[str]) -> None:
+        if self._rotated_elsewhere():
+            self._reopen()
+        self._file.write(''.join(lines))
+        self._file.flush()
+        if self._file.tell() >= self.rotation_bytes:
+            self._rotate()
+
+    def _rotated_elsewhere(self) -> bool:
+        """Whether the path no longer names the open file, e.g. another worker rotated it"""
+        try:
+            return os.stat(self.path).st_ino != os.fstat(self._file.fileno()).st_ino
+        except FileNotFoundError:
+            return True
+
+    def _reopen(self) -> None:
+        self._file.close()
+        self._file = open(self.path, 'a', encoding='utf-8')
+
+    def _rotate(self) -> None:
+        if self._rotated_elsewhere():
+            # Another worker rotated first; renaming now would move its new file
+            self._reopen()
+            return
+
+        self._file.close()
+        root, ext = os.path.splitext(self.path)
+        os.replace(self.path, f"{root}.{datetime.now():%Y-%m-%d_%H-%M-%S_%f}{ext}")
+        self._file = open(self.path, 'a', encoding='utf-8')
+
+        cutoff = time.time() - self.retention_days * 86400
+        for rotated in glob.glob(f"{glob.escape(root)}.*{ext}"):
+            if os.path.getmtime(rotated) < cutoff:
+                os.remove(rotated)
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def stream_writer(stream: TextIO) -> Callable[[list[str]], None]:
+    """Batch writer for a text stream such as stderr"""
+    def write(lines: list[str]) -> None:
+        stream.write(''.join(lines))
+        stream.flush()
+    return write
+
+
+class BufferedLogSink:
+    """
+    loguru sink that hands formatted records to a writer thread.
+
+    Args:
+        write: Called from the writer thread with a batch of formatted lines
+        name: Name reported in stats
+        maxsize: Records buffered before new ones are dropped
+        batch_size: Most records handed to ``write`` at once
+    """
+
+    def __init__(
+        self,
+        write: Callable[[list[str]], None],
+        name: str,
+        maxsize: int = 10000,
+        batch_size: int = 512
+    ):
+        self.write = write
+        self.name = name
+        self.batch_size = batch_size
+        self._queue: queue.Queue = queue.Queue(maxsize)
+        self.written = 0
+        self.dropped = 0
+        self.errors = 0
+        self._thread = threading.Thread(target=self._run, name=f"log-{name}", daemon=True)
+        self._thread.start()
+
+    def __call__(self, message: str) -> None:
+        try:
+            self._queue.put_nowait(str(message))
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            line = self._queue.get()
+            if line is _STOP:
+                return
+            batch = [line]
+            while len(batch) < self.batch_size:
+                try:
+                    line = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if line is _STOP:
+                    stopping = True
+                    break
+                batch.append(line)
+
+            try:
+                self.write(batch)
+                self.written += len(batch)
+            except Exception:
+                self.errors += 1
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Write out buffered records and stop the writer thread"""
+        if not self._thread.is_alive():
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+
+    def stats(self) -> dict[str, int | str]:
+        """Buffer and writer counters"""
+        return {
+            'sink': self.name,
+            'buffered': self._queue.qsize(),
+            'written': self.written,
+            'dropped': self.dropped,
+            'errors': self.errors
+        }
+
+
+def setup_logging(
+    level: str,
+    log_file: str | None,
+    json_lines: bool = False,
+    buffered: bool = True,
+    buffer_size: int = 10000
+) -> list[BufferedLogSink]:
+    """
+    Configure the stderr and file log sinks
+
+    Args:
+        level: Minimum level logged
+        log_file: Log file path, rotated at 10 MB and kept for 30 days
+        json_lines: Write one JSON object per record instead of text
+        buffered: Write from a background thread instead of the caller
+        buffer_size: Records buffered per sink before new ones are dropped
+
+    Returns:
+        The buffered sinks, for stats and shutdown
+    """
+    logger.remove()
+    sinks: list[BufferedLogSink] = []
+
+    if not buffered:
+        logger.add(
+            sys.stderr,
+            format=json_format if json_lines else STDERR_FORMAT,
+            level=level
+        )
+        if log_file:
+            logger.add(
+                log_file,
+                format=json_format if json_lines else FILE_FORMAT,
+                rotation="10 MB",
+                retention="30 days",
+                level=level
+            )
+        return sinks
+
+    stderr_sink = BufferedLogSink(stream_writer(sys.stderr), "stderr", maxsize=buffer_size)
+    logger.add(
+        stderr_sink,
+        format=json_format if json_lines else STDERR_FORMAT,
+        colorize=not json_lines and sys.stderr.isatty(),
+        level=level
+    )
+    sinks.append(stderr_sink)
+
+    if log_file:
+        file_sink = BufferedLogSink(RotatingFileWriter(log_file), "file", maxsize=buffer_size)
+        logger.add(
+            file_sink,
+            format=json_format if json_lines else FILE_FORMAT,
+            colorize=False,
+            level=level
+        )
+        sinks.append(file_sink)
+
+    # Flush what is still buffered when the process exits
+    for sink in sinks:
+        atexit.register(sink.stop)
+    return sinks
@@ -2,38 +2,129 @@
 MERCUR-E GitHub Bot - Main Application
 FastAPI server with webhook handling and AI integration
 """
-from fastapi import FastAPI, Request, HTTPException, Header, BackgroundTasks
+from fastapi import Depends, FastAPI, Request, HTTPException, Header, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import PlainTextResponse
+from fastapi.security import HTTPBasic, HTTPBasicCredentials
+from contextlib import asynccontextmanager
+import asyncio
+import threading
+import time
 from typing import Any
-import json
 from loguru import logger
-import sys
 
 from .config import settings
-from .security import verify_webhook_signature, verify_webhook_signature_sha1
+from .security import pam_auth, webhook_verifier
+from .payloads import json_response_class, loads, looks_like_json_object, read_body
 from .github_auth import github_auth
+from .github_client import GitHubClient, is_transient_error
+from .dedup import DeliveryDeduplicator, SQLiteDeliveryStore
+from .events import EventFilter
+from .logsink import setup_logging
+from .profiling import SamplingProfiler, record_phase, track_phases
+from .tracing import create_span_exporter, trace_id_for_delivery, tracer
+from .metrics import (
+    CONTENT_TYPE as METRICS_CONTENT_TYPE,
+    LOG_RECORDS_DROPPED,
+    RATELIMIT_LIMIT,
+    RATELIMIT_REMAINING,
+    TOKEN_HIT_RATIO,
+    TOKEN_LOOKUPS,
+    WEBHOOK_DELIVERIES,
+    WEBHOOK_PHASE_SECONDS,
+    WEBHOOK_QUEUE_DEPTH,
+    registry as metrics_registry,
+)
+from .state import create_state_store
+from .status import head_status_cache
+from .workflows import workflow_indexes
+from .webhook_queue import QueueFullError, WebhookWorkerPool, create_webhook_queue
 from .commands import CommandHandler, CommandParser
+from .models import Issue, PullRequest, Repository
 
 # Configure logging
-logger.remove()
-logger.add(
-    sys.stderr,
-    format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan> - <level>{message}</level>",
-    level=settings.log_level
-)
-logger.add(
+log_sinks = setup_logging(
+    settings.log_level,
     settings.log_file,
-    rotation="10 MB",
-    retention="30 days",
-    level=settings.log_level
+    json_lines=settings.log_format == "json",
+    buffered=settings.log_async,
+    buffer_size=settings.log_buffer_size
 )
 
+tracer.configure(
+    create_span_exporter(
+        settings.trace_exporter, settings.trace_file, settings.trace_otlp_endpoint
+    ),
+    settings.trace_sample_rate
+)
+
+event_filter = EventFilter(settings.webhook_events)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Application startup and shutdown"""
+    queue = create_webhook_queue(
+        settings.webhook_queue_backend,
+        settings.webhook_queue_path,
+        max_depth=settings.webhook_queue_max_depth
+    )
+    workers = WebhookWorkerPool(
+        queue,
+        process_queued_delivery,
+        workers=settings.webhook_workers,
+        max_attempts=settings.webhook_max_attempts,
+        backoff_base=settings.webhook_retry_backoff,
+        backoff_max=settings.webhook_retry_backoff_max,
+        is_retryable=is_transient_error
+    )
+    dedup_store = None
+    if settings.webhook_dedup_path:
+        dedup_store = SQLiteDeliveryStore(settings.webhook_dedup_path, settings.webhook_dedup_ttl)
+    app.state.webhook_queue = queue
+    app.state.webhook_workers = workers
+    shared_state = None
+    backend = settings.state_backend
+    if backend == "auto":
+        backend = "sqlite" if settings.workers > 1 else "none"
+    if backend != "none":
+        shared_state = create_state_store(backend, settings.state_path, settings.state_redis_url)
+    app.state.deduplicator = DeliveryDeduplicator(
+        maxsize=settings.webhook_dedup_size,
+        ttl=settings.webhook_dedup_ttl,
+        store=dedup_store,
+        shared=shared_state
+    )
+    github_auth.start(shared_state)
+    workflow_indexes.shared = shared_state
+    head_status_cache.shared = shared_state
+    workers.start()
+    
+    # Pre-warm the repository → installation cache without delaying startup
+    discovery = None
+    if settings.installation_discovery and settings.github_app_id:
+        discovery = asyncio.create_task(github_auth.discover_installations())
+    
+    yield
+    
+    if discovery is not None:
+        discovery.cancel()
+    await workers.stop()
+    await queue.close()
+    app.state.deduplicator.close()
+    await github_auth.close()
+    workflow_indexes.shared = head_status_cache.shared = None
+    if shared_state is not None:
+        await shared_state.close()
+
+
 # Initialize FastAPI app
 app = FastAPI(
     title="MERCUR-E GitHub Bot",
     description="AI-powered GitHub App for repository automation",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=json_response_class
 )
 
 # Configure CORS
@@ -68,49 +159,76 @@ async def health_check():
     }
 
 
-async def process_webhook_event(event_type: str, payload: Dict[str, Any]):
+async def process_queued_delivery(event_type: str, body: bytes):
+    """Decode a queued delivery and process it"""
+    with track_phases(f"{event_type} delivery processing", settings.slow_webhook_threshold), \
+            WEBHOOK_PHASE_SECONDS.time('process'):
+        started = time.perf_counter()
+        payload = loads(body)
+        _observe_phase('parse', started)
+        await process_webhook_event(event_type, payload)
+
+
+async def process_webhook_event(event_type: str, payload: dict[str, Any]):
     """
     Process GitHub webhook events
     
     Args:
         event_type: Type of GitHub event
         payload: Event payload
+    
+    Raises:
+        Exception: Any processing error, so the queue can retry or dead-letter it
     """
-    try:
-        logger.info(f"Processing {event_type} event")
-        
-        # Extract common information
-        repository = payload.get('repository', {})
-        repo_name = repository.get('full_name', 'unknown')
-        installation_id = payload.get('installation', {}).get('id')
-        
-        if not installation_id:
-            logger.warning(f"No installation ID found in {event_type} event")
-            return
-        
-        # Get GitHub client
-        gh = github_auth.get_github_client(installation_id)
-        repo = gh.get_repo(repo_name)
-        
-        # Handle different event types
-        if event_type == 'issue_comment':
-            await handle_issue_comment(payload, gh, repo)
-        elif event_type == 'pull_request':
-            await handle_pull_request(payload, gh, repo)
-        elif event_type == 'push':
-            await handle_push(payload, gh, repo)
-        else:
-            logger.info(f"Event type {event_type} not handled")
+    with tracer.span("process_webhook_event", attributes={'event': event_type}):
+        try:
+            logger.info("Processing {} event", event_type)
             
-    except Exception as e:
-        logger.error(f"Error processing webhook event: {e}", exc_info=True)
+            # Extract common information
+            repository = payload.get('repository', {})
+            repo_name = repository.get('full_name', 'unknown')
+            installation_id = payload.get('installation', {}).get('id')
+            
+            if not installation_id:
+                logger.warning("No installation ID found in {} event", event_type)
+                return
+            
+            if not event_filter.allows_payload(event_type, payload):
+                logger.debug("Ignoring {}.{} event", event_type, payload.get('action'))
+                return
+            
+            if event_type in ('installation', 'installation_repositories'):
+                await github_auth.handle_installation_event(event_type, payload)
+                return
+            
+            await github_auth.remember_installation(repo_name, installation_id)
+            
+            # The payload carries the repository; no need to fetch it
+            repo = Repository(repository)
+            
+            # Get GitHub client
+            async with await github_auth.get_github_client(installation_id) as gh:
+                
+                # Handle different event types
+                if event_type == 'issue_comment':
+                    await handle_issue_comment(payload, gh, repo)
+                elif event_type == 'pull_request':
+                    await handle_pull_request(payload, gh, repo)
+                elif event_type == 'push':
+                    await handle_push(payload, gh, repo)
+                else:
+                    logger.info("Event type {} not handled", event_type)
+                
+        except Exception as e:
+            logger.error(f"Error processing webhook event: {e}")
+            raise
 
 
-async def handle_issue_comment(payload: Dict[str, Any], gh, repo):
+async def handle_issue_comment(payload: dict[str, Any], gh: GitHubClient, repo: Repository):
     """Handle issue_comment events"""
     action = payload.get('action')
     comment = payload.get('comment', {})
-    issue = payload.get('issue', {})
+    issue = Issue(payload.get('issue', {}))
     
     # Only process created comments
     if action != 'created':
@@ -119,7 +237,7 @@ async def handle_issue_comment(payload: Dict[str, Any], gh, repo):
     comment_body = comment.get('body', '')
     comment_author = comment.get('user', {}).get('login', 'unknown')
     
-    logger.info(f"Processing comment from {comment_author}: {comment_body[:50]}...")
+    logger.info("Processing comment from {}: {}...", comment_author, comment_body[:50])
     
     # Parse commands
     commands = CommandParser.parse_commands(comment_body)
@@ -128,64 +246,40 @@ async def handle_issue_comment(payload: Dict[str, Any], gh, repo):
         logger.info("No commands found in comment")
         return
     
-    logger.info(f"Found {len(commands)} command(s): {[c['command'] for c in commands]}")
-    
-    # Get PR or issue object
-    issue_number = issue.get('number')
-    is_pull_request = 'pull_request' in issue
+    logger.info("Found {} command(s): {}", len(commands), [c['command'] for c in commands])
     
-    if is_pull_request:
-        pr = repo.get_pull(issue_number)
+    # Work from the payload; commands fetch the full PR only if they need it
+    if issue.is_pull_request:
+        pr = PullRequest(issue.raw)
         issue_obj = None
     else:
         pr = None
-        issue_obj = repo.get_issue(issue_number)
+        issue_obj = issue
     
     # Create command handler
     handler = CommandHandler(gh, repo)
     
-    # Execute commands
-    results = []
-    for cmd in commands:
-        command = cmd['command']
-        args = cmd['args']
-        
-        logger.info(f"Executing command: /{command} {args}")
-        
-        if command == 'test':
-            result = await handler.handle_test_command(pr, issue_obj, args)
-        elif command == 'merge':
-            if not pr:
-                result = {'success': False, 'message': '❌ /merge can only be used on pull requests'}
-            else:
-                result = await handler.handle_merge_command(pr, args)
-        elif command == 'report':
-            result = await handler.handle_report_command(pr, issue_obj, args)
-        else:
-            result = {'success': False, 'message': f'❌ Unknown command: /{command}'}
-        
-        results.append(result)
-        
-        # Post result as comment
-        if pr:
-            pr.create_comment(result['message'])
-        elif issue_obj:
-            issue_obj.create_comment(result['message'])
-    
-    logger.info(f"Executed {len(results)} command(s)")
-
-
-async def handle_pull_request(payload: Dict[str, Any], gh, repo):
+    # Execute commands, then post every result in a single comment
+    results = await handler.run_commands(commands, pr, issue_obj)
+    logger.info("Executed {} command(s)", len(results))
+    
+    # Commands such as /test and /merge have side effects, so once they ran a
+    # failure to report them must not fail the delivery and re-run them on retry
+    try:
+        await gh.create_comment(repo.full_name, issue.number, handler.render_results(results))
+    except Exception as e:
+        logger.error("Failed to post command results on #{}: {}", issue.number, e)
+
+
+async def handle_pull_request(payload: dict[str, Any], gh: GitHubClient, repo: Repository):
     """Handle pull_request events"""
     action = payload.get('action')
-    pr_data = payload.get('pull_request', {})
-    pr_number = pr_data.get('number')
+    pr = PullRequest(payload.get('pull_request', {}))
     
-    logger.info(f"Pull request #{pr_number} action: {action}")
+    logger.info("Pull request #{} action: {}", pr.number, action)
     
     # Handle specific PR actions
     if action == 'opened':
-        pr = repo.get_pull(pr_number)
         welcome_message = (
             f"👋 Thanks for opening this pull request!\n\n"
             f"Available commands:\n"
@@ -193,66 +287,151 @@ async def handle_pull_request(payload: Dict[str, Any], gh, repo):
             f"- `/merge [method]` - Merge this PR (squash/merge/rebase)\n"
             f"- `/report` - Generate status report\n"
         )
-        pr.create_comment(welcome_message)
+        await gh.create_comment(repo.full_name, pr.number, welcome_message)
     
     elif action == 'synchronize':
         # PR was updated with new commits
-        logger.info(f"PR #{pr_number} synchronized with new commits")
+        logger.info("PR #{} synchronized with new commits", pr.number)
 
 
-async def handle_push(payload: Dict[str, Any], gh, repo):
+async def handle_push(payload: dict[str, Any], gh: GitHubClient, repo: Repository):
     """Handle push events"""
     ref = payload.get('ref', '')
     pusher = payload.get('pusher', {}).get('name', 'unknown')
     commits = payload.get('commits', [])
     
-    logger.info(f"Push to {ref} by {pusher} with {len(commits)} commit(s)")
+    logger.info("Push to {} by {} with {} commit(s)", ref, pusher, len(commits))
+    
+    await workflow_indexes.handle_push(repo.full_name, payload)
     
     # You can add custom logic here, e.g., auto-deploy on push to main
     if ref == f"refs/heads/{repo.default_branch}":
-        logger.info(f"Push to default branch {repo.default_branch}")
+        logger.info("Push to default branch {}", repo.default_branch)
+
+
+def _observe_phase(phase: str, started: float) -> float:
+    """Record the time since ``started`` for a webhook phase; returns now"""
+    now = time.perf_counter()
+    WEBHOOK_PHASE_SECONDS.observe(now - started, phase)
+    record_phase(phase, now - started)
+    return now
 
 
 @app.post("/webhook")
 async def webhook(
     request: Request,
-    background_tasks: BackgroundTasks,
-    x_hub_signature_256: Optional[str] = Header(None),
-    x_hub_signature: Optional[str] = Header(None),
-    x_github_event: Optional[str] = Header(None)
+    x_hub_signature_256: str | None = Header(None),
+    x_hub_signature: str | None = Header(None),
+    x_github_event: str | None = Header(None),
+    x_github_delivery: str | None = Header(None)
 ):
     """
     GitHub webhook endpoint
     
     Handles incoming webhook events from GitHub
     """
-    # Read raw body for signature verification
-    body = await request.body()
+    with tracer.start_trace(
+        "webhook",
+        trace_id_for_delivery(x_github_delivery),
+        kind="server",
+        attributes={"event": x_github_event or "", "delivery": x_github_delivery or ""}
+    ) as span, logger.contextualize(delivery=x_github_delivery), track_phases(
+        f"webhook {x_github_event} {x_github_delivery}", settings.slow_webhook_threshold
+    ):
+        response = await receive_webhook(
+            request,
+            x_github_event,
+            x_github_delivery,
+            x_hub_signature_256 or x_hub_signature
+        )
+        span.set_attribute("http.response.status_code", response.status_code)
+        return response
+
+
+async def receive_webhook(
+    request: Request,
+    x_github_event: str | None,
+    x_github_delivery: str | None,
+    signature: str | None
+):
+    """Read, verify and queue one webhook delivery"""
+    # Unhandled events are acknowledged from the header, before reading the body
+    if not event_filter.allows_event(x_github_event):
+        WEBHOOK_DELIVERIES.inc("other", "ignored")
+        return json_response_class(
+            status_code=202,
+            content={"status": "ignored", "event": x_github_event}
+        )
     
-    # Verify webhook signature
-    signature_valid = False
-    if x_hub_signature_256:
-        signature_valid = verify_webhook_signature(body, x_hub_signature_256)
-    elif x_hub_signature:
-        signature_valid = verify_webhook_signature_sha1(body, x_hub_signature)
+    # Stream the body with a size cap, feeding the signature HMAC as it arrives
+    verifier = webhook_verifier()
+    if verifier is None:
+        logger.error("Webhook secret not configured")
+    signature_check = verifier.start(signature) if verifier else None
+    started = time.perf_counter()
+    try:
+        body = await read_body(
+            request,
+            settings.webhook_max_body_size,
+            signature_check.update if signature_check is not None else None
+        )
+    except HTTPException:
+        WEBHOOK_DELIVERIES.inc(x_github_event, "too_large")
+        raise
+    phase_started = _observe_phase('read', started)
     
-    if not signature_valid:
+    # Unhandled actions are acknowledged without verifying or decoding them
+    if not event_filter.allows_body(x_github_event, body):
+        WEBHOOK_DELIVERIES.inc(x_github_event, "ignored")
+        return json_response_class(
+            status_code=202,
+            content={"status": "ignored", "event": x_github_event}
+        )
+    
+    # Verify webhook signature
+    verified = signature_check is not None and signature_check.verify(body)
+    phase_started = _observe_phase('verify', phase_started)
+    if not verified:
+        WEBHOOK_DELIVERIES.inc(x_github_event, "rejected")
         logger.warning("Invalid webhook signature")
         raise HTTPException(status_code=401, detail="Invalid signature")
     
-    # Parse JSON payload
-    try:
-        payload = json.loads(body)
-    except json.JSONDecodeError:
+    # Reject bodies that are not JSON objects; the worker decodes the payload
+    # once and dead-letters malformed JSON
+    if not looks_like_json_object(body):
+        WEBHOOK_DELIVERIES.inc(x_github_event, "invalid")
         raise HTTPException(status_code=400, detail="Invalid JSON")
     
+    # Skip redeliveries of events that were already accepted
+    deduplicator = request.app.state.deduplicator
+    if await deduplicator.check_and_mark(x_github_delivery):
+        WEBHOOK_DELIVERIES.inc(x_github_event, "duplicate")
+        logger.info("Ignoring duplicate delivery {}", x_github_delivery)
+        return json_response_class(
+            status_code=200,
+            content={"status": "duplicate", "event": x_github_event}
+        )
+    
     # Log event
-    logger.info(f"Received {x_github_event} event")
+    logger.info("Received {} event", x_github_event)
     
-    # Process event in background
-    background_tasks.add_task(process_webhook_event, x_github_event, payload)
+    # Persist the delivery before acknowledging it; workers process it
+    try:
+        await request.app.state.webhook_queue.put(x_github_event, body, x_github_delivery)
+    except QueueFullError:
+        await deduplicator.forget(x_github_delivery)
+        WEBHOOK_DELIVERIES.inc(x_github_event, "queue_full")
+        logger.warning("Webhook queue is full, rejecting delivery")
+        raise HTTPException(status_code=503, detail="Webhook queue is full")
+    except BaseException:
+        # Not persisted: GitHub's redelivery must be accepted, not skipped as a duplicate
+        await deduplicator.forget(x_github_delivery)
+        raise
+    request.app.state.webhook_workers.notify()
+    _observe_phase('dispatch', phase_started)
+    WEBHOOK_DELIVERIES.inc(x_github_event, "accepted")
     
-    return JSONResponse(
+    return json_response_class(
         status_code=200,
         content={"status": "accepted", "event": x_github_event}
     )
@@ -264,7 +443,10 @@ async def parse_comment_api(request: Request):
     API endpoint to parse comments for commands
     Used by AI integration
     """
-    data = await request.json()
+    try:
+        data = loads(await read_body(request, settings.webhook_max_body_size))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid JSON")
     comment_text = data.get('comment', '')
     
     commands = CommandParser.parse_commands(comment_text)
@@ -277,20 +459,117 @@ async def parse_comment_api(request: Request):
 
 
 @app.get("/api/status")
-async def get_status():
+async def get_status(request: Request):
     """Get bot status and statistics"""
     return {
         "status": "operational",
+        "deduplication": request.app.state.deduplicator.stats(),
+        "installation_tokens": github_auth.token_manager.stats(),
+        "http_cache": github_auth.response_cache.stats() if github_auth.response_cache else None,
+        "rate_limits": github_auth.rate_limiter.stats(),
+        "logging": [sink.stats() for sink in log_sinks],
+        "tracing": tracer.stats(),
         "app_id": settings.github_app_id,
         "features": {
             "commands": ["test", "merge", "report"],
-            "events": ["issue_comment", "pull_request", "push"],
+            "events": event_filter.events,
             "ai_integration": settings.fastmcp_enabled,
             "pam_auth": settings.pam_enabled
         }
     }
 
 
+@app.get("/metrics")
+async def metrics(request: Request):
+    """Prometheus metrics of this worker process"""
+    if not settings.metrics_enabled:
+        raise HTTPException(status_code=404, detail="Not Found")
+    
+    # Values kept by other components are read at scrape time
+    WEBHOOK_QUEUE_DEPTH.set(await request.app.state.webhook_queue.depth())
+    tokens = github_auth.token_manager.stats()
+    TOKEN_LOOKUPS.set(tokens['hits'], 'hit')
+    TOKEN_LOOKUPS.set(tokens['misses'], 'miss')
+    TOKEN_HIT_RATIO.set(tokens['hit_ratio'])
+    RATELIMIT_REMAINING.clear()
+    RATELIMIT_LIMIT.clear()
+    for scope, resource, budget in github_auth.rate_limiter.budgets():
+        if budget.remaining is not None:
+            RATELIMIT_REMAINING.set(budget.remaining, str(scope), resource)
+        if budget.limit is not None:
+            RATELIMIT_LIMIT.set(budget.limit, str(scope), resource)
+    for sink in log_sinks:
+        LOG_RECORDS_DROPPED.set(sink.dropped, sink.name)
+    
+    return Response(metrics_registry.render(), media_type=METRICS_CONTENT_TYPE)
+
+
+admin_credentials = HTTPBasic(realm="MERCUR-E admin")
+profile_lock = asyncio.Lock()
+
+
+async def require_admin(credentials: HTTPBasicCredentials = Depends(admin_credentials)) -> str:
+    """HTTP Basic credentials checked against PAM; returns the user name"""
+    if not pam_auth.enabled:
+        raise HTTPException(status_code=403, detail="Admin endpoints require PAM authentication")
+    
+    # PAM conversations block, keep them off the event loop
+    authenticated = await asyncio.to_thread(
+        pam_auth.authenticate, credentials.username, credentials.password
+    )
+    if not authenticated:
+        raise HTTPException(
+            status_code=401,
+            detail="Invalid credentials",
+            headers={"WWW-Authenticate": "Basic"}
+        )
+    return credentials.username
+
+
+@app.get("/admin/profile")
+async def admin_profile(
+    seconds: float = 10.0,
+    interval: float = 0.005,
+    format: str = "collapsed",
+    threads: str = "loop",
+    user: str = Depends(require_admin)
+):
+    """
+    Sample the running server for a while and return the profile
+    
+    Args:
+        seconds: Sampling time, up to PROFILE_MAX_DURATION
+        interval: Seconds between samples
+        format: "collapsed" (flame graph input) or "speedscope"
+        threads: "loop" (the event loop thread) or "all"
+    """
+    if not 0 < seconds <= settings.profile_max_duration:
+        raise HTTPException(
+            status_code=400, detail=f"seconds must be in (0, {settings.profile_max_duration}]"
+        )
+    if interval < 0.001:
+        raise HTTPException(status_code=400, detail="interval must be at least 0.001")
+    if format not in ("collapsed", "speedscope") or threads not in ("loop", "all"):
+        raise HTTPException(status_code=400, detail="Unknown format or threads option")
+    if profile_lock.locked():
+        raise HTTPException(status_code=409, detail="A profile is already running")
+    
+    async with profile_lock:
+        logger.info("Profiling for {}s at {}s intervals, requested by {}", seconds, interval, user)
+        profiler = SamplingProfiler(
+            interval,
+            thread_ids={threading.get_ident()} if threads == "loop" else None
+        )
+        await asyncio.to_thread(profiler.run, seconds)
+    
+    if format == "speedscope":
+        return json_response_class(
+            content=profiler.speedscope(f"MERCUR-E {seconds:g}s profile"),
+            headers={"Content-Disposition": 'attachment; filename="mercur-e.speedscope.json"'}
+        )
+    return PlainTextResponse(profiler.collapsed())
+
+
 def main():
     """Main entry point for the application"""
     import uvicorn
@@ -299,13 +578,16 @@ def main():
     logger.info(f"GitHub App ID: {settings.github_app_id}")
     logger.info(f"FastMCP enabled: {settings.fastmcp_enabled}")
     logger.info(f"PAM authentication enabled: {settings.pam_enabled}")
+    logger.info(f"Workers: {settings.workers} (state backend: {settings.state_backend})")
     
-    # Run server
+    # Run server; each worker process runs its own lifespan and shares
+    # state through the configured state backend
     uvicorn.run(
         "mercur_e.main:app",
         host=settings.host,
         port=settings.port,
         reload=settings.debug,
+        workers=None if settings.debug else settings.workers,
         log_level=settings.log_level.lower()
     )
 
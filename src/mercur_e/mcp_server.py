@@ -6,7 +6,9 @@ from fastmcp import FastMCP
 from typing import Any
 from loguru import logger
 from .github_auth import github_auth
-from .commands import CommandHandler, CommandParser
+from .commands import CommandParser
+from .pull_requests import MAX_PAGE_SIZE, load_pull_request
+from .ratelimit import Priority, RateLimitExceeded, with_priority
 import json
 
 
@@ -47,10 +49,13 @@ async def parse_github_comment(comment_text: str) -> dict[str, Any]:
 
 
 @mcp.tool()
+@with_priority(Priority.BACKGROUND)
 async def analyze_pull_request(
     owner: str,
     repo: str,
-    pr_number: int
+    pr_number: int,
+    limit: int = 10,
+    cursor: str | None = None
 ) -> dict[str, Any]:
     """
     Analyze a pull request and provide insights
@@ -59,60 +64,61 @@ async def analyze_pull_request(
         owner: Repository owner
         repo: Repository name
         pr_number: Pull request number
+        limit: Number of changed files to return (1-100)
+        cursor: files_page.next_cursor of a previous call, to get the next files
     
     Returns:
         Dictionary containing PR analysis
     """
     try:
-        installation_id = github_auth.get_installation_id_for_repo(owner, repo)
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        
+        installation_id = await github_auth.get_installation_id_for_repo(owner, repo)
         if not installation_id:
             return {"success": False, "error": "Installation not found"}
         
-        gh = github_auth.get_github_client(installation_id)
-        repository = gh.get_repo(f"{owner}/{repo}")
-        pr = repository.get_pull(pr_number)
-        
-        # Gather PR information
-        commit = pr.get_commits().reversed[0]
-        statuses = commit.get_combined_status()
-        
-        files_changed = []
-        for file in pr.get_files():
-            files_changed.append({
-                "filename": file.filename,
-                "status": file.status,
-                "additions": file.additions,
-                "deletions": file.deletions,
-                "changes": file.changes
-            })
+        full_name = f"{owner}/{repo}"
+        async with await github_auth.get_github_client(installation_id) as gh:
+            # PR, labels, CI contexts and one page of files in one GraphQL query
+            pr = await load_pull_request(
+                gh, full_name, pr_number, files_limit=limit, files_after=cursor
+            )
         
         analysis = {
             "success": True,
             "pr": {
-                "number": pr.number,
-                "title": pr.title,
-                "state": pr.state,
-                "author": pr.user.login,
-                "mergeable": pr.mergeable,
-                "merged": pr.merged,
-                "draft": pr.draft,
-                "additions": pr.additions,
-                "deletions": pr.deletions,
-                "changed_files": pr.changed_files,
-                "commits": pr.commits,
-                "comments": pr.comments,
-                "review_comments": pr.review_comments
+                "number": pr['number'],
+                "title": pr['title'],
+                "state": pr['state'],
+                "author": pr['user']['login'],
+                "mergeable": pr['mergeable'],
+                "merged": pr['merged'],
+                "draft": pr['draft'],
+                "additions": pr['additions'],
+                "deletions": pr['deletions'],
+                "changed_files": pr['changed_files'],
+                "commits": pr['commits'],
+                "comments": pr['comments'],
+                "review_comments": pr['review_comments']
             },
             "ci_status": {
-                "state": statuses.state,
-                "total_count": statuses.total_count
+                "state": pr['ci']['state'],
+                "total_count": pr['ci']['total_count']
+            },
+            "files": pr['files'],
+            "files_page": {
+                "total_count": pr['files_page']['total_count'],
+                "has_next_page": pr['files_page']['has_next_page'],
+                "next_cursor": pr['files_page']['end_cursor']
             },
-            "files": files_changed[:10],  # Limit to first 10 files
-            "labels": [label.name for label in pr.labels]
+            "labels": [label['name'] for label in pr['labels']]
         }
         
         return analysis
         
+    except RateLimitExceeded:
+        # Shed background work surfaces as a tool error naming when to retry
+        raise
     except Exception as e:
         logger.error(f"Error analyzing PR: {e}")
         return {
@@ -122,6 +128,7 @@ async def analyze_pull_request(
 
 
 @mcp.tool()
+@with_priority(Priority.BACKGROUND)
 async def get_repository_info(owner: str, repo: str) -> dict[str, Any]:
     """
     Get repository information and metadata
@@ -134,34 +141,36 @@ async def get_repository_info(owner: str, repo: str) -> dict[str, Any]:
         Dictionary containing repository information
     """
     try:
-        installation_id = github_auth.get_installation_id_for_repo(owner, repo)
+        installation_id = await github_auth.get_installation_id_for_repo(owner, repo)
         if not installation_id:
             return {"success": False, "error": "Installation not found"}
         
-        gh = github_auth.get_github_client(installation_id)
-        repository = gh.get_repo(f"{owner}/{repo}")
+        async with await github_auth.get_github_client(installation_id) as gh:
+            repository = await gh.get_repo(f"{owner}/{repo}")
         
         info = {
             "success": True,
             "repository": {
-                "name": repository.name,
-                "full_name": repository.full_name,
-                "description": repository.description,
-                "private": repository.private,
-                "default_branch": repository.default_branch,
-                "language": repository.language,
-                "stars": repository.stargazers_count,
-                "forks": repository.forks_count,
-                "open_issues": repository.open_issues_count,
-                "has_issues": repository.has_issues,
-                "has_projects": repository.has_projects,
-                "has_wiki": repository.has_wiki,
-                "archived": repository.archived
+                "name": repository['name'],
+                "full_name": repository['full_name'],
+                "description": repository['description'],
+                "private": repository['private'],
+                "default_branch": repository['default_branch'],
+                "language": repository['language'],
+                "stars": repository['stargazers_count'],
+                "forks": repository['forks_count'],
+                "open_issues": repository['open_issues_count'],
+                "has_issues": repository['has_issues'],
+                "has_projects": repository['has_projects'],
+                "has_wiki": repository['has_wiki'],
+                "archived": repository['archived']
             }
         }
         
         return info
         
+    except RateLimitExceeded:
+        raise
     except Exception as e:
         logger.error(f"Error getting repository info: {e}")
         return {
@@ -229,6 +238,7 @@ async def suggest_command(
 
 
 @mcp.tool()
+@with_priority(Priority.BACKGROUND)
 async def get_workflow_runs(
     owner: str,
     repo: str,
@@ -246,24 +256,24 @@ async def get_workflow_runs(
         Dictionary containing workflow run information
     """
     try:
-        installation_id = github_auth.get_installation_id_for_repo(owner, repo)
+        installation_id = await github_auth.get_installation_id_for_repo(owner, repo)
         if not installation_id:
             return {"success": False, "error": "Installation not found"}
         
-        gh = github_auth.get_github_client(installation_id)
-        repository = gh.get_repo(f"{owner}/{repo}")
+        async with await github_auth.get_github_client(installation_id) as gh:
+            workflow_runs = await gh.get_workflow_runs(f"{owner}/{repo}", limit=limit)
         
         runs = []
-        for run in repository.get_workflow_runs()[:limit]:
+        for run in workflow_runs:
             runs.append({
-                "id": run.id,
-                "name": run.name,
-                "status": run.status,
-                "conclusion": run.conclusion,
-                "created_at": run.created_at.isoformat(),
-                "updated_at": run.updated_at.isoformat(),
-                "head_branch": run.head_branch,
-                "head_sha": run.head_sha[:7]
+                "id": run['id'],
+                "name": run['name'],
+                "status": run['status'],
+                "conclusion": run['conclusion'],
+                "created_at": run['created_at'],
+                "updated_at": run['updated_at'],
+                "head_branch": run['head_branch'],
+                "head_sha": run['head_sha'][:7]
             })
         
         return {
@@ -272,6 +282,8 @@ async def get_workflow_runs(
             "count": len(runs)
         }
         
+    except RateLimitExceeded:
+        raise
     except Exception as e:
         logger.error(f"Error getting workflow runs: {e}")
         return {
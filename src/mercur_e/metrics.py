@@ -0,0 +1,273 @@
+"""
+In-process metrics for MERCUR-E
+
+Counters, gauges and histograms are plain dictionaries keyed by label
+values, updated in place on the hot paths and rendered in the Prometheus
+text exposition format by the /metrics endpoint. Nothing is sent anywhere;
+with several server workers, each process reports its own values.
+"""
+import re
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Iterator
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Latency buckets in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+FAST_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Metric(ABC):
+    """Named metric with a fixed set of label names"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+
+    def _labels(self, values: tuple[str, ...], extra: str = '') -> str:
+        pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(self.labels, values)]
+        if extra:
+            pairs.append(extra)
+        return '{' + ','.join(pairs) + '}' if pairs else ''
+
+    @abstractmethod
+    def samples(self) -> Iterator[str]:
+        """Sample lines in the Prometheus text format"""
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return '\n'.join(lines)
+
+
+class Counter(Metric):
+    """Monotonically increasing count"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()):
+        super().__init__(name, help, labels)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def set(self, value: float, *labels: str) -> None:
+        """Mirror a count maintained elsewhere"""
+        self._values[labels] = value
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0.0)
+
+    def samples(self) -> Iterator[str]:
+        for labels, value in self._values.items():
+            yield f"{self.name}{self._labels(labels)} {_format_value(value)}"
+
+
+class Gauge(Counter):
+    """Value that can go up and down"""
+
+    kind = "gauge"
+
+    def clear(self) -> None:
+        """Drop every label set, e.g. before re-reading them all"""
+        self._values.clear()
+
+
+class Histogram(Metric):
+    """Distribution of observed values over fixed buckets"""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: non-cumulative bucket counts (+Inf last), sum, count
+        self._values: dict[tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        state = self._values.get(labels)
+        if state is None:
+            state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        state[0][bisect_left(self.buckets, value)] += 1
+        state[1] += value
+        state[2] += 1
+
+    @contextmanager
+    def time(self, *labels: str) -> Iterator[None]:
+        """Observe the duration of the enclosed block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def count(self, *labels: str) -> int:
+        state = self._values.get(labels)
+        return state[2] if state else 0
+
+    def samples(self) -> Iterator[str]:
+        for labels, (counts, total, count) in self._values.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{self._labels(labels, le)} {cumulative}"
+            yield f"{self.name}_sum{self._labels(labels)} {_format_value(total)}"
+            yield f"{self.name}_count{self._labels(labels)} {count}"
+
+
+class Registry:
+    """Collection of metrics rendered together"""
+
+    def __init__(self):
+        self._metrics: dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labels: tuple[str, ...] = ()) -> Counter:
+        return self.register(Counter(name, help, labels))
+
+    def gauge(self, name: str, help: str, labels: tuple[str, ...] = ()) -> Gauge:
+        return self.register(Gauge(name, help, labels))
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labels: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self.register(Histogram(name, help, labels, buckets))
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        return '\n'.join(metric.render() for metric in self._metrics.values()) + '\n'
+
+
+# Path segments that follow these are identifiers, not route structure
+_ROUTE_PARAMS = {
+    'repos': ('{owner}', '{repo}'),
+    'users': ('{user}',),
+    'orgs': ('{org}',),
+    'branches': ('{branch}',),
+    'commits': ('{ref}',),
+    'workflows': ('{workflow}',),
+    'compare': ('{basehead}',),
+    'labels': ('{name}',),
+}
+# Everything after these is a single parameter (file paths, git refs)
+_ROUTE_TAILS = {'contents': '{path}', 'ref': '{ref}', 'refs': '{ref}'}
+_ID_SEGMENT = re.compile(r'^(\d+|[0-9a-f]{40})$')
+
+
+def normalize_route(path: str) -> str:
+    """
+    Collapse a GitHub API path into its route template
+
+    e.g. ``/repos/octo/bot/pulls/42/files`` → ``/repos/{owner}/{repo}/pulls/{id}/files``,
+    so metrics are labelled by endpoint rather than by every repository and number.
+    """
+    if path.startswith('/api/v3/'):
+        path = path[len('/api/v3'):]
+
+    segments = path.strip('/').split('/')
+    route = []
+    i = 0
+    while i < len(segments):
+        segment = segments[i]
+        i += 1
+        if segment in _ROUTE_TAILS and i < len(segments):
+            route.extend((segment, _ROUTE_TAILS[segment]))
+            break
+        route.append('{id}' if _ID_SEGMENT.match(segment) else segment)
+        for placeholder in _ROUTE_PARAMS.get(segment, ()):
+            if i < len(segments):
+                route.append(placeholder)
+                i += 1
+    return '/' + '/'.join(route)
+
+
+registry = Registry()
+
+WEBHOOK_DELIVERIES = registry.counter(
+    "mercur_e_webhook_deliveries_total",
+    "Webhook deliveries received, by event and outcome",
+    ("event", "outcome")
+)
+WEBHOOK_PHASE_SECONDS = registry.histogram(
+    "mercur_e_webhook_phase_seconds",
+    "Time spent in each webhook phase (read, verify, dispatch, process, parse)",
+    ("phase",),
+    FAST_BUCKETS
+)
+WEBHOOK_QUEUE_DEPTH = registry.gauge(
+    "mercur_e_webhook_queue_depth",
+    "Deliveries waiting in the webhook queue"
+)
+COMMAND_SECONDS = registry.histogram(
+    "mercur_e_command_seconds",
+    "Slash command latency, by command and outcome",
+    ("command", "outcome")
+)
+GITHUB_REQUESTS = registry.counter(
+    "mercur_e_github_requests_total",
+    "GitHub API requests, by method, route and status",
+    ("method", "route", "status")
+)
+GITHUB_REQUEST_SECONDS = registry.histogram(
+    "mercur_e_github_request_seconds",
+    "GitHub API request latency including rate-limit waits, by method and route",
+    ("method", "route")
+)
+TOKEN_LOOKUPS = registry.counter(
+    "mercur_e_installation_token_lookups_total",
+    "Installation token cache lookups, by result",
+    ("result",)
+)
+TOKEN_HIT_RATIO = registry.gauge(
+    "mercur_e_installation_token_hit_ratio",
+    "Share of installation token lookups served from the cache"
+)
+RATELIMIT_REMAINING = registry.gauge(
+    "mercur_e_github_ratelimit_remaining",
+    "Remaining GitHub API quota last seen per installation and resource",
+    ("installation", "resource")
+)
+RATELIMIT_LIMIT = registry.gauge(
+    "mercur_e_github_ratelimit_limit",
+    "GitHub API quota per installation and resource",
+    ("installation", "resource")
+)
+LOG_RECORDS_DROPPED = registry.counter(
+    "mercur_e_log_records_dropped_total",
+    "Log records dropped because the log buffer was full",
+    ("sink",)
+)
@@ -0,0 +1,161 @@
+"""
+Lightweight models backed by webhook payloads
+
+Webhook payloads already carry the repository, issue and pull request
+objects the handlers work with. These wrappers expose the fields the bot
+uses straight from the payload dictionaries, without copying them, and
+fetch from the API only what a payload lacks.
+"""
+import asyncio
+from typing import Any
+from .github_client import GitHubClient
+
+
+class User:
+    """GitHub user or bot account"""
+
+    __slots__ = ('_data',)
+
+    def __init__(self, data: dict[str, Any] | None):
+        self._data = data or {}
+
+    @property
+    def login(self) -> str:
+        return self._data.get('login', 'unknown')
+
+
+class Label:
+    """Issue or pull request label"""
+
+    __slots__ = ('_data',)
+
+    def __init__(self, data: dict[str, Any]):
+        self._data = data
+
+    @property
+    def name(self) -> str:
+        return self._data['name']
+
+
+class Repository:
+    """Repository from a webhook payload"""
+
+    __slots__ = ('_data',)
+
+    def __init__(self, data: dict[str, Any]):
+        self._data = data
+
+    @property
+    def raw(self) -> dict[str, Any]:
+        return self._data
+
+    @property
+    def full_name(self) -> str:
+        return self._data['full_name']
+
+    @property
+    def name(self) -> str:
+        return self._data.get('name') or self.full_name.split('/', 1)[1]
+
+    @property
+    def owner(self) -> User:
+        return User(self._data.get('owner'))
+
+    @property
+    def default_branch(self) -> str:
+        return self._data.get('default_branch', 'main')
+
+
+class Issue:
+    """Issue, or the issue view of a pull request, from a webhook payload"""
+
+    __slots__ = ('_data',)
+
+    def __init__(self, data: dict[str, Any]):
+        self._data = data
+
+    @property
+    def raw(self) -> dict[str, Any]:
+        return self._data
+
+    @property
+    def number(self) -> int:
+        return self._data['number']
+
+    @property
+    def title(self) -> str:
+        return self._data.get('title', '')
+
+    @property
+    def state(self) -> str:
+        return self._data.get('state', 'open')
+
+    @property
+    def user(self) -> User:
+        return User(self._data.get('user'))
+
+    @property
+    def labels(self) -> list[Label]:
+        return [Label(label) for label in self._data.get('labels', [])]
+
+    @property
+    def comments(self) -> int:
+        return self._data.get('comments', 0)
+
+    @property
+    def is_pull_request(self) -> bool:
+        return 'pull_request' in self._data
+
+
+class PullRequest(Issue):
+    """
+    Pull request from a webhook payload.
+
+    issue_comment payloads only carry the issue view of a pull request,
+    without its head or mergeability. ``load`` fetches the full pull
+    request once, and only when such a field is actually needed.
+    """
+
+    __slots__ = ('_lock',)
+
+    def __init__(self, data: dict[str, Any]):
+        super().__init__(data)
+        self._lock: asyncio.Lock | None = None
+
+    @property
+    def complete(self) -> bool:
+        """Whether the payload already holds the full pull request"""
+        return 'head' in self._data
+
+    @property
+    def head_ref(self) -> str:
+        return self._data['head']['ref']
+
+    @property
+    def head_sha(self) -> str:
+        return self._data['head']['sha']
+
+    @property
+    def mergeable(self) -> bool | None:
+        return self._data.get('mergeable')
+
+    @property
+    def merged(self) -> bool:
+        return self._data.get('merged', False)
+
+    @property
+    def draft(self) -> bool:
+        return self._data.get('draft', False)
+
+    async def load(self, gh: GitHubClient, full_name: str) -> "PullRequest":
+        """Fetch the full pull request if the payload lacks it; returns self"""
+        if self.complete:
+            return self
+
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            # Concurrent commands share one fetch
+            if not self.complete:
+                self._data = {**self._data, **await gh.get_pull(full_name, self.number)}
+        return self
@@ -0,0 +1,92 @@
+"""
+Webhook payload reading and JSON encoding for MERCUR-E
+
+Request bodies are streamed with a size cap, handing each chunk to the
+signature check as it arrives. JSON goes through orjson when it is
+installed (pip install "mercur-e[orjson]") and through the standard
+library otherwise.
+"""
+import json
+from typing import Any, Callable
+from fastapi import HTTPException, Request
+from fastapi.responses import JSONResponse, ORJSONResponse
+from loguru import logger
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+    logger.debug("orjson not installed; using the standard json module")
+
+
+# Response class for JSON endpoints
+json_response_class: type[JSONResponse] = ORJSONResponse if ORJSON_AVAILABLE else JSONResponse
+
+
+def loads(data: bytes | bytearray | str) -> Any:
+    """
+    Decode JSON
+
+    Raises:
+        ValueError: If the data is not valid JSON
+    """
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def looks_like_json_object(data: bytes) -> bool:
+    """
+    Cheap shape check: whether data is ``{...}`` apart from surrounding whitespace
+
+    The body is not decoded or copied; malformed JSON inside the braces is
+    only found when the payload is decoded.
+    """
+    start, end = 0, len(data) - 1
+    while start <= end and data[start] in b' \t\r\n':
+        start += 1
+    while end > start and data[end] in b' \t\r\n':
+        end -= 1
+    return start < end and data[start] == ord('{') and data[end] == ord('}')
+
+
+def dumps(obj: Any) -> bytes:
+    """Encode JSON to UTF-8 bytes"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
+
+async def read_body(
+    request: Request,
+    max_size: int,
+    on_chunk: Callable[[bytes], Any] | None = None
+) -> bytes:
+    """
+    Read a request body, rejecting it as soon as it exceeds max_size
+
+    Args:
+        request: Incoming request
+        max_size: Largest accepted body in bytes
+        on_chunk: Called with every chunk as it arrives, e.g. to update an HMAC
+
+    Returns:
+        The complete body
+
+    Raises:
+        HTTPException: 413 if the body is larger than max_size
+    """
+    content_length = request.headers.get('content-length')
+    if content_length is not None and content_length.isdigit() and int(content_length) > max_size:
+        raise HTTPException(status_code=413, detail="Payload too large")
+
+    body = bytearray()
+    async for chunk in request.stream():
+        if len(body) + len(chunk) > max_size:
+            raise HTTPException(status_code=413, detail="Payload too large")
+        if on_chunk is not None:
+            on_chunk(chunk)
+        body += chunk
+
+    return bytes(body)
@@ -0,0 +1,181 @@
+"""
+On-demand profiling and slow-webhook reporting for MERCUR-E
+
+The sampling profiler runs in its own thread for a fixed time, reading the
+stacks of the other threads with sys._current_frames() at a fixed
+interval. The running server is not instrumented or slowed down beyond
+the sampling itself. Profiles are returned as collapsed stacks (for
+flamegraph.pl, speedscope or inferno) or as a speedscope file.
+
+Phase timers collect how long each part of a webhook took (body read,
+signature check, decoding, commands, GitHub API calls) and log the
+breakdown of deliveries slower than a threshold.
+"""
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator
+from loguru import logger
+
+
+Frame = tuple[str, str, int]
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler sampling thread stacks from a background thread.
+
+    Args:
+        interval: Seconds between samples
+        thread_ids: Threads to sample; every other thread when None
+        max_depth: Deepest stack recorded
+    """
+
+    def __init__(
+        self,
+        interval: float = 0.005,
+        thread_ids: set[int] | None = None,
+        max_depth: int = 128
+    ):
+        self.interval = interval
+        self.thread_ids = thread_ids
+        self.max_depth = max_depth
+        self.samples: dict[tuple[Frame, ...], int] = {}
+        self.sample_count = 0
+        self.duration = 0.0
+
+    def run(self, duration: float) -> None:
+        """Sample for ``duration`` seconds; blocks the calling thread"""
+        own = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        start = time.perf_counter()
+        deadline = start + duration
+
+        while time.perf_counter() < deadline:
+            for ident, frame in sys._current_frames().items():
+                if ident == own or (self.thread_ids is not None and ident not in self.thread_ids):
+                    continue
+                stack: list[Frame] = []
+                while frame is not None and len(stack) < self.max_depth:
+                    code = frame.f_code
+                    stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+                    frame = frame.f_back
+                stack.append((names.get(ident, f"thread-{ident}"), '', 0))
+                key = tuple(reversed(stack))
+                self.samples[key] = self.samples.get(key, 0) + 1
+            self.sample_count += 1
+            time.sleep(self.interval)
+
+        self.duration = time.perf_counter() - start
+
+    @staticmethod
+    def _frame_name(frame: Frame) -> str:
+        name, filename, line = frame
+        return f"{name} ({filename}:{line})" if filename else name
+
+    def collapsed(self) -> str:
+        """Samples as collapsed stacks: ``root;caller;callee count`` per line"""
+        return ''.join(
+            ';'.join(self._frame_name(frame) for frame in stack) + f" {count}\n"
+            for stack, count in sorted(self.samples.items(), key=lambda item: -item[1])
+        )
+
+    def speedscope(self, name: str = "mercur-e") -> dict[str, Any]:
+        """Samples as a speedscope sampled profile (https://www.speedscope.app)"""
+        frames: list[dict[str, Any]] = []
+        index: dict[Frame, int] = {}
+        samples = []
+        weights = []
+        for stack, count in self.samples.items():
+            ids = []
+            for frame in stack:
+                if frame not in index:
+                    index[frame] = len(frames)
+                    frames.append({'name': frame[0], 'file': frame[1], 'line': frame[2]})
+                ids.append(index[frame])
+            samples.append(ids)
+            weights.append(count * self.interval)
+
+        return {
+            '$schema': 'https://www.speedscope.app/file-format-schema.json',
+            'name': name,
+            'exporter': 'mercur-e',
+            'shared': {'frames': frames},
+            'profiles': [{
+                'type': 'sampled',
+                'name': name,
+                'unit': 'seconds',
+                'startValue': 0,
+                'endValue': sum(weights),
+                'samples': samples,
+                'weights': weights
+            }]
+        }
+
+
+class PhaseTimer:
+    """Accumulated time and call count per phase of one unit of work"""
+
+    __slots__ = ('started', 'phases')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: dict[str, list] = {}
+
+    def record(self, phase: str, seconds: float) -> None:
+        entry = self.phases.get(phase)
+        if entry is None:
+            self.phases[phase] = [seconds, 1]
+        else:
+            entry[0] += seconds
+            entry[1] += 1
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def breakdown(self) -> str:
+        """Phases in the order first seen, e.g. ``read 1.2 ms, github_api 840.0 ms ×3``"""
+        return ', '.join(
+            f"{phase} {seconds * 1000:.1f} ms" + (f" ×{calls}" if calls > 1 else '')
+            for phase, (seconds, calls) in self.phases.items()
+        )
+
+
+current_phases: ContextVar[PhaseTimer | None] = ContextVar('current_phases', default=None)
+
+
+def record_phase(phase: str, seconds: float) -> None:
+    """Add time to a phase of the current unit of work, if one is tracked"""
+    timer = current_phases.get()
+    if timer is not None:
+        timer.record(phase, seconds)
+
+
+@contextmanager
+def track_phases(label: str, threshold: float | None) -> Iterator[PhaseTimer | None]:
+    """
+    Time the phases of the enclosed work and log them if it is slow
+
+    Phases may overlap: a command's time includes the GitHub API calls it made.
+
+    Args:
+        label: Description of the work, used in the log message
+        threshold: Seconds above which the breakdown is logged; None disables tracking
+    """
+    if threshold is None:
+        yield None
+        return
+
+    timer = PhaseTimer()
+    token = current_phases.set(timer)
+    try:
+        yield timer
+    finally:
+        current_phases.reset(token)
+        elapsed = timer.elapsed()
+        if elapsed >= threshold:
+            logger.warning(
+                "Slow {}: {:.1f} ms ({})", label, elapsed * 1000, timer.breakdown() or "no phases"
+            )
@@ -0,0 +1,205 @@
+"""
+GraphQL-backed pull request loader for MERCUR-E
+
+Reports and PR analysis need the pull request itself, its labels, the CI
+contexts of its head commit and (optionally) its changed files. Over REST
+that is five or more round-trips; here it is a single GraphQL query. The
+result is normalized to the REST field names the rest of the bot uses, so
+renderers do not care where the data came from.
+"""
+from typing import Any
+from .github_client import GitHubClient
+from .status import summarize_state
+
+
+PULL_REQUEST_QUERY = """
+query PullRequestReport(
+  $owner: String!, $name: String!, $number: Int!,
+  $withFiles: Boolean!, $filesFirst: Int!, $filesAfter: String, $contextsFirst: Int!
+) {
+  repository(owner: $owner, name: $name) {
+    pullRequest(number: $number) {
+      number
+      title
+      state
+      merged
+      isDraft
+      mergeable
+      additions
+      deletions
+      changedFiles
+      headRefName
+      headRefOid
+      author { login }
+      allCommits: commits { totalCount }
+      comments { totalCount }
+      reviews(first: 100) { nodes { comments { totalCount } } }
+      labels(first: 100) { nodes { name } }
+      files(first: $filesFirst, after: $filesAfter) @include(if: $withFiles) {
+        totalCount
+        pageInfo { hasNextPage endCursor }
+        nodes { path additions deletions changeType }
+      }
+      headCommit: commits(last: 1) {
+        nodes {
+          commit {
+            statusCheckRollup {
+              state
+              contexts(first: $contextsFirst) {
+                totalCount
+                nodes {
+                  __typename
+                  ... on StatusContext { context state }
+                  ... on CheckRun { name status conclusion }
+                }
+              }
+            }
+          }
+        }
+      }
+    }
+  }
+}
+"""
+
+# GraphQL connections return at most 100 nodes per page
+MAX_PAGE_SIZE = 100
+
+# GraphQL enum values mapped to the REST vocabulary
+MERGEABLE = {'MERGEABLE': True, 'CONFLICTING': False}
+CHANGE_TYPES = {
+    'ADDED': 'added',
+    'DELETED': 'removed',
+    'MODIFIED': 'modified',
+    'RENAMED': 'renamed',
+    'COPIED': 'copied',
+    'CHANGED': 'changed'
+}
+
+
+def _ci_status(sha: str, rollup: dict[str, Any] | None) -> dict[str, Any]:
+    """CI status in the shape returned by HeadStatusCache"""
+    statuses = []
+    check_runs = []
+    total_count = 0
+
+    if rollup:
+        contexts = rollup['contexts']
+        total_count = contexts['totalCount']
+        for node in contexts['nodes']:
+            if node['__typename'] == 'StatusContext':
+                statuses.append({'context': node['context'], 'state': node['state'].lower()})
+            elif node['__typename'] == 'CheckRun':
+                check_runs.append({
+                    'name': node['name'],
+                    'status': node['status'].lower(),
+                    'conclusion': node['conclusion'].lower() if node['conclusion'] else None
+                })
+
+    combined = {'state': 'pending', 'total_count': len(statuses)}
+    for state in ('error', 'failure', 'pending', 'success'):
+        if any(status['state'] == state for status in statuses):
+            combined['state'] = state
+            break
+
+    return {
+        'sha': sha,
+        'state': summarize_state(combined, check_runs),
+        'statuses': statuses,
+        'check_runs': check_runs,
+        'total_count': total_count
+    }
+
+
+def normalize_pull_request(node: dict[str, Any]) -> dict[str, Any]:
+    """
+    Convert a PullRequestReport query result to REST-style fields
+
+    Returns:
+        Pull request dictionary with the usual REST keys plus ``ci`` (CI
+        status like HeadStatusCache returns), and when files were requested
+        ``files`` and ``files_page`` (``total_count``, ``has_next_page``
+        and ``end_cursor``)
+    """
+    head_commits = node['headCommit']['nodes']
+    rollup = head_commits[0]['commit']['statusCheckRollup'] if head_commits else None
+
+    pr = {
+        'number': node['number'],
+        'title': node['title'],
+        'state': 'open' if node['state'] == 'OPEN' else 'closed',
+        'user': {'login': node['author']['login'] if node['author'] else 'ghost'},
+        'mergeable': MERGEABLE.get(node['mergeable']),
+        'merged': node['merged'],
+        'draft': node['isDraft'],
+        'additions': node['additions'],
+        'deletions': node['deletions'],
+        'changed_files': node['changedFiles'],
+        'commits': node['allCommits']['totalCount'],
+        'comments': node['comments']['totalCount'],
+        'review_comments': sum(
+            review['comments']['totalCount'] for review in node['reviews']['nodes']
+        ),
+        'labels': [{'name': label['name']} for label in node['labels']['nodes']],
+        'head': {'ref': node['headRefName'], 'sha': node['headRefOid']},
+        'ci': _ci_status(node['headRefOid'], rollup)
+    }
+
+    files = node.get('files')
+    if files is not None:
+        pr['files'] = [
+            {
+                'filename': file['path'],
+                'status': CHANGE_TYPES.get(file['changeType'], file['changeType'].lower()),
+                'additions': file['additions'],
+                'deletions': file['deletions'],
+                'changes': file['additions'] + file['deletions']
+            }
+            for file in files['nodes']
+        ]
+        pr['files_page'] = {
+            'total_count': files['totalCount'],
+            'has_next_page': files['pageInfo']['hasNextPage'],
+            'end_cursor': files['pageInfo']['endCursor']
+        }
+
+    return pr
+
+
+async def load_pull_request(
+    gh: GitHubClient,
+    full_name: str,
+    number: int,
+    files_limit: int | None = None,
+    files_after: str | None = None,
+    contexts_limit: int = 100
+) -> dict[str, Any]:
+    """
+    Fetch everything a report needs about a pull request in one query
+
+    Args:
+        gh: GitHub client for the repository's installation
+        full_name: Repository owner/name
+        number: Pull request number
+        files_limit: Number of changed files to include (at most MAX_PAGE_SIZE);
+            None or 0 skips files
+        files_after: Cursor of the previous files page
+        contexts_limit: Number of status contexts and check runs to include (max 100)
+
+    Returns:
+        Normalized pull request dictionary (see normalize_pull_request)
+
+    Raises:
+        GitHubAPIError: If the query fails or the pull request does not exist
+    """
+    owner, name = full_name.split('/', 1)
+    data = await gh.graphql(PULL_REQUEST_QUERY, {
+        'owner': owner,
+        'name': name,
+        'number': number,
+        'withFiles': bool(files_limit),
+        'filesFirst': min(files_limit or 1, MAX_PAGE_SIZE),
+        'filesAfter': files_after,
+        'contextsFirst': contexts_limit
+    })
+    return normalize_pull_request(data['repository']['pullRequest'])
@@ -0,0 +1,299 @@
+"""
+Rate-limit-aware scheduling of GitHub API calls for MERCUR-E
+
+Every response updates the remaining primary quota of the installation
+that made it. Before a request is sent the scheduler checks that budget:
+interactive work (slash commands) may use the whole quota, while
+background work (reports, MCP analysis) leaves a reserve untouched and is
+shed once it would have to wait too long. Secondary rate limits
+(Retry-After) pause the installation, and write requests are paced by a
+token bucket as GitHub recommends for content-creating endpoints.
+REST ("core") and GraphQL quotas are separate on GitHub and are tracked
+as separate budgets.
+
+With a shared state store, budgets observed by one worker process are
+published for the others, which pick them up at most every
+``sync_interval`` seconds.
+"""
+import asyncio
+import functools
+import json
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+from typing import Any, Awaitable, Callable, Hashable, Iterator
+import httpx
+from loguru import logger
+from .state import StateStore
+
+
+class Priority(IntEnum):
+    """Scheduling priority of a GitHub API call"""
+    INTERACTIVE = 0
+    BACKGROUND = 1
+
+
+request_priority: ContextVar[Priority] = ContextVar(
+    'request_priority', default=Priority.INTERACTIVE
+)
+
+WRITE_METHODS = frozenset({'POST', 'PUT', 'PATCH', 'DELETE'})
+
+
+@contextmanager
+def priority(level: Priority) -> Iterator[None]:
+    """Run the enclosed GitHub API calls at the given priority"""
+    token = request_priority.set(level)
+    try:
+        yield
+    finally:
+        request_priority.reset(token)
+
+
+def with_priority(level: Priority):
+    """Decorator running an async function's GitHub API calls at the given priority"""
+    def decorator(func: Callable[..., Awaitable[Any]]):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with priority(level):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a request is shed instead of waiting for quota"""
+
+    def __init__(self, scope: Hashable, retry_at: float):
+        self.scope = scope
+        self.retry_at = retry_at
+        self.retry_after = time.strftime('%H:%M UTC', time.gmtime(retry_at))
+        super().__init__(f"GitHub rate limit low for {scope}, retry after {self.retry_after}")
+
+
+class TokenBucket:
+    """Token bucket pacing requests to ``rate`` per second with bursts of ``capacity``"""
+
+    def __init__(self, rate: float, capacity: float, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.tokens = capacity
+        self._updated = clock()
+
+    def _refill(self) -> None:
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> float:
+        """Take one token, waiting for it if needed; returns seconds waited"""
+        waited = 0.0
+        while True:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return waited
+            delay = (1 - self.tokens) / self.rate
+            waited += delay
+            await asyncio.sleep(delay)
+
+
+class InstallationBudget:
+    """Known rate-limit state of one installation"""
+
+    __slots__ = (
+        'limit', 'remaining', 'reset_at', 'blocked_until', 'writes', 'observed_at', 'synced_at'
+    )
+
+    def __init__(self, writes: TokenBucket):
+        self.limit: int | None = None
+        self.remaining: int | None = None
+        self.reset_at = 0.0
+        self.blocked_until = 0.0
+        self.writes = writes
+        self.observed_at = 0.0
+        self.synced_at = 0.0
+
+
+class RateLimitScheduler:
+    """Per-installation quota tracking with priority-aware admission"""
+
+    def __init__(
+        self,
+        background_reserve: float = 0.2,
+        max_wait: float = 60.0,
+        background_max_wait: float = 5.0,
+        write_rate: float = 1.0,
+        write_burst: float = 3.0,
+        clock: Callable[[], float] = time.time,
+        shared: StateStore | None = None,
+        sync_interval: float = 1.0
+    ):
+        self.background_reserve = background_reserve
+        self.max_wait = max_wait
+        self.background_max_wait = background_max_wait
+        self.write_rate = write_rate
+        self.write_burst = write_burst
+        self.clock = clock
+        self.shared = shared
+        self.sync_interval = sync_interval
+        self._budgets: dict[tuple[Hashable, str], InstallationBudget] = {}
+        self._publishing: set[asyncio.Task] = set()
+        self.waits = 0
+        self.shed = 0
+
+    def budget(self, scope: Hashable, resource: str = 'core') -> InstallationBudget:
+        budget = self._budgets.get((scope, resource))
+        if budget is None:
+            budget = InstallationBudget(TokenBucket(self.write_rate, self.write_burst))
+            self._budgets[(scope, resource)] = budget
+        return budget
+
+    async def _wait_until(self, scope: Hashable, until: float, level: Priority) -> None:
+        delay = until - self.clock()
+        if delay <= 0:
+            return
+
+        limit = self.max_wait if level == Priority.INTERACTIVE else self.background_max_wait
+        if delay > limit:
+            self.shed += 1
+            raise RateLimitExceeded(scope, until)
+
+        self.waits += 1
+        logger.info("Rate limit for {}: waiting {:.1f}s ({})", scope, delay, level.name.lower())
+        await asyncio.sleep(delay)
+
+    @staticmethod
+    def _shared_key(scope: Hashable, resource: str) -> str:
+        return f"ratelimit:{scope}:{resource}"
+
+    async def _sync(self, scope: Hashable, resource: str, budget: InstallationBudget) -> None:
+        """Adopt a budget another worker observed more recently"""
+        now = self.clock()
+        if now - budget.synced_at < self.sync_interval:
+            return
+        budget.synced_at = now
+        try:
+            raw = await self.shared.get(self._shared_key(scope, resource))
+        except Exception as e:
+            logger.warning(f"Shared rate-limit lookup failed for {scope}: {e}")
+            return
+        if raw is None:
+            return
+        data = json.loads(raw)
+        if data['observed_at'] > budget.observed_at:
+            budget.limit = data['limit']
+            budget.remaining = data['remaining']
+            budget.reset_at = data['reset_at']
+            budget.blocked_until = max(budget.blocked_until, data['blocked_until'])
+            budget.observed_at = data['observed_at']
+
+    async def _publish(self, key: str, value: bytes, ttl: float) -> None:
+        try:
+            await self.shared.set(key, value, ttl=ttl)
+        except Exception as e:
+            logger.warning(f"Shared rate-limit update failed for {key}: {e}")
+
+    async def acquire(self, scope: Hashable, method: str, resource: str = 'core') -> None:
+        """
+        Admit one request for an installation, waiting or shedding as needed
+
+        Args:
+            scope: Installation the request is made for
+            method: HTTP method; REST writes are additionally paced
+            resource: GitHub rate-limit resource ('core' for REST, 'graphql')
+
+        Raises:
+            RateLimitExceeded: If the request would have to wait longer than allowed
+        """
+        budget = self.budget(scope, resource)
+        level = request_priority.get()
+        if self.shared is not None:
+            await self._sync(scope, resource, budget)
+
+        if budget.blocked_until > self.clock():
+            await self._wait_until(scope, budget.blocked_until, level)
+
+        if budget.remaining is not None and budget.reset_at > self.clock():
+            reserve = 0
+            if level == Priority.BACKGROUND and budget.limit:
+                reserve = int(budget.limit * self.background_reserve)
+            if budget.remaining <= reserve:
+                await self._wait_until(scope, budget.reset_at, level)
+            else:
+                # Count the request now; the response headers will correct it
+                budget.remaining -= 1
+
+        # GraphQL queries are POSTs too, but only REST writes create content
+        if resource == 'core' and method in WRITE_METHODS:
+            await budget.writes.acquire()
+
+    def update(self, scope: Hashable, response: httpx.Response, resource: str = 'core') -> None:
+        """Record the rate-limit headers of a response"""
+        budget = self.budget(scope, resource)
+        headers = response.headers
+
+        remaining = headers.get('x-ratelimit-remaining')
+        if remaining is not None:
+            budget.remaining = int(remaining)
+            budget.limit = int(headers.get('x-ratelimit-limit', budget.limit or 0)) or None
+            budget.reset_at = float(headers.get('x-ratelimit-reset', budget.reset_at))
+
+        if response.status_code in (403, 429):
+            retry_after = headers.get('retry-after')
+            if retry_after is not None:
+                budget.blocked_until = self.clock() + float(retry_after)
+            elif remaining == '0':
+                budget.blocked_until = budget.reset_at
+
+        if remaining is not None or response.status_code in (403, 429):
+            budget.observed_at = self.clock()
+            if self.shared is not None:
+                value = json.dumps({
+                    'limit': budget.limit,
+                    'remaining': budget.remaining,
+                    'reset_at': budget.reset_at,
+                    'blocked_until': budget.blocked_until,
+                    'observed_at': budget.observed_at
+                }).encode()
+                ttl = max(budget.reset_at, budget.blocked_until) - budget.observed_at
+                # Publishing must not delay the response it was read from
+                task = asyncio.get_running_loop().create_task(
+                    self._publish(self._shared_key(scope, resource), value, max(ttl, 1.0))
+                )
+                self._publishing.add(task)
+                task.add_done_callback(self._publishing.discard)
+
+    def retry_delay(
+        self,
+        scope: Hashable,
+        response: httpx.Response,
+        resource: str = 'core'
+    ) -> float | None:
+        """Seconds to wait before retrying a secondary-rate-limited response, if any"""
+        if response.status_code not in (403, 429) or 'retry-after' not in response.headers:
+            return None
+        return max(0.0, self.budget(scope, resource).blocked_until - self.clock())
+
+    def budgets(self) -> Iterator[tuple[Hashable, str, InstallationBudget]]:
+        """Known budgets as (scope, resource, budget)"""
+        for (scope, resource), budget in self._budgets.items():
+            yield scope, resource, budget
+
+    def stats(self) -> dict[str, Any]:
+        """Remaining quota per installation and admission counters"""
+        return {
+            'waits': self.waits,
+            'shed': self.shed,
+            'installations': {
+                str(scope) if resource == 'core' else f"{scope}:{resource}": {
+                    'limit': budget.limit,
+                    'remaining': budget.remaining,
+                    'reset_at': budget.reset_at,
+                    'blocked_until': budget.blocked_until
+                }
+                for (scope, resource), budget in self._budgets.items()
+            }
+        }
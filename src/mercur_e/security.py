@@ -3,7 +3,11 @@ Security utilities for webhook validation and PAM authentication for MERCUR-E
 """
 import hmac
 import hashlib
+import os
+import time
+from typing import Callable
 from loguru import logger
+from .config import settings
 
 try:
     import pamela
@@ -13,6 +17,246 @@ except ImportError:
     logger.warning("PAM module not available. PAM authentication disabled.")
 
 
+SIGNATURE_ALGORITHMS = {'sha256': hashlib.sha256, 'sha1': hashlib.sha1}
+
+
+class SignatureCheck:
+    """Signature verification of one request body, fed chunk by chunk"""
+    
+    __slots__ = ('_hmac', '_expected')
+    
+    def __init__(self, mac: "hmac.HMAC", expected: str):
+        self._hmac = mac
+        self._expected = expected
+    
+    def update(self, chunk: bytes) -> None:
+        """Add the next chunk of the body"""
+        self._hmac.update(chunk)
+    
+    def verify(self) -> bool:
+        """Constant-time comparison of the body's HMAC with the signature"""
+        return hmac.compare_digest(self._hmac.hexdigest(), self._expected)
+
+
+class WebhookSignatureVerifier:
+    """
+    Verifier of GitHub webhook signatures for one secret.
+    
+    The secret is encoded and the HMAC key schedule computed once; every
+    request starts from a copy of that state. Both ``sha256=``
+    (X-Hub-Signature-256) and legacy ``sha1=`` (X-Hub-Signature)
+    signatures are supported.
+    """
+    
+    def __init__(self, secret: str):
+        key = secret.encode('utf-8')
+        self._macs = {
+            name: hmac.new(key, digestmod=algorithm)
+            for name, algorithm in SIGNATURE_ALGORITHMS.items()
+        }
+    
+    def start(self, signature: str | None, algorithm: str | None = None) -> SignatureCheck | None:
+        """
+        Begin verifying a body against a signature header
+        
+        Args:
+            signature: Signature header value, e.g. "sha256=<hex>"
+            algorithm: Required algorithm; None accepts any supported one
+        
+        Returns:
+            A SignatureCheck to feed the body to, or None if the header is
+            missing or malformed
+        """
+        if not signature:
+            logger.warning("No signature provided in webhook request")
+            return None
+        
+        name, _, expected = signature.partition('=')
+        mac = self._macs.get(name)
+        if mac is None or not expected or (algorithm is not None and name != algorithm):
+            logger.warning("Invalid signature format")
+            return None
+        
+        return SignatureCheck(mac.copy(), expected)
+    
+    def verify(self, payload: bytes, signature: str | None, algorithm: str | None = None) -> bool:
+        """Verify a complete body in one call"""
+        check = self.start(signature, algorithm)
+        if check is None:
+            return False
+        check.update(payload)
+        return check.verify()
+
+
+class KeyRingCheck:
+    """Signature verification of one request body against a key ring"""
+    
+    __slots__ = ('_ring', '_verifiers', '_check', '_signature', '_algorithm')
+    
+    def __init__(
+        self,
+        ring: "WebhookKeyRing",
+        verifiers: list[WebhookSignatureVerifier],
+        check: SignatureCheck,
+        signature: str,
+        algorithm: str | None
+    ):
+        self._ring = ring
+        self._verifiers = verifiers
+        self._check = check
+        self._signature = signature
+        self._algorithm = algorithm
+    
+    def update(self, chunk: bytes) -> None:
+        """Add the next chunk of the body (only the preferred key is fed)"""
+        self._check.update(chunk)
+    
+    def verify(self, body: bytes) -> bool:
+        """
+        Check the signature, trying the other keys on the full body only
+        when the preferred key does not match
+        """
+        if self._check.verify():
+            return True
+        for verifier in self._verifiers[1:]:
+            if verifier.verify(body, self._signature, self._algorithm):
+                self._ring.promote(verifier)
+                return True
+        return False
+
+
+class WebhookKeyRing:
+    """
+    Active webhook secrets, for rotation without rejected deliveries.
+    
+    Every secret keeps a pre-keyed WebhookSignatureVerifier. The key that
+    last verified a delivery is tried first, so outside a rotation window
+    each delivery costs a single HMAC. Secrets come from the given list
+    and, optionally, a file with one secret per line that is reloaded
+    when it changes (checked at most every ``reload_interval`` seconds).
+    """
+    
+    def __init__(
+        self,
+        secrets: list[str] | None = None,
+        path: str | None = None,
+        reload_interval: float = 10.0,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.secrets = [secret for secret in secrets or [] if secret]
+        self.path = path
+        self.reload_interval = reload_interval
+        self.clock = clock
+        self._verifiers: list[WebhookSignatureVerifier] = []
+        self._by_secret: dict[str, WebhookSignatureVerifier] = {}
+        self._mtime: float | None = None
+        self._checked_at = clock()
+        self.reload()
+    
+    def _read_file(self) -> list[str]:
+        if not self.path:
+            return []
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                lines = [line.strip() for line in f]
+            self._mtime = os.stat(self.path).st_mtime
+        except OSError as e:
+            logger.error(f"Cannot read webhook secrets file {self.path}: {e}")
+            return []
+        return [line for line in lines if line and not line.startswith('#')]
+    
+    def reload(self) -> None:
+        """Rebuild the ring, keeping the state and order of unchanged secrets"""
+        secrets = list(dict.fromkeys(self.secrets + self._read_file()))
+        by_secret = {
+            secret: self._by_secret.get(secret) or WebhookSignatureVerifier(secret)
+            for secret in secrets
+        }
+        
+        # Keys already in use keep their position; new keys are tried last
+        current = [verifier for verifier in self._verifiers if verifier in by_secret.values()]
+        added = [verifier for verifier in by_secret.values() if verifier not in current]
+        
+        self._by_secret = by_secret
+        self._verifiers = current + added
+        self._checked_at = self.clock()
+        logger.info(f"Loaded {len(self._verifiers)} webhook secret(s)")
+    
+    def maybe_reload(self) -> None:
+        """Reload if the secrets file changed; stats it at most every reload_interval"""
+        if not self.path or self.clock() - self._checked_at < self.reload_interval:
+            return
+        self._checked_at = self.clock()
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError:
+            return
+        if mtime != self._mtime:
+            self.reload()
+    
+    def promote(self, verifier: WebhookSignatureVerifier) -> None:
+        """Try this key first from now on"""
+        # Replace rather than mutate, so in-flight checks keep a stable list
+        self._verifiers = [verifier] + [v for v in self._verifiers if v is not verifier]
+    
+    def start(self, signature: str | None, algorithm: str | None = None) -> KeyRingCheck | None:
+        """
+        Begin verifying a body against a signature header
+        
+        Returns:
+            A KeyRingCheck to feed the body to, or None if the header is
+            missing or malformed or the ring is empty
+        """
+        self.maybe_reload()
+        verifiers = self._verifiers
+        if not verifiers:
+            return None
+        
+        check = verifiers[0].start(signature, algorithm)
+        if check is None:
+            return None
+        return KeyRingCheck(self, verifiers, check, signature, algorithm)
+    
+    def verify(self, payload: bytes, signature: str | None, algorithm: str | None = None) -> bool:
+        """Verify a complete body in one call"""
+        check = self.start(signature, algorithm)
+        if check is None:
+            return False
+        check.update(payload)
+        return check.verify(payload)
+    
+    def __len__(self) -> int:
+        return len(self._verifiers)
+
+
+_keyring: tuple[tuple, WebhookKeyRing] | None = None
+
+
+def webhook_verifier() -> WebhookKeyRing | None:
+    """Key ring of the configured webhook secrets, or None if there are none"""
+    global _keyring
+    
+    config = (
+        settings.github_webhook_secret,
+        settings.github_webhook_secrets,
+        settings.github_webhook_secrets_file
+    )
+    if _keyring is None or _keyring[0] != config:
+        secrets = [settings.github_webhook_secret or '']
+        secrets += (settings.github_webhook_secrets or '').split(',')
+        ring = WebhookKeyRing(
+            [secret.strip() for secret in secrets],
+            path=settings.github_webhook_secrets_file,
+            reload_interval=settings.webhook_secrets_reload_interval
+        )
+        _keyring = (config, ring)
+    
+    ring = _keyring[1]
+    if not ring.path and not len(ring):
+        return None
+    return ring
+
+
 def verify_webhook_signature(payload: bytes, signature: str, secret: str | None = None) -> bool:
     """
     Verify GitHub webhook signature using HMAC-SHA256
@@ -25,35 +269,12 @@ def verify_webhook_signature(payload: bytes, signature: str, secret: str | None
     Returns:
         True if signature is valid, False otherwise
     """
-    if not signature:
-        logger.warning("No signature provided in webhook request")
+    verifier = WebhookSignatureVerifier(secret) if secret is not None else webhook_verifier()
+    if verifier is None:
+        logger.error("Webhook secret not configured")
         return False
     
-    # GitHub sends signature as "sha256=<hash>"
-    if not signature.startswith('sha256='):
-        logger.warning("Invalid signature format")
-        return False
-    
-    expected_signature = signature.split('=')[1]
-    
-    # Get secret from settings if not provided
-    if secret is None:
-        from .config import settings
-        secret = settings.github_webhook_secret
-        if secret is None:
-            logger.error("Webhook secret not configured")
-            return False
-    
-    # Calculate HMAC
-    secret_bytes = secret.encode('utf-8')
-    calculated_signature = hmac.new(
-        secret_bytes,
-        payload,
-        hashlib.sha256
-    ).hexdigest()
-    
-    # Constant-time comparison to prevent timing attacks
-    is_valid = hmac.compare_digest(calculated_signature, expected_signature)
+    is_valid = verifier.verify(payload, signature, 'sha256')
     
     if not is_valid:
         logger.warning("Webhook signature verification failed")
@@ -61,7 +282,11 @@ def verify_webhook_signature(payload: bytes, signature: str, secret: str | None
     return is_valid
 
 
-def verify_webhook_signature_sha1(payload: bytes, signature: str, secret: str | None = None) -> bool:
+def verify_webhook_signature_sha1(
+    payload: bytes,
+    signature: str,
+    secret: str | None = None
+) -> bool:
     """
     Verify GitHub webhook signature using HMAC-SHA1 (legacy)
     
@@ -73,36 +298,17 @@ def verify_webhook_signature_sha1(payload: bytes, signature: str, secret: str |
     Returns:
         True if signature is valid, False otherwise
     """
-    if not signature:
-        return False
-    
-    if not signature.startswith('sha1='):
+    verifier = WebhookSignatureVerifier(secret) if secret is not None else webhook_verifier()
+    if verifier is None:
         return False
     
-    expected_signature = signature.split('=')[1]
-    
-    # Get secret from settings if not provided
-    if secret is None:
-        from .config import settings
-        secret = settings.github_webhook_secret
-        if secret is None:
-            return False
-    
-    secret_bytes = secret.encode('utf-8')
-    calculated_signature = hmac.new(
-        secret_bytes,
-        payload,
-        hashlib.sha1
-    ).hexdigest()
-    
-    return hmac.compare_digest(calculated_signature, expected_signature)
+    return verifier.verify(payload, signature, 'sha1')
 
 
 class PAMAuthenticator:
     """PAM-based authentication for privileged operations"""
     
     def __init__(self):
-        from .config import settings
         self.enabled = settings.pam_enabled and PAM_AVAILABLE
         self.service = settings.pam_service
         
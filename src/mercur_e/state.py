@@ -0,0 +1,232 @@
+"""
+Shared state backends for multi-worker deployments of MERCUR-E
+
+When the server runs several worker processes, installation tokens,
+accepted delivery IDs and rate-limit budgets must be visible to all of
+them. They are kept in a small key/value store with per-key expiry:
+SQLite for workers on one host, or Redis (pip install redis) for workers
+spread over several hosts.
+"""
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Callable
+
+try:
+    import redis.asyncio as aioredis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+
+class StateStore(ABC):
+    """Key/value store with optional per-key time-to-live (seconds)"""
+
+    @abstractmethod
+    async def get(self, key: str) -> bytes | None:
+        """Return the value of a key, or None when missing or expired"""
+
+    @abstractmethod
+    async def set(self, key: str, value: bytes, ttl: float | None = None) -> None:
+        """Store a value, replacing any previous one"""
+
+    @abstractmethod
+    async def add(self, key: str, value: bytes, ttl: float | None = None) -> bool:
+        """Store a value only if the key is missing or expired; returns whether it was stored"""
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        """Remove a key"""
+
+    async def close(self) -> None:
+        """Release resources held by the store"""
+
+
+class MemoryStateStore(StateStore):
+    """In-process store; shares nothing between workers (tests, single worker)"""
+
+    def __init__(self, clock: Callable[[], float] = time.time):
+        self.clock = clock
+        self._data: dict[str, tuple[float | None, bytes]] = {}
+
+    def _live(self, key: str) -> bytes | None:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at is not None and expires_at <= self.clock():
+            del self._data[key]
+            return None
+        return value
+
+    def _expiry(self, ttl: float | None) -> float | None:
+        return self.clock() + ttl if ttl is not None else None
+
+    async def get(self, key: str) -> bytes | None:
+        return self._live(key)
+
+    async def set(self, key: str, value: bytes, ttl: float | None = None) -> None:
+        self._data[key] = (self._expiry(ttl), value)
+
+    async def add(self, key: str, value: bytes, ttl: float | None = None) -> bool:
+        if self._live(key) is not None:
+            return False
+        self._data[key] = (self._expiry(ttl), value)
+        return True
+
+    async def delete(self, key: str) -> None:
+        self._data.pop(key, None)
+
+
+def open_private_database(path: str) -> sqlite3.Connection:
+    """
+    Open a WAL-mode SQLite database that only its owner can read
+
+    SQLite creates the -wal and -shm files with the mode of the database
+    file, so the database is made 0600 before WAL is switched on. Files
+    left by earlier runs are tightened as well.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    os.close(os.open(path, os.O_RDWR | os.O_CREAT, 0o600))
+    for file in (path, f"{path}-wal", f"{path}-shm"):
+        try:
+            os.chmod(file, 0o600)
+        except FileNotFoundError:
+            pass
+
+    conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    return conn
+
+
+class SQLiteStateStore(StateStore):
+    """Store shared by the worker processes of one host through a WAL-mode SQLite file"""
+
+    PURGE_EVERY = 1000
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._writes = 0
+        # Installation tokens are stored here
+        self._conn = open_private_database(path)
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS state ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL)"
+        )
+
+    async def _run(self, func: Callable[..., Any], *args: Any) -> Any:
+        return await asyncio.to_thread(self._locked, func, *args)
+
+    def _locked(self, func: Callable[..., Any], *args: Any) -> Any:
+        with self._lock:
+            return func(*args)
+
+    def _get(self, key: str) -> bytes | None:
+        row = self._conn.execute(
+            "SELECT value FROM state WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (key, time.time())
+        ).fetchone()
+        return bytes(row[0]) if row else None
+
+    def _written(self, now: float) -> None:
+        self._writes += 1
+        if self._writes % self.PURGE_EVERY == 0:
+            self._conn.execute("DELETE FROM state WHERE expires_at <= ?", (now,))
+
+    def _set(self, key: str, value: bytes, ttl: float | None) -> None:
+        now = time.time()
+        self._conn.execute(
+            "INSERT OR REPLACE INTO state (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, value, now + ttl if ttl is not None else None)
+        )
+        self._written(now)
+
+    def _add(self, key: str, value: bytes, ttl: float | None) -> bool:
+        now = time.time()
+        # Expired rows count as missing and are overwritten
+        cursor = self._conn.execute(
+            "INSERT INTO state (key, value, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT (key) DO UPDATE "
+            "SET value = excluded.value, expires_at = excluded.expires_at "
+            "WHERE state.expires_at IS NOT NULL AND state.expires_at <= ?",
+            (key, value, now + ttl if ttl is not None else None, now)
+        )
+        self._written(now)
+        return cursor.rowcount > 0
+
+    def _delete(self, key: str) -> None:
+        self._conn.execute("DELETE FROM state WHERE key = ?", (key,))
+
+    async def get(self, key: str) -> bytes | None:
+        return await self._run(self._get, key)
+
+    async def set(self, key: str, value: bytes, ttl: float | None = None) -> None:
+        await self._run(self._set, key, value, ttl)
+
+    async def add(self, key: str, value: bytes, ttl: float | None = None) -> bool:
+        return await self._run(self._add, key, value, ttl)
+
+    async def delete(self, key: str) -> None:
+        await self._run(self._delete, key)
+
+    async def close(self) -> None:
+        await self._run(self._conn.close)
+
+
+class RedisStateStore(StateStore):
+    """Store shared through Redis or a Redis-compatible server"""
+
+    def __init__(self, url: str, prefix: str = "mercur-e:"):
+        if not REDIS_AVAILABLE:
+            raise RuntimeError(
+                "The redis state backend needs the redis package (pip install redis)"
+            )
+        self.prefix = prefix
+        self._redis = aioredis.from_url(url)
+
+    @staticmethod
+    def _px(ttl: float | None) -> int | None:
+        return max(1, int(ttl * 1000)) if ttl is not None else None
+
+    async def get(self, key: str) -> bytes | None:
+        return await self._redis.get(self.prefix + key)
+
+    async def set(self, key: str, value: bytes, ttl: float | None = None) -> None:
+        await self._redis.set(self.prefix + key, value, px=self._px(ttl))
+
+    async def add(self, key: str, value: bytes, ttl: float | None = None) -> bool:
+        return bool(await self._redis.set(self.prefix + key, value, px=self._px(ttl), nx=True))
+
+    async def delete(self, key: str) -> None:
+        await self._redis.delete(self.prefix + key)
+
+    async def close(self) -> None:
+        await self._redis.aclose()
+
+
+def create_state_store(backend: str, path: str, redis_url: str | None = None) -> StateStore:
+    """
+    Create a shared state store for the configured backend
+
+    Args:
+        backend: "sqlite" (workers on one host), "redis" or "memory"
+        path: SQLite database path
+        redis_url: Redis URL for the redis backend
+    """
+    if backend == "sqlite":
+        return SQLiteStateStore(path)
+    if backend == "redis":
+        if not redis_url:
+            raise ValueError("STATE_REDIS_URL is required for the redis state backend")
+        return RedisStateStore(redis_url)
+    if backend == "memory":
+        return MemoryStateStore()
+    raise ValueError(f"Unknown state backend: {backend}")
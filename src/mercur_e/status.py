@@ -0,0 +1,135 @@
+"""
+Pull request head status lookup for MERCUR-E
+
+Resolves the CI state of a commit from its combined status and its check
+runs, going straight from the head SHA instead of paging through the
+pull request's commits. Results are cached per SHA: settled states for a
+long time, pending ones only briefly. Decisions such as the /merge gate
+bypass the cache, as a check can be re-run on the same SHA. With several worker processes, the
+cache is backed by the shared state store, so all of them report the same
+state for a commit.
+"""
+import asyncio
+import json
+from typing import Any
+from loguru import logger
+from .cache import TTLCache
+from .config import settings
+from .github_client import GitHubClient
+from .state import StateStore
+
+
+FINAL_STATES = frozenset({'success', 'failure', 'error'})
+FAILED_CONCLUSIONS = frozenset({
+    'failure', 'timed_out', 'cancelled', 'action_required', 'startup_failure'
+})
+
+
+def summarize_state(combined: dict[str, Any], check_runs: list[dict[str, Any]]) -> str:
+    """Overall CI state from commit statuses and check runs"""
+    states = []
+    if combined.get('total_count'):
+        states.append(combined['state'])
+
+    for run in check_runs:
+        if run.get('status') != 'completed':
+            states.append('pending')
+        elif run.get('conclusion') in FAILED_CONCLUSIONS:
+            states.append('failure')
+        else:
+            states.append('success')
+
+    if not states:
+        return 'pending'
+    for state in ('error', 'failure', 'pending'):
+        if state in states:
+            return state
+    return 'success'
+
+
+class HeadStatusCache:
+    """Per-SHA cache of resolved CI status"""
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        final_ttl: float = 600.0,
+        pending_ttl: float = 15.0,
+        shared: StateStore | None = None
+    ):
+        self._cache = TTLCache(maxsize=maxsize)
+        self.final_ttl = final_ttl
+        self.pending_ttl = pending_ttl
+        self.shared = shared
+
+    async def get(
+        self,
+        gh: GitHubClient,
+        full_name: str,
+        sha: str,
+        fresh: bool = False
+    ) -> dict[str, Any]:
+        """
+        Get the CI status of a commit
+
+        Args:
+            gh: GitHub client for the repository's installation
+            full_name: Repository owner/name
+            sha: Commit SHA, usually the pull request head
+            fresh: Fetch from GitHub even if cached; the result is still stored
+
+        Returns:
+            Dictionary with sha, state, statuses, check_runs and total_count
+        """
+        key = (full_name.lower(), sha)
+        cached = None if fresh else self._cache.get(key)
+        if cached is not None:
+            return cached
+
+        shared_key = f"status:{key[0]}:{sha}"
+        if self.shared is not None and not fresh:
+            try:
+                raw = await self.shared.get(shared_key)
+            except Exception as e:
+                logger.warning("Shared head status lookup failed for {}: {}", sha, e)
+                raw = None
+            if raw is not None:
+                # Briefly, as the shared entry may be close to expiring
+                status = json.loads(raw)
+                self._cache.set(key, status, ttl=self.pending_ttl)
+                return status
+
+        combined, check_runs = await asyncio.gather(
+            gh.get_combined_status(full_name, sha),
+            gh.get_check_runs(full_name, sha)
+        )
+
+        status = {
+            'sha': sha,
+            'state': summarize_state(combined, check_runs),
+            'statuses': combined.get('statuses', []),
+            'check_runs': check_runs,
+            'total_count': combined.get('total_count', 0) + len(check_runs)
+        }
+
+        ttl = self.final_ttl if status['state'] in FINAL_STATES else self.pending_ttl
+        self._cache.set(key, status, ttl=ttl)
+        if self.shared is not None:
+            try:
+                await self.shared.set(shared_key, json.dumps(status).encode(), ttl)
+            except Exception as e:
+                logger.warning("Shared head status store failed for {}: {}", sha, e)
+        return status
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def stats(self) -> dict[str, Any]:
+        return self._cache.stats()
+
+
+# Global head status cache
+head_status_cache = HeadStatusCache(
+    final_ttl=settings.head_status_ttl,
+    pending_ttl=settings.head_status_pending_ttl
+)
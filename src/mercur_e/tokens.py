@@ -0,0 +1,201 @@
+"""
+Installation access token management for MERCUR-E
+"""
+import asyncio
+import json
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+from loguru import logger
+from .state import StateStore
+
+
+@dataclass
+class InstallationToken:
+    """An installation access token and its absolute expiry (epoch seconds)"""
+    token: str
+    expires_at: float
+    issued_at: float
+    last_used: float = 0.0
+
+
+class InstallationTokenManager:
+    """
+    Cache of installation tokens with single-flight, proactive refresh.
+
+    Concurrent requests for the same installation share one mint call.
+    A background task re-mints tokens that are still in use before they
+    come within ``refresh_margin`` seconds of expiry, so request paths
+    normally never wait on GitHub for a token. With a ``shared`` state
+    store, worker processes reuse each other's tokens instead of each
+    minting their own.
+    """
+
+    def __init__(
+        self,
+        mint: Callable[[int], Awaitable[tuple[str, float]]],
+        refresh_margin: float = 300.0,
+        min_validity: float = 60.0,
+        refresh_interval: float = 30.0,
+        clock: Callable[[], float] = time.time,
+        shared: StateStore | None = None
+    ):
+        self.mint = mint
+        self.refresh_margin = refresh_margin
+        self.min_validity = min_validity
+        self.refresh_interval = refresh_interval
+        self.clock = clock
+        self.shared = shared
+        self._tokens: dict[int, InstallationToken] = {}
+        self._locks: dict[int, asyncio.Lock] = {}
+        self._task: asyncio.Task | None = None
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.background_refreshes = 0
+        self.failures = 0
+        self.shared_hits = 0
+
+    def _valid(self, entry: InstallationToken | None, margin: float) -> bool:
+        return entry is not None and entry.expires_at - margin > self.clock()
+
+    async def get(self, installation_id: int) -> str:
+        """
+        Get a valid token for an installation, minting one if needed
+
+        Args:
+            installation_id: GitHub App installation ID
+
+        Returns:
+            Installation access token
+        """
+        entry = self._tokens.get(installation_id)
+        if self._valid(entry, self.min_validity):
+            self.hits += 1
+            entry.last_used = self.clock()
+            return entry.token
+
+        self.misses += 1
+        entry = await self._refresh(installation_id, self.min_validity)
+        entry.last_used = self.clock()
+        return entry.token
+
+    async def _refresh(self, installation_id: int, margin: float) -> InstallationToken:
+        lock = self._locks.setdefault(installation_id, asyncio.Lock())
+        async with lock:
+            # Another coroutine may have refreshed while we waited
+            entry = self._tokens.get(installation_id)
+            if self._valid(entry, margin):
+                return entry
+
+            last_used = entry.last_used if entry else 0.0
+
+            # Another worker may already hold a fresh token
+            shared = await self._load_shared(installation_id, margin)
+            if shared is not None:
+                entry = InstallationToken(shared[0], shared[1], self.clock(), last_used)
+                self._tokens[installation_id] = entry
+                self.shared_hits += 1
+                return entry
+
+            try:
+                token, expires_at = await self.mint(installation_id)
+            except Exception:
+                self.failures += 1
+                raise
+
+            entry = InstallationToken(token, expires_at, self.clock(), last_used)
+            self._tokens[installation_id] = entry
+            self.refreshes += 1
+            await self._store_shared(installation_id, entry)
+            return entry
+
+    async def _load_shared(self, installation_id: int, margin: float) -> tuple[str, float] | None:
+        if self.shared is None:
+            return None
+        try:
+            raw = await self.shared.get(f"token:{installation_id}")
+        except Exception as e:
+            logger.warning(f"Shared token lookup failed for installation {installation_id}: {e}")
+            return None
+        if raw is None:
+            return None
+        data = json.loads(raw)
+        if data['expires_at'] - margin <= self.clock():
+            return None
+        return data['token'], data['expires_at']
+
+    async def _store_shared(self, installation_id: int, entry: InstallationToken) -> None:
+        if self.shared is None:
+            return
+        value = json.dumps({'token': entry.token, 'expires_at': entry.expires_at}).encode()
+        try:
+            await self.shared.set(
+                f"token:{installation_id}", value, ttl=entry.expires_at - self.clock()
+            )
+        except Exception as e:
+            logger.warning(f"Shared token store failed for installation {installation_id}: {e}")
+
+    def invalidate(self, installation_id: int) -> None:
+        """Drop a cached token, e.g. after the installation was removed"""
+        # A shared copy is left to expire: tokens of a removed installation
+        # are revoked by GitHub, and other workers may still cache it anyway
+        self._tokens.pop(installation_id, None)
+
+    async def refresh_expiring(self) -> int:
+        """Re-mint in-use tokens that are close to expiry; returns how many"""
+        now = self.clock()
+        due = [
+            installation_id
+            for installation_id, entry in self._tokens.items()
+            if entry.expires_at - self.refresh_margin <= now
+        ]
+
+        refreshed = 0
+        for installation_id in due:
+            entry = self._tokens[installation_id]
+            # Tokens nobody used since they were minted are left to expire
+            if entry.last_used < entry.issued_at:
+                self._tokens.pop(installation_id, None)
+                continue
+            try:
+                await self._refresh(installation_id, self.refresh_margin)
+                self.background_refreshes += 1
+                refreshed += 1
+            except Exception as e:
+                logger.warning(
+                    f"Background token refresh failed for installation {installation_id}: {e}"
+                )
+
+        return refreshed
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            await self.refresh_expiring()
+
+    def start(self) -> None:
+        """Start the background refresh task"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the background refresh task"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def stats(self) -> dict[str, int | float]:
+        """Cache and refresh counters"""
+        lookups = self.hits + self.misses
+        return {
+            'cached': len(self._tokens),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+            'refreshes': self.refreshes,
+            'background_refreshes': self.background_refreshes,
+            'failures': self.failures,
+            'shared_hits': self.shared_hits
+        }
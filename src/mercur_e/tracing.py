@@ -0,0 +1,297 @@
+"""
+Lightweight request tracing for MERCUR-E
+
+A trace follows one webhook delivery: receiving it, processing it from the
+queue, the slash commands it runs and every GitHub API request they make.
+The current span is kept in a context variable, so it follows asyncio
+tasks without being passed around.
+
+The trace ID is derived from the X-GitHub-Delivery ID, so the webhook
+request and the later queue processing of the same delivery share a
+trace, and the sampling decision is the same in both. Sampling compares a
+hash of the trace ID with the rate, as GUID digits are not uniform (the
+version and variant bits are fixed). Unsampled traces cost a context
+variable lookup per span.
+
+Finished spans are written by a background thread, as JSON lines to a
+local file or as OTLP/HTTP JSON to a collector.
+"""
+import atexit
+import hashlib
+import json
+import os
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Iterator
+import httpx
+from .logsink import BufferedLogSink, RotatingFileWriter
+
+
+SPAN_KINDS = {'internal': 1, 'server': 2, 'client': 3}
+
+_HEX_ID = re.compile(r'^[0-9a-f]{32}$')
+
+
+class Span:
+    """A timed operation within a trace"""
+
+    __slots__ = (
+        'name', 'trace_id', 'span_id', 'parent_id', 'kind', 'start_ns', 'end_ns', 'attributes',
+        'error'
+    )
+
+    sampled = True
+
+    def __init__(
+        self,
+        name: str,
+        trace_id: str,
+        parent_id: str | None = None,
+        kind: str = 'internal',
+        attributes: dict[str, Any] | None = None
+    ):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.kind = kind
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.attributes = attributes or {}
+        self.error: str | None = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'kind': self.kind,
+            'start_ns': self.start_ns,
+            'end_ns': self.end_ns,
+            'duration_ms': round((self.end_ns - self.start_ns) / 1e6, 3),
+            'attributes': self.attributes,
+            'status': 'error' if self.error else 'ok',
+            'error': self.error
+        }
+
+
+class NoopSpan:
+    """Stand-in for spans of unsampled traces"""
+
+    __slots__ = ()
+
+    sampled = False
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+
+NOOP_SPAN = NoopSpan()
+
+current_span: ContextVar[Span | NoopSpan | None] = ContextVar('current_span', default=None)
+
+
+def trace_id_for_delivery(delivery_id: str | None) -> str | None:
+    """Trace ID of a webhook delivery: its GUID as hex, or a hash of other IDs"""
+    if not delivery_id:
+        return None
+    compact = delivery_id.replace('-', '').lower()
+    if _HEX_ID.match(compact):
+        return compact
+    return hashlib.md5(delivery_id.encode(), usedforsecurity=False).hexdigest()
+
+
+class SpanExporter:
+    """Queue of finished spans written in batches by a background thread"""
+
+    def __init__(
+        self,
+        write: Callable[[list[str]], None],
+        name: str = 'traces',
+        maxsize: int = 10000
+    ):
+        self._sink = BufferedLogSink(write, name, maxsize=maxsize)
+
+    def export(self, span: Span) -> None:
+        self._sink(json.dumps(span.to_dict(), default=str) + '\n')
+
+    def stop(self) -> None:
+        self._sink.stop()
+
+    def stats(self) -> dict[str, int | str]:
+        return self._sink.stats()
+
+
+def _otlp_value(value: Any) -> dict[str, Any]:
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+def otlp_writer(
+    endpoint: str,
+    service_name: str,
+    timeout: float = 5.0
+) -> Callable[[list[str]], None]:
+    """Batch writer posting spans to an OTLP/HTTP collector (JSON encoding)"""
+    url = endpoint.rstrip('/') + '/v1/traces'
+    client = httpx.Client(timeout=timeout)
+    resource = {'attributes': [{'key': 'service.name', 'value': {'stringValue': service_name}}]}
+
+    def write(lines: list[str]) -> None:
+        spans = []
+        for line in lines:
+            span = json.loads(line)
+            otlp_span = {
+                'traceId': span['trace_id'],
+                'spanId': span['span_id'],
+                'name': span['name'],
+                'kind': SPAN_KINDS[span['kind']],
+                'startTimeUnixNano': str(span['start_ns']),
+                'endTimeUnixNano': str(span['end_ns']),
+                'attributes': [
+                    {'key': key, 'value': _otlp_value(value)}
+                    for key, value in span['attributes'].items()
+                ],
+                'status': {'code': 2, 'message': span['error']} if span['error'] else {'code': 1}
+            }
+            if span['parent_id']:
+                otlp_span['parentSpanId'] = span['parent_id']
+            spans.append(otlp_span)
+
+        response = client.post(url, json={'resourceSpans': [{
+            'resource': resource,
+            'scopeSpans': [{'scope': {'name': 'mercur_e'}, 'spans': spans}]
+        }]})
+        response.raise_for_status()
+
+    return write
+
+
+def create_span_exporter(
+    kind: str,
+    path: str,
+    otlp_endpoint: str,
+    service_name: str = 'mercur-e'
+) -> SpanExporter | None:
+    """
+    Create the span exporter for the configured destination
+
+    Args:
+        kind: "none", "jsonl" (local file) or "otlp" (OTLP/HTTP collector)
+        path: JSON-lines file for the jsonl exporter
+        otlp_endpoint: Collector base URL for the otlp exporter
+        service_name: service.name resource attribute for OTLP
+    """
+    if kind == 'none':
+        return None
+    if kind == 'jsonl':
+        exporter = SpanExporter(RotatingFileWriter(path))
+    elif kind == 'otlp':
+        exporter = SpanExporter(otlp_writer(otlp_endpoint, service_name))
+    else:
+        raise ValueError(f"Unknown trace exporter: {kind}")
+    atexit.register(exporter.stop)
+    return exporter
+
+
+class Tracer:
+    """Starts traces and spans, and hands sampled ones to the exporter"""
+
+    def __init__(self, exporter: SpanExporter | None = None, sample_rate: float = 1.0):
+        self.configure(exporter, sample_rate)
+
+    def configure(self, exporter: SpanExporter | None, sample_rate: float) -> None:
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+        self._threshold = int(max(0.0, min(1.0, sample_rate)) * (1 << 64))
+
+    def sampled(self, trace_id: str) -> bool:
+        """Whether a trace is recorded; the same for every span of the trace"""
+        if self.exporter is None:
+            return False
+        digest = hashlib.blake2b(trace_id.encode(), digest_size=8).digest()
+        return int.from_bytes(digest, 'big') < self._threshold
+
+    @contextmanager
+    def start_trace(
+        self,
+        name: str,
+        trace_id: str | None = None,
+        kind: str = 'internal',
+        attributes: dict[str, Any] | None = None
+    ) -> Iterator[Span | NoopSpan]:
+        """
+        Start a trace with a root span
+
+        Args:
+            name: Span name
+            trace_id: 32 hex digit trace ID, e.g. from trace_id_for_delivery; random if None
+            kind: "internal", "server" or "client"
+            attributes: Initial span attributes
+        """
+        if self.exporter is None:
+            yield NOOP_SPAN
+            return
+
+        trace_id = trace_id or os.urandom(16).hex()
+        if not self.sampled(trace_id):
+            token = current_span.set(NOOP_SPAN)
+            try:
+                yield NOOP_SPAN
+            finally:
+                current_span.reset(token)
+            return
+
+        with self._record(Span(name, trace_id, None, kind, attributes)) as span:
+            yield span
+
+    @contextmanager
+    def span(
+        self,
+        name: str,
+        kind: str = 'internal',
+        attributes: dict[str, Any] | None = None
+    ) -> Iterator[Span | NoopSpan]:
+        """Start a child of the current span; a no-op outside sampled traces"""
+        parent = current_span.get()
+        if parent is None or not parent.sampled:
+            yield NOOP_SPAN
+            return
+
+        with self._record(Span(name, parent.trace_id, parent.span_id, kind, attributes)) as span:
+            yield span
+
+    @contextmanager
+    def _record(self, span: Span) -> Iterator[Span]:
+        token = current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            current_span.reset(token)
+            span.end_ns = time.time_ns()
+            self.exporter.export(span)
+
+    def stats(self) -> dict[str, Any]:
+        """Sampling rate and exporter counters"""
+        return {
+            'sample_rate': self.sample_rate if self.exporter is not None else 0.0,
+            'exporter': self.exporter.stats() if self.exporter is not None else None
+        }
+
+
+# Global tracer, configured at startup
+tracer = Tracer()
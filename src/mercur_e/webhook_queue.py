@@ -0,0 +1,428 @@
+"""
+Durable webhook delivery queue and worker pool for MERCUR-E
+
+Accepted deliveries are persisted before the webhook endpoint returns,
+then drained by a pool of async workers with retry, exponential backoff
+and a dead-letter table.
+"""
+import asyncio
+import os
+import random
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable
+from loguru import logger
+from .tracing import trace_id_for_delivery, tracer
+
+
+class QueueFullError(Exception):
+    """Raised when the queue is at its configured maximum depth"""
+
+
+@dataclass
+class QueuedDelivery:
+    """A webhook delivery waiting to be processed"""
+    id: int
+    event: str
+    body: bytes
+    delivery_id: str | None = None
+    attempts: int = 0
+
+
+class WebhookQueue(ABC):
+    """Interface implemented by webhook queue backends"""
+
+    def __init__(self, max_depth: int = 0, lease_seconds: float = 300.0):
+        self.max_depth = max_depth
+        self.lease_seconds = lease_seconds
+
+    @abstractmethod
+    async def put(self, event: str, body: bytes, delivery_id: str | None = None) -> int:
+        """Persist a delivery; raises QueueFullError when at max_depth"""
+
+    @abstractmethod
+    async def claim(self) -> QueuedDelivery | None:
+        """Lease the next due delivery, or return None when nothing is due"""
+
+    @abstractmethod
+    async def ack(self, delivery: QueuedDelivery) -> None:
+        """Remove a successfully processed delivery"""
+
+    @abstractmethod
+    async def retry(self, delivery: QueuedDelivery, delay: float, error: str) -> None:
+        """Release a delivery so it becomes due again after delay seconds"""
+
+    @abstractmethod
+    async def dead_letter(self, delivery: QueuedDelivery, error: str) -> None:
+        """Move a delivery to the dead-letter store"""
+
+    @abstractmethod
+    async def depth(self) -> int:
+        """Number of deliveries waiting or in flight"""
+
+    async def close(self) -> None:
+        """Release backend resources"""
+
+
+class MemoryWebhookQueue(WebhookQueue):
+    """Non-durable in-process queue, for development and tests"""
+
+    def __init__(self, max_depth: int = 0, lease_seconds: float = 300.0):
+        super().__init__(max_depth, lease_seconds)
+        self._pending: deque[tuple[float, QueuedDelivery]] = deque()
+        self._in_flight: dict[int, QueuedDelivery] = {}
+        self.dead_letters: list[dict[str, Any]] = []
+        self._next_id = 1
+
+    async def put(self, event: str, body: bytes, delivery_id: str | None = None) -> int:
+        if self.max_depth and await self.depth() >= self.max_depth:
+            raise QueueFullError(f"Webhook queue is full ({self.max_depth} deliveries)")
+
+        delivery = QueuedDelivery(self._next_id, event, body, delivery_id)
+        self._next_id += 1
+        self._pending.append((0.0, delivery))
+        return delivery.id
+
+    async def claim(self) -> QueuedDelivery | None:
+        now = time.time()
+        for index, (due_at, delivery) in enumerate(self._pending):
+            if due_at <= now:
+                del self._pending[index]
+                delivery.attempts += 1
+                self._in_flight[delivery.id] = delivery
+                return delivery
+        return None
+
+    async def ack(self, delivery: QueuedDelivery) -> None:
+        self._in_flight.pop(delivery.id, None)
+
+    async def retry(self, delivery: QueuedDelivery, delay: float, error: str) -> None:
+        self._in_flight.pop(delivery.id, None)
+        self._pending.append((time.time() + delay, delivery))
+
+    async def dead_letter(self, delivery: QueuedDelivery, error: str) -> None:
+        self._in_flight.pop(delivery.id, None)
+        self.dead_letters.append({
+            'delivery_id': delivery.delivery_id,
+            'event': delivery.event,
+            'attempts': delivery.attempts,
+            'error': error
+        })
+
+    async def depth(self) -> int:
+        return len(self._pending) + len(self._in_flight)
+
+
+class SQLiteWebhookQueue(WebhookQueue):
+    """
+    SQLite-backed durable queue running in WAL mode.
+
+    Claimed deliveries are leased rather than deleted, so anything in
+    flight when the process dies becomes due again once its lease expires.
+    Database calls run in a worker thread to keep the event loop free.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS deliveries (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            delivery_id TEXT,
+            event TEXT NOT NULL,
+            body BLOB NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at REAL NOT NULL,
+            locked_until REAL NOT NULL DEFAULT 0,
+            last_error TEXT,
+            created_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_deliveries_due ON deliveries (next_attempt_at);
+        CREATE TABLE IF NOT EXISTS dead_letters (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            delivery_id TEXT,
+            event TEXT NOT NULL,
+            body BLOB NOT NULL,
+            attempts INTEGER NOT NULL,
+            error TEXT,
+            failed_at REAL NOT NULL
+        );
+    """
+
+    def __init__(self, path: str, max_depth: int = 0, lease_seconds: float = 300.0):
+        super().__init__(max_depth, lease_seconds)
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript(self.SCHEMA)
+
+    async def _run(self, func: Callable[..., Any], *args: Any) -> Any:
+        return await asyncio.to_thread(self._locked, func, *args)
+
+    def _locked(self, func: Callable[..., Any], *args: Any) -> Any:
+        with self._lock:
+            return func(*args)
+
+    def _put(self, event: str, body: bytes, delivery_id: str | None) -> int:
+        now = time.time()
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            if self.max_depth:
+                (count,) = self._conn.execute("SELECT COUNT(*) FROM deliveries").fetchone()
+                if count >= self.max_depth:
+                    raise QueueFullError(f"Webhook queue is full ({self.max_depth} deliveries)")
+
+            cursor = self._conn.execute(
+                "INSERT INTO deliveries (delivery_id, event, body, next_attempt_at, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (delivery_id, event, body, now, now)
+            )
+            self._conn.execute("COMMIT")
+            return cursor.lastrowid
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    def _claim(self) -> QueuedDelivery | None:
+        now = time.time()
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = self._conn.execute(
+                "SELECT id, event, body, delivery_id, attempts FROM deliveries "
+                "WHERE next_attempt_at <= ? AND locked_until <= ? "
+                "ORDER BY next_attempt_at, id LIMIT 1",
+                (now, now)
+            ).fetchone()
+
+            if row is None:
+                self._conn.execute("COMMIT")
+                return None
+
+            self._conn.execute(
+                "UPDATE deliveries SET attempts = attempts + 1, locked_until = ? WHERE id = ?",
+                (now + self.lease_seconds, row[0])
+            )
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+
+        return QueuedDelivery(row[0], row[1], bytes(row[2]), row[3], row[4] + 1)
+
+    def _ack(self, delivery_pk: int) -> None:
+        self._conn.execute("DELETE FROM deliveries WHERE id = ?", (delivery_pk,))
+
+    def _retry(self, delivery_pk: int, delay: float, error: str) -> None:
+        self._conn.execute(
+            "UPDATE deliveries SET next_attempt_at = ?, locked_until = 0, last_error = ? "
+            "WHERE id = ?",
+            (time.time() + delay, error, delivery_pk)
+        )
+
+    def _dead_letter(self, delivery: QueuedDelivery, error: str) -> None:
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._conn.execute(
+                "INSERT INTO dead_letters (delivery_id, event, body, attempts, error, failed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (delivery.delivery_id, delivery.event, delivery.body,
+                 delivery.attempts, error, time.time())
+            )
+            self._conn.execute("DELETE FROM deliveries WHERE id = ?", (delivery.id,))
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    def _depth(self) -> int:
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM deliveries").fetchone()
+        return count
+
+    def _dead_letters(self, limit: int) -> list[dict[str, Any]]:
+        rows = self._conn.execute(
+            "SELECT delivery_id, event, attempts, error, failed_at FROM dead_letters "
+            "ORDER BY id DESC LIMIT ?",
+            (limit,)
+        ).fetchall()
+        return [
+            {'delivery_id': r[0], 'event': r[1], 'attempts': r[2], 'error': r[3], 'failed_at': r[4]}
+            for r in rows
+        ]
+
+    async def put(self, event: str, body: bytes, delivery_id: str | None = None) -> int:
+        return await self._run(self._put, event, body, delivery_id)
+
+    async def claim(self) -> QueuedDelivery | None:
+        return await self._run(self._claim)
+
+    async def ack(self, delivery: QueuedDelivery) -> None:
+        await self._run(self._ack, delivery.id)
+
+    async def retry(self, delivery: QueuedDelivery, delay: float, error: str) -> None:
+        await self._run(self._retry, delivery.id, delay, error)
+
+    async def dead_letter(self, delivery: QueuedDelivery, error: str) -> None:
+        await self._run(self._dead_letter, delivery, error)
+
+    async def depth(self) -> int:
+        return await self._run(self._depth)
+
+    async def list_dead_letters(self, limit: int = 50) -> list[dict[str, Any]]:
+        """Most recent dead-lettered deliveries, newest first"""
+        return await self._run(self._dead_letters, limit)
+
+    async def close(self) -> None:
+        await self._run(self._conn.close)
+
+
+def create_webhook_queue(backend: str, path: str, max_depth: int = 0) -> WebhookQueue:
+    """
+    Create a webhook queue for the configured backend
+
+    Args:
+        backend: "sqlite" (durable, default) or "memory"
+        path: SQLite database path
+        max_depth: Maximum queued deliveries (0 for unbounded)
+    """
+    if backend == "sqlite":
+        return SQLiteWebhookQueue(path, max_depth=max_depth)
+    if backend == "memory":
+        return MemoryWebhookQueue(max_depth=max_depth)
+    raise ValueError(f"Unknown webhook queue backend: {backend}")
+
+
+class WebhookWorkerPool:
+    """
+    Pool of async workers draining a WebhookQueue
+
+    Handlers are cancelled after ``handler_timeout`` seconds (by default 80%
+    of the queue's claim lease), so a slow delivery fails before its lease
+    expires instead of being claimed and processed a second time.
+    """
+
+    def __init__(
+        self,
+        queue: WebhookQueue,
+        handler: Callable[[str, bytes], Awaitable[None]],
+        workers: int = 4,
+        max_attempts: int = 5,
+        backoff_base: float = 2.0,
+        backoff_max: float = 300.0,
+        poll_interval: float = 1.0,
+        is_retryable: Callable[[Exception], bool] = lambda exc: True,
+        handler_timeout: float | None = None
+    ):
+        if handler_timeout is None:
+            handler_timeout = queue.lease_seconds * 0.8
+        if handler_timeout >= queue.lease_seconds:
+            raise ValueError(
+                f"Handler timeout ({handler_timeout}s) must be shorter than the "
+                f"claim lease ({queue.lease_seconds}s)"
+            )
+
+        self.queue = queue
+        self.handler = handler
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.poll_interval = poll_interval
+        self.is_retryable = is_retryable
+        self.handler_timeout = handler_timeout
+        self._wakeup = asyncio.Event()
+        self._tasks: list[asyncio.Task] = []
+
+    def start(self) -> None:
+        """Start the worker tasks"""
+        for index in range(self.workers):
+            self._tasks.append(asyncio.create_task(self._worker(index)))
+        logger.info(f"Started {self.workers} webhook worker(s)")
+
+    async def stop(self) -> None:
+        """Stop the workers; leased deliveries are redelivered after restart"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    def notify(self) -> None:
+        """Wake idle workers after a new delivery was queued"""
+        self._wakeup.set()
+
+    def backoff(self, attempts: int) -> float:
+        """Exponential backoff with jitter for the given attempt count"""
+        delay = min(self.backoff_base * (2 ** (attempts - 1)), self.backoff_max)
+        return delay * random.uniform(0.8, 1.2)
+
+    async def _worker(self, index: int) -> None:
+        while True:
+            # Cleared before claiming, so a notify() during the claim is not lost
+            self._wakeup.clear()
+            try:
+                delivery = await self.queue.claim()
+            except Exception as e:
+                logger.error(f"Webhook worker {index} failed to claim a delivery: {e}")
+                delivery = None
+
+            if delivery is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            try:
+                await self.process(delivery)
+            except Exception:
+                # Settling failed (e.g. database locked): the lease expires and it is redelivered
+                logger.exception(
+                    f"Webhook worker {index} failed to settle delivery "
+                    f"{delivery.delivery_id or delivery.id}"
+                )
+
+    async def process(self, delivery: QueuedDelivery) -> None:
+        """Run the handler for one delivery and settle it in the queue"""
+        try:
+            with tracer.start_trace(
+                "webhook.process",
+                trace_id_for_delivery(delivery.delivery_id),
+                attributes={
+                    'event': delivery.event,
+                    'delivery': delivery.delivery_id or '',
+                    'attempt': delivery.attempts
+                }
+            ), logger.contextualize(delivery=delivery.delivery_id):
+                try:
+                    await asyncio.wait_for(
+                        self.handler(delivery.event, delivery.body), self.handler_timeout
+                    )
+                except asyncio.TimeoutError:
+                    raise TimeoutError(
+                        f"Handler timed out after {self.handler_timeout:g}s"
+                    ) from None
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            if self.is_retryable(e) and delivery.attempts < self.max_attempts:
+                delay = self.backoff(delivery.attempts)
+                logger.warning(
+                    f"Delivery {delivery.delivery_id or delivery.id} failed "
+                    f"(attempt {delivery.attempts}/{self.max_attempts}), "
+                    f"retrying in {delay:.1f}s: {error}"
+                )
+                await self.queue.retry(delivery, delay, error)
+            else:
+                logger.error(
+                    f"Delivery {delivery.delivery_id or delivery.id} dead-lettered "
+                    f"after {delivery.attempts} attempt(s): {error}"
+                )
+                await self.queue.dead_letter(delivery, error)
+        else:
+            await self.queue.ack(delivery)
@@ -0,0 +1,115 @@
+"""
+Workflow lookup for the /test command
+
+Each repository's workflows are indexed once by display name and by every
+path suffix (``ci.yml``, ``workflows/ci.yml``, ``.github/workflows/ci.yml``),
+so resolving a /test argument is a dictionary lookup. Indexes are dropped
+when a push touches ``.github/workflows/``.
+
+With several worker processes the push reaches only one of them, so the
+invalidation is also published as a new generation of the repository in
+the shared state store. Every worker compares its index's generation with
+the shared one before using it.
+"""
+import os
+from typing import Any
+from loguru import logger
+from .cache import TTLCache
+from .config import settings
+from .github_client import GitHubClient
+from .state import StateStore
+
+
+WORKFLOWS_DIR = '.github/workflows/'
+
+# GitHub includes at most this many commits in a push payload
+PUSH_PAYLOAD_COMMIT_LIMIT = 20
+
+
+class WorkflowIndex:
+    """A repository's workflows keyed by name and path suffix"""
+
+    def __init__(self, workflows: list[dict[str, Any]]):
+        self._by_key: dict[str, dict[str, Any]] = {}
+        for workflow in workflows:
+            path = workflow['path']
+            parts = path.split('/')
+            for start in range(len(parts)):
+                self._by_key.setdefault('/'.join(parts[start:]), workflow)
+            self._by_key.setdefault(workflow['name'], workflow)
+        self.size = len(workflows)
+
+    def find(self, name: str) -> dict[str, Any] | None:
+        """Workflow whose display name or path suffix matches, if any"""
+        return self._by_key.get(name)
+
+
+class WorkflowIndexCache:
+    """Per-repository cache of workflow indexes"""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 3600.0, shared: StateStore | None = None):
+        self.ttl = ttl
+        self.shared = shared
+        # Repository → (generation it was built at, index)
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    async def _generation(self, key: str) -> bytes | None:
+        if self.shared is None:
+            return None
+        try:
+            return await self.shared.get(f"workflows:{key}")
+        except Exception as e:
+            logger.warning("Shared workflow index lookup failed for {}: {}", key, e)
+            return None
+
+    async def get(self, gh: GitHubClient, full_name: str) -> WorkflowIndex:
+        """Get the workflow index of a repository, building it on first use"""
+        key = full_name.lower()
+        generation = await self._generation(key)
+        cached = self._cache.get(key)
+        if cached is not None and cached[0] == generation:
+            return cached[1]
+
+        index = WorkflowIndex(await gh.get_workflows(full_name))
+        self._cache.set(key, (generation, index))
+        logger.debug("Indexed {} workflow(s) for {}", index.size, full_name)
+        return index
+
+    async def invalidate(self, full_name: str) -> None:
+        """Drop a repository's index here and, through the shared store, in every worker"""
+        key = full_name.lower()
+        self._cache.pop(key)
+        if self.shared is not None:
+            try:
+                await self.shared.set(f"workflows:{key}", os.urandom(8).hex().encode(), self.ttl)
+            except Exception as e:
+                logger.warning("Shared workflow index invalidation failed for {}: {}", key, e)
+
+    async def handle_push(self, full_name: str, payload: dict[str, Any]) -> bool:
+        """
+        Drop a repository's index if a push changed its workflow files
+
+        Returns:
+            True if the index was invalidated
+        """
+        commits = payload.get('commits') or []
+        touched = len(commits) >= PUSH_PAYLOAD_COMMIT_LIMIT or any(
+            path.startswith(WORKFLOWS_DIR)
+            for commit in commits
+            for key in ('added', 'modified', 'removed')
+            for path in commit.get(key, [])
+        )
+        if touched:
+            await self.invalidate(full_name)
+            logger.info("Workflow index for {} invalidated by push", full_name)
+        return touched
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def stats(self) -> dict[str, Any]:
+        return self._cache.stats()
+
+
+# Global workflow index cache
+workflow_indexes = WorkflowIndexCache(ttl=settings.workflow_index_ttl)
@@ -4,6 +4,8 @@ Pytest configuration and fixtures
 import pytest
 import os
 from pathlib import Path
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
 
 
 @pytest.fixture
@@ -18,6 +20,29 @@ def test_env():
         os.environ.pop(key, None)
 
 
+@pytest.fixture(scope="session")
+def rsa_private_key_pem():
+    """Throwaway RSA private key in PEM format"""
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    return key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.TraditionalOpenSSL,
+        serialization.NoEncryption()
+    ).decode('utf-8')
+
+
+@pytest.fixture
+def github_app_settings(tmp_path, monkeypatch, rsa_private_key_pem):
+    """Point the global settings at a test GitHub App and private key"""
+    from mercur_e.config import settings
+    
+    key_path = tmp_path / "private-key.pem"
+    key_path.write_text(rsa_private_key_pem)
+    monkeypatch.setattr(settings, "github_app_id", 123456)
+    monkeypatch.setattr(settings, "github_app_private_key_path", str(key_path))
+    return settings
+
+
 @pytest.fixture
 def sample_webhook_payload():
     """Sample GitHub webhook payload"""
@@ -65,3 +90,58 @@ def sample_pr_payload():
             "id": 12345
         }
     }
+
+
+@pytest.fixture
+def graphql_pull_request():
+    """``data`` of a PullRequestReport GraphQL response"""
+    return {
+        "repository": {
+            "pullRequest": {
+                "number": 123,
+                "title": "Test PR",
+                "state": "OPEN",
+                "merged": False,
+                "isDraft": False,
+                "mergeable": "MERGEABLE",
+                "additions": 100,
+                "deletions": 50,
+                "changedFiles": 5,
+                "headRefName": "feature-branch",
+                "headRefOid": "abc123",
+                "author": {"login": "testuser"},
+                "allCommits": {"totalCount": 3},
+                "comments": {"totalCount": 2},
+                "reviews": {"nodes": [{"comments": {"totalCount": 4}}]},
+                "labels": {"nodes": [{"name": "bug"}]},
+                "files": {
+                    "totalCount": 5,
+                    "pageInfo": {"hasNextPage": True, "endCursor": "Y3Vyc29y"},
+                    "nodes": [
+                        {"path": "src/app.py", "additions": 90, "deletions": 40,
+                         "changeType": "MODIFIED"},
+                        {"path": "docs/old.md", "additions": 0, "deletions": 10,
+                         "changeType": "DELETED"}
+                    ]
+                },
+                "headCommit": {
+                    "nodes": [{
+                        "commit": {
+                            "statusCheckRollup": {
+                                "state": "SUCCESS",
+                                "contexts": {
+                                    "totalCount": 2,
+                                    "nodes": [
+                                        {"__typename": "StatusContext", "context": "ci/legacy",
+                                         "state": "SUCCESS"},
+                                        {"__typename": "CheckRun", "name": "build",
+                                         "status": "COMPLETED", "conclusion": "SUCCESS"}
+                                    ]
+                                }
+                            }
+                        }
+                    }]
+                }
+            }
+        }
+    }
@@ -0,0 +1,59 @@
+"""
+Tests for caching primitives
+"""
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from mercur_e.cache import TTLCache
+
+
+class FakeClock:
+    """Manually advanced clock"""
+    
+    def __init__(self):
+        self.now = 0.0
+    
+    def __call__(self):
+        return self.now
+
+
+class TestTTLCache:
+    """Test the bounded TTL cache"""
+    
+    def test_get_and_set(self):
+        """Test basic lookups and counters"""
+        cache = TTLCache(maxsize=10)
+        cache.set("a", 1)
+        
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+        assert cache.stats()['hits'] == 1
+        assert cache.stats()['misses'] == 1
+    
+    def test_lru_eviction(self):
+        """Test that the least recently used entry is evicted"""
+        cache = TTLCache(maxsize=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        
+        assert "a" in cache
+        assert "b" not in cache
+        assert len(cache) == 2
+    
+    def test_entries_expire(self):
+        """Test default and per-entry time-to-live"""
+        clock = FakeClock()
+        cache = TTLCache(ttl=10, clock=clock)
+        cache.set("short", 1, ttl=1)
+        cache.set("default", 2)
+        
+        clock.now = 5
+        assert cache.get("short") is None
+        assert cache.get("default") == 2
+        
+        clock.now = 11
+        assert cache.get("default") is None
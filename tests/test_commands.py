@@ -1,8 +1,9 @@
 """
 Tests for command parsing and handling
 """
+import asyncio
 import pytest
-from unittest.mock import Mock, AsyncMock, patch
+from unittest.mock import AsyncMock, patch
 import sys
 import os
 
@@ -10,6 +11,10 @@ import os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
 
 from mercur_e.commands import CommandParser, CommandHandler
+from mercur_e.models import PullRequest, Repository
+from mercur_e.ratelimit import RateLimitExceeded
+from mercur_e.status import head_status_cache
+from mercur_e.workflows import workflow_indexes
 
 
 class TestCommandParser:
@@ -64,17 +69,23 @@ class TestCommandParser:
 class TestCommandHandler:
     """Test command handler functionality"""
     
+    @pytest.fixture(autouse=True)
+    def clear_caches(self):
+        """Start every test with empty head status and workflow caches"""
+        head_status_cache.clear()
+        workflow_indexes.clear()
+    
     @pytest.fixture
     def mock_github(self):
-        """Mock GitHub client"""
-        return Mock()
+        """Mock async GitHub client"""
+        gh = AsyncMock()
+        gh.get_check_runs.return_value = []
+        return gh
     
     @pytest.fixture
     def mock_repo(self):
-        """Mock repository"""
-        repo = Mock()
-        repo.default_branch = "main"
-        return repo
+        """Mock repository data"""
+        return Repository({"full_name": "testuser/testrepo", "default_branch": "main"})
     
     @pytest.fixture
     def handler(self, mock_github, mock_repo):
@@ -82,28 +93,43 @@ class TestCommandHandler:
         return CommandHandler(mock_github, mock_repo)
     
     @pytest.mark.asyncio
-    async def test_handle_test_command_success(self, handler, mock_repo):
+    async def test_handle_test_command_success(self, handler, mock_github):
         """Test successful test command execution"""
-        # Mock workflow
-        mock_workflow = Mock()
-        mock_workflow.path = "ci.yml"
-        mock_workflow.create_dispatch = Mock(return_value=True)
-        
-        mock_workflows = Mock()
-        mock_workflows.__iter__ = Mock(return_value=iter([mock_workflow]))
-        mock_repo.get_workflows = Mock(return_value=mock_workflows)
+        mock_github.get_workflows.return_value = [
+            {"id": 1, "name": "CI", "path": ".github/workflows/ci.yml"}
+        ]
+        mock_github.create_workflow_dispatch.return_value = True
         
         result = await handler.handle_test_command(args="ci.yml")
         
         assert result['success'] is True
         assert 'Triggered workflow' in result['message']
+        mock_github.create_workflow_dispatch.assert_awaited_once_with(
+            "testuser/testrepo", 1, ref="main"
+        )
+    
+    @pytest.mark.asyncio
+    async def test_handle_test_command_loads_pr_head(self, handler, mock_github):
+        """Test that a PR known only from an issue_comment payload is fetched once for its head"""
+        mock_github.get_workflows.return_value = [
+            {"id": 1, "name": "CI", "path": ".github/workflows/ci.yml"}
+        ]
+        mock_github.create_workflow_dispatch.return_value = True
+        mock_github.get_pull.return_value = {"number": 7, "head": {"ref": "feature", "sha": "abc"}}
+        pr = PullRequest({"number": 7, "title": "Test PR", "pull_request": {}})
+        
+        await handler.handle_test_command(pr, args="ci.yml")
+        await handler.handle_test_command(pr, args="ci.yml")
+        
+        mock_github.get_pull.assert_awaited_once_with("testuser/testrepo", 7)
+        mock_github.create_workflow_dispatch.assert_awaited_with(
+            "testuser/testrepo", 1, ref="feature"
+        )
     
     @pytest.mark.asyncio
-    async def test_handle_test_command_workflow_not_found(self, handler, mock_repo):
+    async def test_handle_test_command_workflow_not_found(self, handler, mock_github):
         """Test test command with non-existent workflow"""
-        mock_workflows = Mock()
-        mock_workflows.__iter__ = Mock(return_value=iter([]))
-        mock_repo.get_workflows = Mock(return_value=mock_workflows)
+        mock_github.get_workflows.return_value = []
         
         result = await handler.handle_test_command(args="nonexistent.yml")
         
@@ -111,38 +137,66 @@ class TestCommandHandler:
         assert 'not found' in result['message']
     
     @pytest.mark.asyncio
-    async def test_handle_merge_command_success(self, handler):
+    async def test_handle_merge_command_success(self, handler, mock_github):
         """Test successful merge command"""
-        mock_pr = Mock()
-        mock_pr.number = 123
-        mock_pr.mergeable = True
-        mock_pr.title = "Test PR"
-        
-        # Mock commit and status
-        mock_commit = Mock()
-        mock_status = Mock()
-        mock_status.state = "success"
-        mock_commit.get_combined_status = Mock(return_value=mock_status)
-        
-        mock_commits = Mock()
-        mock_commits.reversed = [mock_commit]
-        mock_pr.get_commits = Mock(return_value=mock_commits)
-        
-        # Mock merge result
-        mock_merge_result = Mock()
-        mock_merge_result.merged = True
-        mock_pr.merge = Mock(return_value=mock_merge_result)
+        mock_pr = PullRequest(
+            {"number": 123, "mergeable": True, "title": "Test PR", "head": {"sha": "def"}}
+        )
+        
+        mock_github.get_combined_status.return_value = {
+            "state": "success", "statuses": [{"state": "success"}], "total_count": 1
+        }
+        mock_github.merge_pull.return_value = {"merged": True}
         
         result = await handler.handle_merge_command(mock_pr, "squash")
         
         assert result['success'] is True
         assert 'Successfully merged' in result['message']
+        mock_github.get_combined_status.assert_awaited_once_with("testuser/testrepo", "def")
+    
+    @pytest.mark.asyncio
+    async def test_handle_merge_command_failed_check_run(self, handler, mock_github):
+        """Test that a failed check run blocks the merge"""
+        mock_pr = PullRequest(
+            {"number": 123, "mergeable": True, "title": "Test PR", "head": {"sha": "def"}}
+        )
+        
+        mock_github.get_combined_status.return_value = {
+            "state": "pending", "statuses": [], "total_count": 0
+        }
+        mock_github.get_check_runs.return_value = [
+            {"name": "build", "status": "completed", "conclusion": "failure"}
+        ]
+        
+        result = await handler.handle_merge_command(mock_pr, "squash")
+        
+        assert result['success'] is False
+        assert 'failure' in result['message']
+        mock_github.merge_pull.assert_not_called()
+    
+    @pytest.mark.asyncio
+    async def test_handle_merge_command_rechecks_cached_status(self, handler, mock_github):
+        """Test that a check failing after a cached success still blocks the merge"""
+        mock_pr = PullRequest(
+            {"number": 123, "mergeable": True, "title": "Test PR", "head": {"sha": "def"}}
+        )
+        mock_github.get_combined_status.return_value = {
+            "state": "success", "statuses": [{"state": "success"}], "total_count": 1
+        }
+        await head_status_cache.get(mock_github, "testuser/testrepo", "def")
+        
+        mock_github.get_combined_status.return_value = {
+            "state": "failure", "statuses": [{"state": "failure"}], "total_count": 1
+        }
+        result = await handler.handle_merge_command(mock_pr, "squash")
+        
+        assert result['success'] is False
+        mock_github.merge_pull.assert_not_called()
     
     @pytest.mark.asyncio
     async def test_handle_merge_command_not_mergeable(self, handler):
         """Test merge command on non-mergeable PR"""
-        mock_pr = Mock()
-        mock_pr.mergeable = False
+        mock_pr = PullRequest({"number": 123, "mergeable": False, "head": {"sha": "def"}})
         
         result = await handler.handle_merge_command(mock_pr, "squash")
         
@@ -150,33 +204,95 @@ class TestCommandHandler:
         assert 'merge conflicts' in result['message']
     
     @pytest.mark.asyncio
-    async def test_handle_report_command_pr(self, handler):
+    async def test_handle_report_command_pr(self, handler, mock_github, graphql_pull_request):
         """Test report command on PR"""
-        mock_pr = Mock()
-        mock_pr.number = 123
-        mock_pr.title = "Test PR"
-        mock_pr.state = "open"
-        mock_pr.user = Mock(login="testuser")
-        mock_pr.mergeable = True
-        mock_pr.changed_files = 5
-        mock_pr.additions = 100
-        mock_pr.deletions = 50
-        
-        # Mock commit and status
-        mock_commit = Mock()
-        mock_status = Mock()
-        mock_status.state = "success"
-        mock_status.statuses = []
-        mock_commit.get_combined_status = Mock(return_value=mock_status)
-        
-        mock_commits = Mock()
-        mock_commits.reversed = [mock_commit]
-        mock_pr.get_commits = Mock(return_value=mock_commits)
-        
-        mock_pr.create_comment = Mock()
+        mock_pr = PullRequest({"number": 123, "pull_request": {}})
+        
+        mock_github.graphql.return_value = graphql_pull_request
         
         result = await handler.handle_report_command(pr=mock_pr)
         
         assert result['success'] is True
-        assert 'Posted report' in result['message']
-        mock_pr.create_comment.assert_called_once()
+        assert 'Generated report' in result['message']
+        # Everything the report shows comes from one GraphQL query
+        mock_github.graphql.assert_awaited_once()
+        mock_github.get_combined_status.assert_not_awaited()
+        mock_github.get_pull.assert_not_awaited()
+        # The report is returned for the batched result comment, not posted
+        mock_github.create_comment.assert_not_awaited()
+        report = result['report']
+        assert "**CI Status:** success" in report
+        assert "**build**: success" in report
+        assert "**Files Changed:** 5" in report
+
+    @pytest.mark.asyncio
+    async def test_run_commands_concurrently_until_merge(self, handler):
+        """Test that independent commands overlap and /merge waits for them"""
+        events = []
+        
+        async def execute(command, pr=None, issue=None, args=""):
+            events.append(f"start {command}")
+            await asyncio.sleep(0)
+            events.append(f"end {command}")
+            return {'success': True, 'message': command}
+        
+        handler.execute = execute
+        commands = [
+            {'command': name, 'args': ''} for name in ('test', 'report', 'merge', 'report')
+        ]
+        
+        results = await handler.run_commands(commands, pr=PullRequest({"number": 1}))
+        
+        assert [r['message'] for r in results] == ['test', 'report', 'merge', 'report']
+        assert events[:2] == ['start test', 'start report']
+        assert events[4:] == ['start merge', 'end merge', 'start report', 'end report']
+    
+    @pytest.mark.asyncio
+    async def test_shed_report_is_retried(self, handler, mock_github):
+        """Test that a report shed by the rate limiter fails the delivery instead of posting"""
+        mock_github.graphql.side_effect = RateLimitExceeded(1, 1700000000)
+        commands = [{'command': 'report', 'args': ''}]
+        
+        with pytest.raises(RateLimitExceeded, match="retry after 22:13 UTC"):
+            await handler.run_commands(commands, pr=PullRequest({"number": 7, "pull_request": {}}))
+    
+    @pytest.mark.asyncio
+    async def test_shed_report_deferred_after_side_effects(self, handler, mock_github):
+        """Test that a shed report does not make a retry repeat /test"""
+        mock_github.graphql.side_effect = RateLimitExceeded(1, 1700000000)
+        mock_github.get_workflows.return_value = [
+            {"id": 1, "name": "CI", "path": ".github/workflows/ci.yml"}
+        ]
+        mock_github.create_workflow_dispatch.return_value = True
+        commands = [{'command': 'test', 'args': 'ci.yml'}, {'command': 'report', 'args': ''}]
+        pr = PullRequest({"number": 7, "pull_request": {}, "head": {"ref": "main", "sha": "abc"}})
+        
+        results = await handler.run_commands(commands, pr=pr)
+        
+        assert results[0]['success'] is True
+        assert results[1]['message'] == (
+            "⏳ /report skipped: GitHub rate limit low, retry after 22:13 UTC"
+        )
+    
+    @pytest.mark.asyncio
+    async def test_unknown_command(self, handler):
+        result = await handler.execute('deploy')
+        
+        assert result['success'] is False
+        assert 'Unknown command' in result['message']
+    
+    def test_render_single_result(self):
+        assert CommandHandler.render_results([{'success': True, 'message': '✅ Done'}]) == '✅ Done'
+    
+    def test_render_multiple_results(self):
+        body = CommandHandler.render_results([
+            {'success': True, 'message': '✅ Triggered'},
+            {
+                'success': True,
+                'message': '✅ Generated report',
+                'report': '## 📊 Pull Request Report'
+            },
+        ])
+        
+        assert '- ✅ Triggered\n- ✅ Generated report\n' in body
+        assert body.endswith('## 📊 Pull Request Report')
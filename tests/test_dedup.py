@@ -0,0 +1,101 @@
+"""
+Tests for webhook delivery deduplication
+"""
+import pytest
+from unittest.mock import AsyncMock
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from mercur_e.dedup import DeliveryDeduplicator, SQLiteDeliveryStore
+from mercur_e.state import MemoryStateStore
+
+
+class TestDeliveryDeduplicator:
+    """Test delivery ID deduplication"""
+    
+    @pytest.mark.asyncio
+    async def test_repeat_delivery_detected(self):
+        """Test that a repeated delivery ID is reported as duplicate"""
+        dedup = DeliveryDeduplicator()
+        
+        assert await dedup.check_and_mark("abc") is False
+        assert await dedup.check_and_mark("abc") is True
+        assert dedup.stats() == {'size': 1, 'hits': 1, 'misses': 1}
+    
+    @pytest.mark.asyncio
+    async def test_missing_delivery_id_never_duplicate(self):
+        """Test that deliveries without an ID are always processed"""
+        dedup = DeliveryDeduplicator()
+        
+        assert await dedup.check_and_mark(None) is False
+        assert await dedup.check_and_mark(None) is False
+    
+    @pytest.mark.asyncio
+    async def test_bounded_size(self):
+        """Test that the in-memory index is bounded"""
+        dedup = DeliveryDeduplicator(maxsize=2)
+        for delivery_id in ["a", "b", "c"]:
+            await dedup.check_and_mark(delivery_id)
+        
+        assert dedup.stats()['size'] == 2
+        assert await dedup.check_and_mark("a") is False
+    
+    @pytest.mark.asyncio
+    async def test_forget(self):
+        """Test that forgotten deliveries are processed again"""
+        dedup = DeliveryDeduplicator()
+        await dedup.check_and_mark("abc")
+        await dedup.forget("abc")
+        
+        assert await dedup.check_and_mark("abc") is False
+    
+    @pytest.mark.asyncio
+    async def test_shared_state_across_workers(self):
+        """Test that a delivery accepted by one worker is a repeat for the others"""
+        shared = MemoryStateStore()
+        first = DeliveryDeduplicator(shared=shared)
+        second = DeliveryDeduplicator(shared=shared)
+        
+        assert await first.check_and_mark("abc") is False
+        assert await second.check_and_mark("abc") is True
+        
+        await first.forget("abc")
+        assert await DeliveryDeduplicator(shared=shared).check_and_mark("abc") is False
+    
+    @pytest.mark.asyncio
+    async def test_store_error_unmarks_delivery(self, tmp_path):
+        """Test that an ID is not left marked when recording it fails"""
+        shared = MemoryStateStore()
+        store = SQLiteDeliveryStore(str(tmp_path / "deliveries.db"), ttl=3600)
+        dedup = DeliveryDeduplicator(store=store, shared=shared)
+        add = shared.add
+        shared.add = AsyncMock(side_effect=ConnectionError("state store unavailable"))
+        
+        with pytest.raises(ConnectionError):
+            await dedup.check_and_mark("abc")
+        shared.add = add
+        
+        assert await dedup.check_and_mark("abc") is False
+        store.close()
+    
+    @pytest.mark.asyncio
+    async def test_persistent_store_survives_restart(self, tmp_path):
+        """Test that the persistent store catches repeats after a restart"""
+        path = str(tmp_path / "deliveries.db")
+        first = DeliveryDeduplicator(store=SQLiteDeliveryStore(path, ttl=3600))
+        await first.check_and_mark("abc")
+        first.close()
+        
+        second = DeliveryDeduplicator(store=SQLiteDeliveryStore(path, ttl=3600))
+        
+        assert await second.check_and_mark("abc") is True
+        assert await second.check_and_mark("def") is False
+    
+    def test_store_ttl(self, tmp_path):
+        """Test that expired IDs in the store count as unseen"""
+        store = SQLiteDeliveryStore(str(tmp_path / "deliveries.db"), ttl=0)
+        
+        assert store.add("abc") is True
+        assert store.add("abc") is True
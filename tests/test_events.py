@@ -0,0 +1,43 @@
+"""
+Tests for the webhook event allow-list
+"""
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from mercur_e.events import EventFilter
+
+
+class TestEventFilter:
+    """Test event and action filtering"""
+    
+    def test_spec_parsing(self):
+        events = EventFilter(
+            "issue_comment:created, pull_request:opened,pull_request:synchronize,push"
+        )
+        
+        assert events.events == ['issue_comment', 'pull_request', 'push']
+        assert events.allows('push', 'anything')
+        assert events.allows('pull_request', 'synchronize')
+        assert not events.allows('pull_request', 'labeled')
+        assert not events.allows_event('star')
+    
+    def test_bare_event_allows_every_action(self):
+        events = EventFilter("pull_request:opened,pull_request")
+        
+        assert events.allows('pull_request', 'closed')
+    
+    def test_action_read_from_raw_body(self):
+        events = EventFilter("issue_comment:created")
+        
+        assert events.allows_body('issue_comment', b'{"action":"created","comment":{}}')
+        assert events.allows_body('issue_comment', b'{\n  "action": "created"\n}')
+        assert not events.allows_body('issue_comment', b'{"action":"deleted","comment":{}}')
+    
+    def test_body_without_leading_action_passes(self):
+        """Test that bodies the cheap check cannot read are left to the payload check"""
+        events = EventFilter("issue_comment:created")
+        
+        assert events.allows_body('issue_comment', b'{"comment":{},"action":"deleted"}')
+        assert not events.allows_payload('issue_comment', {"comment": {}, "action": "deleted"})
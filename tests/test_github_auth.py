@@ -0,0 +1,139 @@
+"""
+Tests for GitHub App authentication
+"""
+import httpx
+import jwt
+import pytest
+from unittest.mock import AsyncMock
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from mercur_e.github_auth import GitHubAppAuth
+from mercur_e.state import MemoryStateStore
+
+
+class TestGitHubAppAuth:
+    """Test app JWT generation"""
+    
+    @pytest.fixture
+    def auth(self, github_app_settings):
+        """Create an auth instance for the test app"""
+        return GitHubAppAuth()
+    
+    def test_jwt_claims(self, auth):
+        """Test that the JWT is signed with the app's key and claims"""
+        token = auth.generate_jwt()
+        claims = jwt.decode(
+            token,
+            auth.private_key.public_key(),
+            algorithms=['RS256']
+        )
+        
+        assert claims['iss'] == 123456
+        assert claims['exp'] - claims['iat'] == GitHubAppAuth.JWT_LIFETIME
+    
+    def test_jwt_reused_until_near_expiry(self, auth):
+        """Test that the signed JWT is cached"""
+        first = auth.generate_jwt()
+        
+        assert auth.generate_jwt() is first
+        
+        auth._jwt_expires_at = 0
+        assert auth.generate_jwt() is not first
+    
+    def test_private_key_parsed_once(self, auth):
+        """Test that the key object is loaded once and reused"""
+        assert auth.private_key is auth.private_key
+
+
+class TestInstallationCache:
+    """Test the repository → installation ID cache"""
+    
+    @pytest.fixture
+    def auth(self, github_app_settings):
+        """Create an auth instance for the test app"""
+        return GitHubAppAuth()
+    
+    @pytest.mark.asyncio
+    async def test_cached_lookup_skips_api(self, auth):
+        """Test that a cached repository needs no API call"""
+        await auth.remember_installation("Owner/Repo", 42)
+        auth.client_pool._app_session = None
+        
+        assert await auth.get_installation_id_for_repo("owner", "repo") == 42
+        assert auth.client_pool._app_session is None
+    
+    @pytest.mark.asyncio
+    async def test_installation_repositories_event(self, auth):
+        """Test that added and removed repositories update the cache"""
+        await auth.remember_installation("owner/old", 42)
+        await auth.handle_installation_event('installation_repositories', {
+            "action": "added",
+            "installation": {"id": 42},
+            "repositories_added": [{"full_name": "owner/new"}],
+            "repositories_removed": [{"full_name": "owner/old"}]
+        })
+        
+        assert auth.installation_ids.get("owner/new") == 42
+        assert auth.installation_ids.get("owner/old") is None
+    
+    @pytest.mark.asyncio
+    async def test_installation_deleted_event(self, auth):
+        """Test that a deleted installation drops its repositories"""
+        await auth.remember_installation("owner/a", 42)
+        await auth.remember_installation("owner/b", 7)
+        await auth.handle_installation_event('installation', {
+            "action": "deleted",
+            "installation": {"id": 42}
+        })
+        
+        assert auth.installation_ids.get("owner/a") is None
+        assert auth.installation_ids.get("owner/b") == 7
+    
+    @pytest.mark.asyncio
+    async def test_removed_repository_forgotten_by_other_workers(self, auth):
+        """Test that a removal seen by one worker reaches the others through the shared store"""
+        shared = MemoryStateStore()
+        other = GitHubAppAuth()
+        auth.shared = other.shared = shared
+        await auth.remember_installation("owner/repo", 42)
+        await other.remember_installation("owner/repo", 42)
+        
+        await auth.handle_installation_event('installation_repositories', {
+            "action": "removed",
+            "installation": {"id": 42},
+            "repositories_removed": [{"full_name": "owner/repo"}]
+        })
+        other.client_pool.app_session.get = AsyncMock(return_value=httpx.Response(404))
+        
+        assert await other.get_installation_id_for_repo("owner", "repo") is None
+        other.client_pool.app_session.get.assert_awaited_once()
+    
+    @pytest.mark.asyncio
+    async def test_discover_installations(self, auth, monkeypatch):
+        """Test bulk discovery of installations and their repositories"""
+        def handler(request):
+            if request.url.path == "/app/installations":
+                assert request.headers['Authorization'].startswith("Bearer ")
+                return httpx.Response(200, json=[{"id": 42}])
+            assert request.url.path == "/installation/repositories"
+            return httpx.Response(200, json={"repositories": [{"full_name": "owner/repo"}]})
+        
+        async def token_provider(installation_id):
+            return "installation-token"
+        
+        transport = httpx.MockTransport(handler)
+        auth.client_pool._app_session = httpx.AsyncClient(
+            base_url="https://api.github.com", transport=transport
+        )
+        auth.client_pool.token_provider = token_provider
+        monkeypatch.setattr(
+            auth.client_pool,
+            "new_session",
+            lambda: httpx.AsyncClient(base_url="https://api.github.com", transport=transport)
+        )
+        
+        assert await auth.discover_installations() == 1
+        assert await auth.get_installation_id_for_repo("owner", "repo") == 42
@@ -0,0 +1,204 @@
+"""
+Tests for the async GitHub API client
+"""
+import asyncio
+import pytest
+import httpx
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from mercur_e.github_client import GitHubClient, GitHubClientPool, GitHubAPIError
+
+
+def make_client(handler) -> GitHubClient:
+    """Build a client whose requests are answered by handler"""
+    http = httpx.AsyncClient(
+        base_url="https://api.github.com",
+        transport=httpx.MockTransport(handler)
+    )
+    return GitHubClient("test-token", http=http)
+
+
+class TestGitHubClient:
+    """Test the async GitHub client"""
+    
+    @pytest.mark.asyncio
+    async def test_get_pull_sends_auth_header(self):
+        """Test that requests carry the installation token"""
+        seen = {}
+        
+        def handler(request):
+            seen['auth'] = request.headers['Authorization']
+            seen['path'] = request.url.path
+            return httpx.Response(200, json={"number": 7})
+        
+        gh = make_client(handler)
+        pr = await gh.get_pull("owner/repo", 7)
+        
+        assert pr['number'] == 7
+        assert seen['auth'] == "token test-token"
+        assert seen['path'] == "/repos/owner/repo/pulls/7"
+    
+    @pytest.mark.asyncio
+    async def test_error_response_raises(self):
+        """Test that 4xx responses raise GitHubAPIError"""
+        gh = make_client(lambda request: httpx.Response(404, json={"message": "Not Found"}))
+        
+        with pytest.raises(GitHubAPIError) as exc_info:
+            await gh.get_repo("owner/missing")
+        
+        assert exc_info.value.status_code == 404
+        assert exc_info.value.message == "Not Found"
+    
+    @pytest.mark.asyncio
+    async def test_paginate_follows_link_header(self):
+        """Test that pagination follows the Link header"""
+        def handler(request):
+            if request.url.params.get('page') == '2':
+                return httpx.Response(200, json=[{"sha": "c"}])
+            next_url = "https://api.github.com/repos/o/r/pulls/1/commits?page=2"
+            return httpx.Response(
+                200,
+                json=[{"sha": "a"}, {"sha": "b"}],
+                headers={"Link": f'<{next_url}>; rel="next"'}
+            )
+        
+        gh = make_client(handler)
+        commits = [c async for c in gh.paginate("/repos/o/r/pulls/1/commits")]
+        
+        assert [c['sha'] for c in commits] == ["a", "b", "c"]
+    
+    @pytest.mark.asyncio
+    async def test_create_workflow_dispatch(self):
+        """Test workflow dispatch returns True on 204"""
+        def handler(request):
+            assert request.method == "POST"
+            return httpx.Response(204)
+        
+        gh = make_client(handler)
+        
+        assert await gh.create_workflow_dispatch("o/r", 42, ref="main") is True
+    
+    @pytest.mark.asyncio
+    async def test_graphql_returns_data(self):
+        """Test that GraphQL queries are posted to /graphql"""
+        def handler(request):
+            assert request.method == "POST"
+            assert request.url.path == "/graphql"
+            return httpx.Response(200, json={"data": {"viewer": {"login": "bot"}}})
+        
+        gh = make_client(handler)
+        
+        data = await gh.graphql("query { viewer { login } }")
+        
+        assert data == {"viewer": {"login": "bot"}}
+    
+    @pytest.mark.asyncio
+    async def test_graphql_errors_raise(self):
+        """Test that GraphQL errors reported with a 200 raise GitHubAPIError"""
+        gh = make_client(lambda request: httpx.Response(200, json={
+            "data": {"repository": None},
+            "errors": [{"type": "NOT_FOUND", "message": "Could not resolve to a Repository"}]
+        }))
+        
+        with pytest.raises(GitHubAPIError) as exc_info:
+            await gh.graphql("query { repository(owner: \"o\", name: \"r\") { id } }")
+        
+        assert exc_info.value.status_code == 404
+    
+    def test_graphql_url_for_enterprise(self):
+        """Test that GitHub Enterprise GraphQL lives next to /api/v3"""
+        gh = GitHubClient("token", base_url="https://ghe.example.com/api/v3")
+        
+        assert gh.graphql_url == "https://ghe.example.com/api/graphql"
+
+
+class TestGitHubClientPool:
+    """Test the per-installation client pool"""
+    
+    @pytest.fixture
+    def tokens(self):
+        """Mutable installation → token mapping used by the pool"""
+        return {1: "token-a", 2: "token-b"}
+    
+    @pytest.fixture
+    def pool(self, tokens):
+        """Create a pool backed by the tokens fixture"""
+        async def token_provider(installation_id):
+            return tokens[installation_id]
+        
+        return GitHubClientPool(token_provider, http2=False)
+    
+    @pytest.mark.asyncio
+    async def test_reuses_client_per_installation(self, pool):
+        """Test that the same installation gets the same client"""
+        first = await pool.get(1)
+        second = await pool.get(1)
+        other = await pool.get(2)
+        
+        assert first is second
+        assert other is not first
+        assert len(pool) == 2
+        await pool.aclose()
+    
+    @pytest.mark.asyncio
+    async def test_token_refreshed_in_place(self, pool, tokens):
+        """Test that a rotated token updates the pooled client"""
+        client = await pool.get(1)
+        session = client._http
+        tokens[1] = "token-rotated"
+        
+        refreshed = await pool.get(1)
+        
+        assert refreshed is client
+        assert refreshed._http is session
+        assert refreshed.token == "token-rotated"
+        await pool.aclose()
+    
+    @pytest.mark.asyncio
+    async def test_idle_clients_evicted(self, pool):
+        """Test that idle sessions are closed"""
+        client = await pool.get(1)
+        pool.idle_timeout = 0
+        
+        evicted = await pool.evict_idle()
+        
+        assert evicted == 1
+        assert len(pool) == 0
+        assert client._http.is_closed
+    
+    @pytest.mark.asyncio
+    async def test_busy_clients_not_evicted(self, tokens):
+        """Test that a session with a request in flight outlives the idle timeout"""
+        started = asyncio.Event()
+        release = asyncio.Event()
+        
+        async def handler(request):
+            started.set()
+            await release.wait()
+            return httpx.Response(200, json={"number": 7})
+        
+        async def token_provider(installation_id):
+            return tokens[installation_id]
+        
+        pool = GitHubClientPool(token_provider, http2=False, transport=httpx.MockTransport(handler))
+        gh = await pool.get(1)
+        request = asyncio.create_task(gh.get_pull("owner/repo", 7))
+        await started.wait()
+        pool.idle_timeout = 0
+        
+        assert await pool.evict_idle() == 0
+        release.set()
+        assert (await request)['number'] == 7
+        assert await pool.evict_idle() == 1
+    
+    @pytest.mark.asyncio
+    async def test_borrowed_session_not_closed_by_client(self, pool):
+        """Test that leaving a pooled client's context keeps the session open"""
+        async with await pool.get(1) as gh:
+            pass
+        
+        assert not gh._http.is_closed
+        await pool.aclose()
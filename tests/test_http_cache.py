@@ -0,0 +1,130 @@
+"""
+Tests for the conditional-request response cache
+"""
+import httpx
+import pytest
+import stat
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from mercur_e.github_client import GitHubClient
+from mercur_e.http_cache import CachedResponse, ResponseCache, SQLiteResponseStore
+
+
+class FakeGitHub:
+    """Mock API serving one resource with an ETag"""
+    
+    def __init__(self):
+        self.requests = []
+        self.etag = '"v1"'
+        self.body = {"number": 1, "title": "Test PR"}
+    
+    def __call__(self, request):
+        self.requests.append(request)
+        if request.headers.get('If-None-Match') == self.etag:
+            return httpx.Response(304, headers={"ETag": self.etag})
+        return httpx.Response(200, json=self.body, headers={"ETag": self.etag})
+
+
+def make_client(api, cache, scope=1) -> GitHubClient:
+    http = httpx.AsyncClient(base_url="https://api.github.com", transport=httpx.MockTransport(api))
+    return GitHubClient("token", http=http, cache=cache, scope=scope)
+
+
+class TestResponseCache:
+    """Test ETag revalidation through the GitHub client"""
+    
+    @pytest.mark.asyncio
+    async def test_not_modified_served_from_cache(self):
+        """Test that a 304 returns the cached body"""
+        api = FakeGitHub()
+        cache = ResponseCache()
+        gh = make_client(api, cache)
+        
+        first = await gh.get_pull("o/r", 1)
+        second = await gh.get_pull("o/r", 1)
+        
+        assert first == second == api.body
+        assert 'If-None-Match' not in api.requests[0].headers
+        assert api.requests[1].headers['If-None-Match'] == '"v1"'
+        stats = cache.stats()
+        assert stats['hits'] == 1
+        assert stats['misses'] == 1
+        assert stats['bytes_saved'] > 0
+    
+    @pytest.mark.asyncio
+    async def test_changed_resource_refetched(self):
+        """Test that a new ETag replaces the cached entry"""
+        api = FakeGitHub()
+        cache = ResponseCache()
+        gh = make_client(api, cache)
+        
+        await gh.get_pull("o/r", 1)
+        api.etag = '"v2"'
+        api.body = {"number": 1, "title": "Renamed"}
+        
+        assert (await gh.get_pull("o/r", 1))['title'] == "Renamed"
+        assert (await gh.get_pull("o/r", 1))['title'] == "Renamed"
+        assert cache.stats()['hits'] == 1
+    
+    @pytest.mark.asyncio
+    async def test_entries_scoped_per_installation(self):
+        """Test that installations do not share cached responses"""
+        api = FakeGitHub()
+        cache = ResponseCache()
+        
+        await make_client(api, cache, scope=1).get_pull("o/r", 1)
+        await make_client(api, cache, scope=2).get_pull("o/r", 1)
+        
+        assert 'If-None-Match' not in api.requests[1].headers
+    
+    @pytest.mark.asyncio
+    async def test_disk_store_survives_restart(self, tmp_path):
+        """Test that the SQLite tier revalidates after a restart"""
+        api = FakeGitHub()
+        path = str(tmp_path / "http-cache.db")
+        
+        await make_client(api, ResponseCache(store=SQLiteResponseStore(path))).get_pull("o/r", 1)
+        restarted = ResponseCache(store=SQLiteResponseStore(path))
+        pr = await make_client(api, restarted).get_pull("o/r", 1)
+        
+        assert pr == api.body
+        assert restarted.stats()['hits'] == 1
+    
+    def test_disk_store_keeps_recently_used(self, tmp_path):
+        """Test that the SQLite tier is pruned to its size, least recently used first"""
+        store = SQLiteResponseStore(str(tmp_path / "http-cache.db"), max_entries=2)
+        store.PRUNE_EVERY = 1
+        entry = CachedResponse('"etag"', None, b"{}")
+        store.put("a", entry)
+        store.put("b", entry)
+        store.get("a")
+        store.put("c", entry)
+        
+        assert len(store) == 2
+        assert store.get("a") is not None
+        assert store.get("b") is None
+        store.close()
+    
+    def test_disk_store_private(self, tmp_path):
+        """Test that the SQLite tier is readable by its owner only"""
+        path = tmp_path / "http-cache.db"
+        store = SQLiteResponseStore(str(path))
+        store.put("a", CachedResponse('"etag"', None, b'{"private": true}'))
+        
+        files = sorted(tmp_path.glob("http-cache.db*"))
+        assert [file.suffix for file in files] == [".db", ".db-shm", ".db-wal"]
+        assert all(stat.S_IMODE(os.stat(file).st_mode) == 0o600 for file in files)
+        store.close()
+    
+    @pytest.mark.asyncio
+    async def test_responses_without_validators_not_cached(self):
+        """Test that responses without ETag/Last-Modified are not stored"""
+        cache = ResponseCache()
+        gh = make_client(lambda request: httpx.Response(200, json={}), cache)
+        
+        await gh.get_repo("o/r")
+        
+        assert cache.stats()['entries'] == 0
@@ -0,0 +1,112 @@
+"""
+Tests for the non-blocking log sinks
+"""
+import json
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from loguru import logger
+from mercur_e.logsink import BufferedLogSink, RotatingFileWriter, json_format
+
+
+class TestBufferedLogSink:
+    """Test buffering, batching and dropping"""
+    
+    def test_records_written_in_batches(self):
+        """Test that buffered records reach the writer in order"""
+        batches = []
+        sink = BufferedLogSink(batches.append, "test")
+        for i in range(100):
+            sink(f"line {i}\n")
+        sink.stop()
+        
+        lines = [line for batch in batches for line in batch]
+        assert lines == [f"line {i}\n" for i in range(100)]
+        assert sink.stats()['written'] == 100
+    
+    def test_full_buffer_drops_instead_of_blocking(self):
+        """Test that records are dropped and counted while the writer is stuck"""
+        release = threading.Event()
+        writing = threading.Event()
+        
+        def write(lines):
+            writing.set()
+            release.wait()
+        
+        sink = BufferedLogSink(write, "test", maxsize=2)
+        sink("first\n")
+        writing.wait(1)
+        for _ in range(5):
+            sink("more\n")
+        
+        assert sink.stats()['dropped'] == 3
+        release.set()
+        sink.stop()
+        assert sink.stats()['written'] == 3
+    
+    def test_writer_errors_counted(self):
+        """Test that a failing writer does not kill the writer thread"""
+        calls = []
+        
+        def write(lines):
+            calls.append(lines)
+            if len(calls) == 1:
+                raise OSError("disk full")
+        
+        sink = BufferedLogSink(write, "test", batch_size=1)
+        sink("a\n")
+        sink("b\n")
+        sink.stop()
+        
+        assert sink.stats()['errors'] == 1
+        assert sink.stats()['written'] == 1
+
+
+class TestRotatingFileWriter:
+    """Test size-based rotation"""
+    
+    def test_rotates_at_size(self, tmp_path):
+        """Test that the file is rotated once it reaches the size limit"""
+        path = tmp_path / "bot.log"
+        writer = RotatingFileWriter(str(path), rotation_bytes=10)
+        writer(["0123456789\n"])
+        writer(["after\n"])
+        writer.close()
+        
+        rotated = [name for name in os.listdir(tmp_path) if name != "bot.log"]
+        assert len(rotated) == 1
+        assert path.read_text() == "after\n"
+    
+    def test_workers_share_rotated_file(self, tmp_path):
+        """Test that a worker follows a rotation done by another instead of rotating again"""
+        path = tmp_path / "traces.jsonl"
+        first = RotatingFileWriter(str(path), rotation_bytes=15)
+        second = RotatingFileWriter(str(path), rotation_bytes=15)
+        first(["0123456789abcde\n"])
+        second(["second\n"])
+        first(["first\n"])
+        first.close()
+        second.close()
+        
+        rotated = [name for name in os.listdir(tmp_path) if name != "traces.jsonl"]
+        assert len(rotated) == 1
+        assert (tmp_path / rotated[0]).read_text() == "0123456789abcde\n"
+        assert path.read_text() == "second\nfirst\n"
+
+
+def test_json_format():
+    """Test that records render as one JSON object per line"""
+    lines = []
+    handler = logger.add(lines.append, format=json_format, level="INFO")
+    try:
+        logger.bind(delivery="d1").info("Processing {} event", "push")
+    finally:
+        logger.remove(handler)
+    
+    entry = json.loads(lines[0])
+    assert entry['message'] == "Processing push event"
+    assert entry['level'] == "INFO"
+    assert entry['extra'] == {'delivery': 'd1'}
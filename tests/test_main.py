@@ -0,0 +1,276 @@
+"""
+Tests for the webhook endpoint
+"""
+import hashlib
+import hmac
+import sqlite3
+import httpx
+import pytest
+from unittest.mock import AsyncMock, Mock
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from mercur_e import main
+from mercur_e.dedup import DeliveryDeduplicator
+from mercur_e.github_client import is_transient_error
+from mercur_e.webhook_queue import MemoryWebhookQueue, WebhookWorkerPool
+
+
+@pytest.fixture
+def client():
+    """HTTP client for the app, without running its lifespan"""
+    transport = httpx.ASGITransport(app=main.app)
+    return httpx.AsyncClient(transport=transport, base_url="http://testserver")
+
+
+class TestWebhookPrefilter:
+    """Test that unhandled deliveries are dropped before any real work"""
+    
+    @pytest.mark.asyncio
+    async def test_unhandled_event_ignored(self, client, monkeypatch):
+        monkeypatch.setattr(main, "webhook_verifier", pytest.fail)
+        
+        response = await client.post(
+            "/webhook",
+            content=b'{"starred_at": null}',
+            headers={"X-GitHub-Event": "star", "X-Hub-Signature-256": "sha256=bogus"}
+        )
+        
+        assert response.status_code == 202
+        assert response.json() == {"status": "ignored", "event": "star"}
+    
+    @pytest.mark.asyncio
+    async def test_unhandled_action_ignored_without_decoding(self, client, monkeypatch):
+        monkeypatch.setattr(main, "loads", pytest.fail)
+        
+        response = await client.post(
+            "/webhook",
+            content=b'{"action":"labeled","pull_request":{}}',
+            headers={"X-GitHub-Event": "pull_request", "X-Hub-Signature-256": "sha256=bogus"}
+        )
+        
+        assert response.status_code == 202
+    
+    @pytest.mark.asyncio
+    async def test_handled_event_still_verified(self, client, monkeypatch):
+        monkeypatch.setattr(main.settings, "github_webhook_secret", "secret")
+        
+        response = await client.post(
+            "/webhook",
+            content=b'{"action":"created","comment":{}}',
+            headers={"X-GitHub-Event": "issue_comment", "X-Hub-Signature-256": "sha256=bogus"}
+        )
+        
+        assert response.status_code == 401
+    
+    @pytest.mark.asyncio
+    async def test_ignored_event_skips_github_api(self, monkeypatch):
+        """Test that queued deliveries for unhandled actions never get a client"""
+        monkeypatch.setattr(main.github_auth, "get_github_client", pytest.fail)
+        
+        await main.process_webhook_event(
+            "issue_comment",
+            {"action": "deleted", "repository": {"full_name": "o/r"}, "installation": {"id": 1}}
+        )
+
+
+class TestWebhookDelivery:
+    """Test reading, verifying and queueing deliveries"""
+    
+    @pytest.fixture
+    def app_state(self, monkeypatch):
+        """In-memory queue and deduplicator in place of the lifespan's"""
+        monkeypatch.setattr(main.settings, "github_webhook_secret", "secret")
+        state = main.app.state
+        state.webhook_queue = MemoryWebhookQueue()
+        state.webhook_workers = Mock()
+        state.deduplicator = DeliveryDeduplicator()
+        yield state
+        del state.webhook_queue, state.webhook_workers, state.deduplicator
+    
+    @staticmethod
+    def signed(body, algorithm="sha256"):
+        digest = hmac.new(b"secret", body, getattr(hashlib, algorithm)).hexdigest()
+        header = "X-Hub-Signature-256" if algorithm == "sha256" else "X-Hub-Signature"
+        return {header: f"{algorithm}={digest}"}
+    
+    @pytest.mark.asyncio
+    async def test_signed_delivery_queued(self, client, app_state):
+        body = b'{"action":"created","comment":{"body":"/report"}}'
+        headers = {
+            "X-GitHub-Event": "issue_comment", "X-GitHub-Delivery": "d1", **self.signed(body)
+        }
+        
+        response = await client.post("/webhook", content=body, headers=headers)
+        
+        assert response.status_code == 200
+        assert response.json() == {"status": "accepted", "event": "issue_comment"}
+        delivery = await app_state.webhook_queue.claim()
+        assert delivery.body == body
+    
+    @pytest.mark.asyncio
+    async def test_metrics_recorded(self, client, app_state):
+        body = b'{"ref":"refs/heads/main"}'
+        headers = {"X-GitHub-Event": "push", "X-GitHub-Delivery": "m1", **self.signed(body)}
+        accepted = main.WEBHOOK_DELIVERIES.value("push", "accepted")
+        
+        await client.post("/webhook", content=body, headers=headers)
+        response = await client.get("/metrics")
+        
+        assert response.status_code == 200
+        assert main.WEBHOOK_DELIVERIES.value("push", "accepted") == accepted + 1
+        assert 'mercur_e_webhook_queue_depth 1' in response.text
+        assert 'mercur_e_webhook_phase_seconds_count{phase="verify"}' in response.text
+    
+    @pytest.mark.asyncio
+    async def test_worker_parse_phase_recorded(self, app_state):
+        """Test that the worker reports payload parsing as its own phase"""
+        parsed = main.WEBHOOK_PHASE_SECONDS.count("parse")
+        
+        await main.process_queued_delivery("push", b'{"ref":"refs/heads/main"}')
+        
+        assert main.WEBHOOK_PHASE_SECONDS.count("parse") == parsed + 1
+    
+    @pytest.mark.asyncio
+    async def test_legacy_sha1_signature(self, client, app_state):
+        body = b'{"ref":"refs/heads/main"}'
+        headers = {"X-GitHub-Event": "push", "X-GitHub-Delivery": "d2", **self.signed(body, "sha1")}
+        
+        response = await client.post("/webhook", content=body, headers=headers)
+        
+        assert response.status_code == 200
+    
+    @pytest.mark.asyncio
+    async def test_failed_enqueue_allows_redelivery(self, client, app_state, monkeypatch):
+        body = b'{"ref":"refs/heads/main"}'
+        headers = {"X-GitHub-Event": "push", "X-GitHub-Delivery": "d3", **self.signed(body)}
+        monkeypatch.setattr(
+            app_state.webhook_queue, "put",
+            AsyncMock(side_effect=sqlite3.OperationalError("disk I/O error"))
+        )
+        
+        with pytest.raises(sqlite3.OperationalError):
+            await client.post("/webhook", content=body, headers=headers)
+        monkeypatch.undo()
+        monkeypatch.setattr(main.settings, "github_webhook_secret", "secret")
+        response = await client.post("/webhook", content=body, headers=headers)
+        
+        assert response.json() == {"status": "accepted", "event": "push"}
+        assert await app_state.webhook_queue.depth() == 1
+    
+    @pytest.mark.asyncio
+    async def test_oversized_body_rejected(self, client, app_state, monkeypatch):
+        monkeypatch.setattr(main.settings, "webhook_max_body_size", 16)
+        body = b'{"ref":"refs/heads/' + b"x" * 64 + b'"}'
+        
+        response = await client.post(
+            "/webhook",
+            content=body,
+            headers={"X-GitHub-Event": "push", **self.signed(body)}
+        )
+        
+        assert response.status_code == 413
+    
+    @pytest.mark.asyncio
+    async def test_invalid_json_rejected(self, client, app_state):
+        body = b'ref=refs/heads/main'
+        
+        response = await client.post(
+            "/webhook",
+            content=body,
+            headers={"X-GitHub-Event": "push", **self.signed(body)}
+        )
+        
+        assert response.status_code == 400
+    
+    @pytest.mark.asyncio
+    async def test_malformed_json_dead_lettered_by_worker(self, client, app_state, monkeypatch):
+        """Test that the payload is decoded once, by the worker, which dead-letters bad JSON"""
+        body = b'{"ref": }'
+        monkeypatch.setattr(main, "loads", Mock(wraps=main.loads))
+        
+        response = await client.post(
+            "/webhook",
+            content=body,
+            headers={"X-GitHub-Event": "push", "X-GitHub-Delivery": "d4", **self.signed(body)}
+        )
+        main.loads.assert_not_called()
+        workers = WebhookWorkerPool(
+            app_state.webhook_queue, main.process_queued_delivery, is_retryable=is_transient_error
+        )
+        await workers.process(await app_state.webhook_queue.claim())
+        
+        assert response.status_code == 200
+        assert main.loads.call_count == 1
+        assert len(app_state.webhook_queue.dead_letters) == 1
+
+
+class TestAdminProfile:
+    """Test the PAM-protected profiling endpoint"""
+    
+    @pytest.mark.asyncio
+    async def test_requires_pam(self, client, monkeypatch):
+        monkeypatch.setattr(main.pam_auth, "enabled", False)
+        
+        response = await client.get("/admin/profile", auth=("admin", "secret"))
+        
+        assert response.status_code == 403
+    
+    @pytest.mark.asyncio
+    async def test_rejects_bad_credentials(self, client, monkeypatch):
+        monkeypatch.setattr(main.pam_auth, "enabled", True)
+        monkeypatch.setattr(main.pam_auth, "authenticate", lambda username, password: False)
+        
+        response = await client.get("/admin/profile", auth=("admin", "wrong"))
+        
+        assert response.status_code == 401
+    
+    @pytest.mark.asyncio
+    async def test_returns_collapsed_stacks(self, client, monkeypatch):
+        monkeypatch.setattr(main.pam_auth, "enabled", True)
+        monkeypatch.setattr(main.pam_auth, "authenticate", lambda username, password: True)
+        
+        response = await client.get(
+            "/admin/profile",
+            params={"seconds": 0.05, "interval": 0.001},
+            auth=("admin", "secret")
+        )
+        
+        assert response.status_code == 200
+        assert response.text.startswith("MainThread;")
+
+
+class TestProcessWebhookEvent:
+    """Test event processing from the webhook payload"""
+    
+    @pytest.mark.asyncio
+    async def test_issue_comment_uses_payload(self, monkeypatch, sample_webhook_payload):
+        """Test that the repository and issue come from the payload, not the API"""
+        gh = AsyncMock()
+        gh.__aenter__.return_value = gh
+        monkeypatch.setattr(main.github_auth, "get_github_client", AsyncMock(return_value=gh))
+        sample_webhook_payload['comment']['body'] = "/report"
+        sample_webhook_payload['issue'].update({"state": "open", "labels": [], "comments": 0})
+        
+        await main.process_webhook_event("issue_comment", sample_webhook_payload)
+        
+        gh.get_repo.assert_not_awaited()
+        gh.get_issue.assert_not_awaited()
+        gh.create_comment.assert_awaited_once()
+        assert "Issue Report" in gh.create_comment.await_args.args[2]
+    
+    @pytest.mark.asyncio
+    async def test_result_comment_failure_keeps_delivery(self, monkeypatch, sample_webhook_payload):
+        """Test that a failed result comment does not fail the delivery and re-run commands"""
+        gh = AsyncMock()
+        gh.__aenter__.return_value = gh
+        gh.create_comment.side_effect = httpx.ReadTimeout("timed out")
+        monkeypatch.setattr(main.github_auth, "get_github_client", AsyncMock(return_value=gh))
+        sample_webhook_payload['comment']['body'] = "/report"
+        sample_webhook_payload['issue'].update({"state": "open", "labels": [], "comments": 0})
+        
+        await main.process_webhook_event("issue_comment", sample_webhook_payload)
+        
+        gh.create_comment.assert_awaited_once()
@@ -0,0 +1,80 @@
+"""
+Tests for in-process metrics
+"""
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from mercur_e.metrics import Registry, normalize_route
+
+
+class TestMetrics:
+    """Test metric updates and text rendering"""
+    
+    @pytest.fixture
+    def registry(self):
+        return Registry()
+    
+    def test_counter(self, registry):
+        """Test labelled counters"""
+        counter = registry.counter("requests_total", "Requests", ("method",))
+        counter.inc("GET")
+        counter.inc("GET")
+        counter.inc("POST", amount=3)
+        
+        assert counter.value("GET") == 2
+        assert 'requests_total{method="GET"} 2' in registry.render()
+        assert 'requests_total{method="POST"} 3' in registry.render()
+        assert "# TYPE requests_total counter" in registry.render()
+    
+    def test_histogram_buckets_cumulative(self, registry):
+        """Test that histogram buckets are rendered cumulatively"""
+        histogram = registry.histogram("latency_seconds", "Latency", ("phase",), buckets=(0.1, 1.0))
+        histogram.observe(0.05, "verify")
+        histogram.observe(0.5, "verify")
+        histogram.observe(5, "verify")
+        
+        lines = registry.render().splitlines()
+        assert 'latency_seconds_bucket{phase="verify",le="0.1"} 1' in lines
+        assert 'latency_seconds_bucket{phase="verify",le="1"} 2' in lines
+        assert 'latency_seconds_bucket{phase="verify",le="+Inf"} 3' in lines
+        assert 'latency_seconds_sum{phase="verify"} 5.55' in lines
+        assert 'latency_seconds_count{phase="verify"} 3' in lines
+    
+    def test_histogram_timer(self, registry):
+        """Test timing a block"""
+        histogram = registry.histogram("block_seconds", "Block")
+        with histogram.time():
+            pass
+        
+        assert histogram.count() == 1
+    
+    def test_label_values_escaped(self, registry):
+        """Test that quotes in label values do not break the output"""
+        gauge = registry.gauge("info", "Info", ("name",))
+        gauge.set(1, 'a"b')
+        
+        assert 'info{name="a\\"b"} 1' in registry.render()
+    
+    def test_duplicate_name_rejected(self, registry):
+        """Test that a metric name can only be registered once"""
+        registry.counter("x_total", "X")
+        with pytest.raises(ValueError):
+            registry.counter("x_total", "X")
+
+
+@pytest.mark.parametrize("path,route", [
+    ("/repos/octo/bot/pulls/42/files", "/repos/{owner}/{repo}/pulls/{id}/files"),
+    ("/repos/octo/bot/commits/main/status", "/repos/{owner}/{repo}/commits/{ref}/status"),
+    ("/repos/octo/bot/actions/workflows/ci.yml/dispatches",
+     "/repos/{owner}/{repo}/actions/workflows/{workflow}/dispatches"),
+    ("/repos/octo/bot/contents/docs/index.md", "/repos/{owner}/{repo}/contents/{path}"),
+    ("/app/installations/123/access_tokens", "/app/installations/{id}/access_tokens"),
+    ("/api/v3/repos/octo/bot", "/repos/{owner}/{repo}"),
+    ("/graphql", "/graphql"),
+])
+def test_normalize_route(path, route):
+    """Test that API paths collapse to bounded route templates"""
+    assert normalize_route(path) == route
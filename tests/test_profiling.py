@@ -0,0 +1,95 @@
+"""
+Tests for the sampling profiler and slow-delivery phase timing
+"""
+import threading
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from loguru import logger
+from mercur_e.profiling import SamplingProfiler, record_phase, track_phases
+
+
+def busy_loop(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+class TestSamplingProfiler:
+    """Test stack sampling and output formats"""
+    
+    def test_samples_busy_thread(self):
+        """Test that a busy thread's function shows up in the collapsed stacks"""
+        stop = threading.Event()
+        worker = threading.Thread(target=busy_loop, args=(stop,), name="busy")
+        worker.start()
+        try:
+            profiler = SamplingProfiler(interval=0.001, thread_ids={worker.ident})
+            profiler.run(0.05)
+        finally:
+            stop.set()
+            worker.join()
+        
+        collapsed = profiler.collapsed()
+        assert profiler.sample_count > 0
+        assert all(line.startswith("busy;") for line in collapsed.splitlines())
+        assert "busy_loop (" in collapsed
+    
+    def test_speedscope_format(self):
+        """Test that the speedscope profile references shared frames"""
+        profiler = SamplingProfiler(interval=0.01)
+        profiler.samples = {
+            (("MainThread", "", 0), ("handler", "main.py", 10)): 3,
+            (("MainThread", "", 0), ("verify", "security.py", 20)): 1,
+        }
+        
+        profile = profiler.speedscope()
+        frames = profile['shared']['frames']
+        sampled = profile['profiles'][0]
+        
+        assert len(frames) == 3
+        assert [[frames[i]['name'] for i in stack] for stack in sampled['samples']] == [
+            ["MainThread", "handler"], ["MainThread", "verify"]
+        ]
+        assert sampled['weights'] == [0.03, 0.01]
+
+
+class TestTrackPhases:
+    """Test slow-delivery logging"""
+    
+    def test_slow_work_logged_with_breakdown(self):
+        """Test that work over the threshold logs each phase"""
+        messages = []
+        handler = logger.add(messages.append, format="{message}", level="WARNING")
+        try:
+            with track_phases("push delivery", threshold=0):
+                record_phase("verify", 0.002)
+                record_phase("github_api", 0.1)
+                record_phase("github_api", 0.2)
+        finally:
+            logger.remove(handler)
+        
+        assert len(messages) == 1
+        assert "Slow push delivery" in messages[0]
+        assert "verify 2.0 ms, github_api 300.0 ms ×2" in messages[0]
+    
+    def test_fast_work_not_logged(self):
+        """Test that work under the threshold is silent"""
+        messages = []
+        handler = logger.add(messages.append, level="WARNING")
+        try:
+            with track_phases("push delivery", threshold=60) as timer:
+                record_phase("verify", 0.001)
+        finally:
+            logger.remove(handler)
+        
+        assert messages == []
+        assert timer.phases == {"verify": [0.001, 1]}
+    
+    def test_disabled(self):
+        """Test that no timer is kept without a threshold"""
+        with track_phases("push delivery", threshold=None) as timer:
+            record_phase("verify", 0.001)
+        
+        assert timer is None
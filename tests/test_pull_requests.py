@@ -0,0 +1,96 @@
+"""
+Tests for the GraphQL pull request loader
+"""
+import pytest
+from unittest.mock import AsyncMock
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from mercur_e.pull_requests import load_pull_request, normalize_pull_request
+
+
+class TestNormalizePullRequest:
+    """Test conversion of GraphQL results to REST-style fields"""
+    
+    def test_rest_fields(self, graphql_pull_request):
+        pr = normalize_pull_request(graphql_pull_request['repository']['pullRequest'])
+        
+        assert pr['state'] == 'open'
+        assert pr['user']['login'] == 'testuser'
+        assert pr['mergeable'] is True
+        assert pr['commits'] == 3
+        assert pr['review_comments'] == 4
+        assert pr['labels'] == [{'name': 'bug'}]
+        assert pr['head'] == {'ref': 'feature-branch', 'sha': 'abc123'}
+    
+    def test_ci_contexts(self, graphql_pull_request):
+        pr = normalize_pull_request(graphql_pull_request['repository']['pullRequest'])
+        
+        assert pr['ci']['state'] == 'success'
+        assert pr['ci']['total_count'] == 2
+        assert pr['ci']['statuses'] == [{'context': 'ci/legacy', 'state': 'success'}]
+        assert pr['ci']['check_runs'] == [
+            {'name': 'build', 'status': 'completed', 'conclusion': 'success'}
+        ]
+    
+    def test_failed_check_run(self, graphql_pull_request):
+        node = graphql_pull_request['repository']['pullRequest']
+        contexts = node['headCommit']['nodes'][0]['commit']['statusCheckRollup']['contexts']
+        contexts['nodes'][1]['conclusion'] = 'FAILURE'
+        
+        assert normalize_pull_request(node)['ci']['state'] == 'failure'
+    
+    def test_no_checks_is_pending(self, graphql_pull_request):
+        node = graphql_pull_request['repository']['pullRequest']
+        node['headCommit']['nodes'][0]['commit']['statusCheckRollup'] = None
+        
+        ci = normalize_pull_request(node)['ci']
+        
+        assert ci['state'] == 'pending'
+        assert ci['total_count'] == 0
+    
+    def test_files_page(self, graphql_pull_request):
+        pr = normalize_pull_request(graphql_pull_request['repository']['pullRequest'])
+        
+        assert pr['files'][1] == {
+            'filename': 'docs/old.md',
+            'status': 'removed',
+            'additions': 0,
+            'deletions': 10,
+            'changes': 10
+        }
+        assert pr['files_page'] == {
+            'total_count': 5, 'has_next_page': True, 'end_cursor': 'Y3Vyc29y'
+        }
+
+
+class TestLoadPullRequest:
+    """Test the single-query loader"""
+    
+    @pytest.mark.asyncio
+    async def test_one_query(self, graphql_pull_request):
+        gh = AsyncMock()
+        gh.graphql.return_value = graphql_pull_request
+        
+        pr = await load_pull_request(gh, "owner/repo", 123, files_limit=10)
+        
+        gh.graphql.assert_awaited_once()
+        variables = gh.graphql.await_args.args[1]
+        assert variables['owner'] == 'owner'
+        assert variables['name'] == 'repo'
+        assert variables['withFiles'] is True
+        assert variables['filesFirst'] == 10
+        assert pr['number'] == 123
+    
+    @pytest.mark.asyncio
+    async def test_files_skipped_by_default(self, graphql_pull_request):
+        gh = AsyncMock()
+        del graphql_pull_request['repository']['pullRequest']['files']
+        gh.graphql.return_value = graphql_pull_request
+        
+        pr = await load_pull_request(gh, "owner/repo", 123)
+        
+        assert gh.graphql.await_args.args[1]['withFiles'] is False
+        assert 'files' not in pr
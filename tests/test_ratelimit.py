@@ -0,0 +1,149 @@
+"""
+Tests for rate-limit-aware scheduling
+"""
+import asyncio
+import httpx
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from mercur_e.github_client import GitHubClient, is_transient_error
+from mercur_e.ratelimit import (
+    Priority,
+    RateLimitExceeded,
+    RateLimitScheduler,
+    TokenBucket,
+    priority,
+)
+from mercur_e.state import MemoryStateStore
+
+
+def quota_response(remaining, limit=5000, reset=None, status=200, **headers):
+    """Response carrying rate-limit headers"""
+    return httpx.Response(status, headers={
+        "X-RateLimit-Limit": str(limit),
+        "X-RateLimit-Remaining": str(remaining),
+        "X-RateLimit-Reset": str(reset),
+        **headers
+    })
+
+
+class TestRateLimitScheduler:
+    """Test quota tracking and priority-aware admission"""
+    
+    @pytest.fixture
+    def clock(self):
+        class Clock:
+            now = 1000.0
+            
+            def __call__(self):
+                return self.now
+        return Clock()
+    
+    @pytest.fixture
+    def scheduler(self, clock):
+        return RateLimitScheduler(
+            background_reserve=0.2,
+            max_wait=60,
+            background_max_wait=0,
+            write_rate=1000,
+            clock=clock
+        )
+    
+    @pytest.mark.asyncio
+    async def test_background_shed_inside_reserve(self, scheduler, clock):
+        """Test that background work leaves the reserve for interactive commands"""
+        scheduler.update(1, quota_response(remaining=900, limit=5000, reset=clock.now + 600))
+        
+        with priority(Priority.BACKGROUND):
+            with pytest.raises(RateLimitExceeded):
+                await scheduler.acquire(1, 'GET')
+        
+        # Interactive requests may still use the reserve
+        await scheduler.acquire(1, 'GET')
+        assert scheduler.stats()['shed'] == 1
+        assert scheduler.stats()['installations']['1']['remaining'] == 899
+    
+    @pytest.mark.asyncio
+    async def test_interactive_shed_when_reset_too_far(self, scheduler, clock):
+        """Test that exhausted quota sheds even interactive work beyond max_wait"""
+        scheduler.update(1, quota_response(remaining=0, reset=clock.now + 3000))
+        
+        with pytest.raises(RateLimitExceeded) as exc_info:
+            await scheduler.acquire(1, 'GET')
+        
+        assert exc_info.value.retry_at == clock.now + 3000
+        assert is_transient_error(exc_info.value)
+    
+    @pytest.mark.asyncio
+    async def test_secondary_limit_blocks_installation(self, scheduler, clock):
+        """Test that Retry-After pauses the installation"""
+        scheduler.update(1, quota_response(remaining=100, reset=clock.now + 600, status=403,
+                                           **{"Retry-After": "120"}))
+        
+        with pytest.raises(RateLimitExceeded):
+            await scheduler.acquire(1, 'POST')
+        
+        # Other installations are unaffected
+        await scheduler.acquire(2, 'POST')
+    
+    @pytest.mark.asyncio
+    async def test_graphql_budget_separate_from_rest(self, scheduler, clock):
+        """Test that GraphQL quota is tracked apart from the REST quota"""
+        scheduler.update(1, quota_response(remaining=0, reset=clock.now + 3000))
+        scheduler.update(1, quota_response(remaining=4000, reset=clock.now + 3000), 'graphql')
+        
+        await scheduler.acquire(1, 'POST', 'graphql')
+        with pytest.raises(RateLimitExceeded):
+            await scheduler.acquire(1, 'GET')
+        
+        stats = scheduler.stats()['installations']
+        assert stats['1']['remaining'] == 0
+        assert stats['1:graphql']['remaining'] == 3999
+    
+    @pytest.mark.asyncio
+    async def test_budget_shared_between_workers(self, clock):
+        """Test that a budget observed by one worker is adopted by another"""
+        shared = MemoryStateStore(clock=clock)
+        first = RateLimitScheduler(clock=clock, shared=shared, background_max_wait=0)
+        second = RateLimitScheduler(clock=clock, shared=shared, background_max_wait=0)
+        
+        first.update(1, quota_response(remaining=0, limit=5000, reset=clock.now + 600))
+        await asyncio.gather(*first._publishing)
+        
+        with priority(Priority.BACKGROUND):
+            with pytest.raises(RateLimitExceeded):
+                await second.acquire(1, 'GET')
+        assert second.budget(1).remaining == 0
+    
+    @pytest.mark.asyncio
+    async def test_client_retries_after_short_secondary_limit(self):
+        """Test that the client waits out a short Retry-After and retries"""
+        responses = iter([
+            httpx.Response(403, headers={"Retry-After": "0"}, json={"message": "secondary"}),
+            httpx.Response(201, json={"id": 1}),
+        ])
+        http = httpx.AsyncClient(
+            base_url="https://api.github.com",
+            transport=httpx.MockTransport(lambda request: next(responses))
+        )
+        gh = GitHubClient("token", http=http, scheduler=RateLimitScheduler(), scope=1)
+        
+        comment = await gh.create_comment("o/r", 1, "hello")
+        
+        assert comment['id'] == 1
+
+
+class TestTokenBucket:
+    """Test write pacing"""
+    
+    @pytest.mark.asyncio
+    async def test_burst_then_wait(self):
+        """Test that requests beyond the burst wait for a refill"""
+        bucket = TokenBucket(rate=100, capacity=2)
+        
+        assert await bucket.acquire() == 0
+        assert await bucket.acquire() == 0
+        assert await bucket.acquire() > 0
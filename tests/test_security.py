@@ -9,7 +9,12 @@ import os
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
 
-from mercur_e.security import verify_webhook_signature, verify_webhook_signature_sha1
+from mercur_e.security import (
+    WebhookKeyRing,
+    WebhookSignatureVerifier,
+    verify_webhook_signature,
+    verify_webhook_signature_sha1,
+)
 
 
 class TestWebhookSignature:
@@ -76,6 +81,40 @@ class TestWebhookSignature:
         
         assert verify_webhook_signature_sha1(payload, signature, secret) is False
     
+    def test_incremental_signature(self):
+        """Test verifying a body fed in chunks"""
+        payload = b'{"action": "created", "data": "' + b"x" * 10000 + b'"}'
+        signature = "sha256=" + hmac.new(b"test_secret", payload, hashlib.sha256).hexdigest()
+        
+        verifier = WebhookSignatureVerifier("test_secret")
+        
+        check = verifier.start(signature)
+        for start in range(0, len(payload), 4096):
+            check.update(payload[start:start + 4096])
+        
+        assert check.verify() is True
+        # Every request starts from a fresh copy of the keyed state
+        assert verifier.verify(payload, signature) is True
+        assert verifier.verify(payload + b" ", signature) is False
+    
+    def test_verifier_legacy_sha1(self):
+        """Test that the verifier accepts sha1 signatures unless sha256 is required"""
+        payload = b'{"action": "created"}'
+        signature = "sha1=" + hmac.new(b"test_secret", payload, hashlib.sha1).hexdigest()
+        verifier = WebhookSignatureVerifier("test_secret")
+        
+        assert verifier.verify(payload, signature) is True
+        assert verifier.verify(payload, signature, 'sha256') is False
+    
+    def test_verifier_rejects_bad_headers(self):
+        """Test that unusable signature headers cannot be verified"""
+        verifier = WebhookSignatureVerifier("test_secret")
+        
+        assert verifier.start(None) is None
+        assert verifier.start("md5=abc") is None
+        assert verifier.start("sha256=") is None
+        assert verifier.start("invalid_format") is None
+    
     def test_timing_attack_resistance(self):
         """Test that signature comparison is constant-time"""
         payload = b'{"action": "created"}'
@@ -95,3 +134,49 @@ class TestWebhookSignature:
         # Both should fail
         assert verify_webhook_signature(payload, f"sha256={wrong_sig1}") is False
         assert verify_webhook_signature(payload, f"sha256={wrong_sig2}") is False
+
+
+def sign(payload: bytes, secret: str) -> str:
+    return "sha256=" + hmac.new(secret.encode(), payload, hashlib.sha256).hexdigest()
+
+
+class TestWebhookKeyRing:
+    """Test multi-key verification for secret rotation"""
+    
+    def test_any_active_key_verifies(self):
+        payload = b'{"action": "created"}'
+        ring = WebhookKeyRing(["new", "old"])
+        
+        assert ring.verify(payload, sign(payload, "new")) is True
+        assert ring.verify(payload, sign(payload, "old")) is True
+        assert ring.verify(payload, sign(payload, "unknown")) is False
+    
+    def test_successful_key_tried_first(self):
+        """Test that only one HMAC is computed once a key has matched"""
+        payload = b'{"action": "created"}'
+        ring = WebhookKeyRing(["old", "new"])
+        assert ring.verify(payload, sign(payload, "new")) is True
+        
+        check = ring.start(sign(payload, "new"))
+        check.update(payload)
+        
+        # The preferred key matches without the fallback pass over the body
+        assert check.verify(b"") is True
+    
+    def test_secrets_file_reloaded_on_change(self, tmp_path):
+        payload = b'{"action": "created"}'
+        path = tmp_path / "secrets"
+        path.write_text("# active secrets\nfirst\n")
+        clock = type("Clock", (), {"now": 0.0, "__call__": lambda self: self.now})()
+        ring = WebhookKeyRing(path=str(path), reload_interval=10, clock=clock)
+        
+        assert ring.verify(payload, sign(payload, "first")) is True
+        
+        path.write_text("second\n")
+        os.utime(path, (1, 1))
+        # Not re-checked before the interval has passed
+        assert ring.verify(payload, sign(payload, "second")) is False
+        
+        clock.now = 11
+        assert ring.verify(payload, sign(payload, "second")) is True
+        assert ring.verify(payload, sign(payload, "first")) is False
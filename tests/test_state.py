@@ -0,0 +1,90 @@
+"""
+Tests for shared state stores
+"""
+import os
+import stat
+import sys
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from mercur_e.state import SQLiteStateStore, create_state_store
+
+
+class TestStateStores:
+    """Test get/set/add semantics shared by the backends"""
+    
+    @pytest.fixture(params=["memory", "sqlite"])
+    async def store(self, request, tmp_path):
+        store = create_state_store(request.param, str(tmp_path / "state.db"))
+        yield store
+        await store.close()
+    
+    @pytest.mark.asyncio
+    async def test_set_get_delete(self, store):
+        """Test basic key/value operations"""
+        assert await store.get("a") is None
+        await store.set("a", b"1")
+        assert await store.get("a") == b"1"
+        await store.set("a", b"2")
+        assert await store.get("a") == b"2"
+        await store.delete("a")
+        assert await store.get("a") is None
+    
+    @pytest.mark.asyncio
+    async def test_add_only_if_missing(self, store):
+        """Test that add does not replace a live key"""
+        assert await store.add("a", b"1", ttl=60) is True
+        assert await store.add("a", b"2", ttl=60) is False
+        assert await store.get("a") == b"1"
+    
+    @pytest.mark.asyncio
+    async def test_expired_keys(self, store):
+        """Test that expired keys read as missing and can be added again"""
+        await store.set("a", b"1", ttl=-1)
+        assert await store.get("a") is None
+        assert await store.add("a", b"2", ttl=60) is True
+        assert await store.get("a") == b"2"
+
+
+class TestSQLiteStateStore:
+    """Test the SQLite backend"""
+    
+    @pytest.mark.asyncio
+    async def test_shared_between_connections(self, tmp_path):
+        """Test that two stores on one file, like two workers, see each other's keys"""
+        path = str(tmp_path / "state.db")
+        first, second = SQLiteStateStore(path), SQLiteStateStore(path)
+        
+        assert await first.add("delivery:abc", b"1", ttl=60) is True
+        assert await second.add("delivery:abc", b"1", ttl=60) is False
+        
+        await first.close()
+        await second.close()
+    
+    def test_file_private(self, tmp_path):
+        """Test that the database, which holds tokens, is only readable by its owner"""
+        path = tmp_path / "state.db"
+        SQLiteStateStore(str(path))
+        
+        assert stat.S_IMODE(path.stat().st_mode) == 0o600
+    
+    @pytest.mark.asyncio
+    async def test_wal_files_private(self, tmp_path):
+        """Test that tokens written to the WAL and shared-memory files stay private too"""
+        path = tmp_path / "state.db"
+        store = SQLiteStateStore(str(path))
+        await store.set("token:1", b"ghs_secret", ttl=60)
+        
+        files = sorted(tmp_path.glob("state.db*"))
+        assert [file.name for file in files] == ["state.db", "state.db-shm", "state.db-wal"]
+        assert all(stat.S_IMODE(file.stat().st_mode) == 0o600 for file in files)
+        await store.close()
+
+
+def test_unknown_backend():
+    """Test that misconfigured backends fail at startup"""
+    with pytest.raises(ValueError):
+        create_state_store("etcd", "./state.db")
+    with pytest.raises(ValueError):
+        create_state_store("redis", "./state.db")
@@ -0,0 +1,95 @@
+"""
+Tests for pull request head status resolution
+"""
+import pytest
+from unittest.mock import AsyncMock
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from mercur_e.state import MemoryStateStore
+from mercur_e.status import HeadStatusCache, summarize_state
+
+
+def check_run(status="completed", conclusion="success"):
+    return {"name": "build", "status": status, "conclusion": conclusion}
+
+
+class TestSummarizeState:
+    """Test combining commit statuses and check runs"""
+    
+    def test_no_checks_is_pending(self):
+        assert summarize_state({"state": "pending", "total_count": 0}, []) == 'pending'
+    
+    def test_check_runs_only(self):
+        """Test repositories that only use GitHub Actions check runs"""
+        combined = {"state": "pending", "total_count": 0}
+        
+        assert summarize_state(combined, [check_run()]) == 'success'
+        in_progress = check_run(status="in_progress", conclusion=None)
+        assert summarize_state(combined, [in_progress]) == 'pending'
+        timed_out = check_run(conclusion="timed_out")
+        assert summarize_state(combined, [check_run(), timed_out]) == 'failure'
+    
+    def test_status_failure_wins(self):
+        assert summarize_state({"state": "failure", "total_count": 1}, [check_run()]) == 'failure'
+
+
+class TestHeadStatusCache:
+    """Test per-SHA caching"""
+    
+    @pytest.fixture
+    def gh(self):
+        gh = AsyncMock()
+        gh.get_combined_status.return_value = {"state": "success", "statuses": [], "total_count": 1}
+        gh.get_check_runs.return_value = [check_run()]
+        return gh
+    
+    @pytest.mark.asyncio
+    async def test_repeated_lookups_are_free(self, gh):
+        """Test that a settled SHA is only fetched once"""
+        cache = HeadStatusCache()
+        
+        first = await cache.get(gh, "o/r", "abc")
+        second = await cache.get(gh, "o/r", "abc")
+        
+        assert first is second
+        assert first['total_count'] == 2
+        gh.get_combined_status.assert_awaited_once_with("o/r", "abc")
+        gh.get_check_runs.assert_awaited_once_with("o/r", "abc")
+    
+    @pytest.mark.asyncio
+    async def test_pending_state_expires_quickly(self, gh):
+        """Test that pending results are not cached past their short TTL"""
+        gh.get_check_runs.return_value = [check_run(status="queued", conclusion=None)]
+        cache = HeadStatusCache(pending_ttl=0)
+        
+        await cache.get(gh, "o/r", "abc")
+        await cache.get(gh, "o/r", "abc")
+        
+        assert gh.get_combined_status.await_count == 2
+    
+    @pytest.mark.asyncio
+    async def test_fresh_lookup_bypasses_cache(self, gh):
+        """Test that a fresh lookup refetches a settled SHA and updates the cache"""
+        cache = HeadStatusCache(shared=MemoryStateStore())
+        await cache.get(gh, "o/r", "abc")
+        gh.get_check_runs.return_value = [check_run(conclusion="failure")]
+        
+        fresh = await cache.get(gh, "o/r", "abc", fresh=True)
+        
+        assert fresh['state'] == 'failure'
+        assert (await cache.get(gh, "o/r", "abc"))['state'] == 'failure'
+        assert gh.get_combined_status.await_count == 2
+    
+    @pytest.mark.asyncio
+    async def test_shared_across_workers(self, gh):
+        """Test that a status fetched by one worker is reused by the others"""
+        shared = MemoryStateStore()
+        
+        first = await HeadStatusCache(shared=shared).get(gh, "o/r", "abc")
+        second = await HeadStatusCache(shared=shared).get(gh, "o/r", "abc")
+        
+        assert second == first
+        gh.get_combined_status.assert_awaited_once_with("o/r", "abc")
@@ -0,0 +1,119 @@
+"""
+Tests for installation token management
+"""
+import asyncio
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from mercur_e.state import MemoryStateStore
+from mercur_e.tokens import InstallationTokenManager
+
+
+class FakeClock:
+    """Manually advanced clock"""
+    
+    def __init__(self):
+        self.now = 1000.0
+    
+    def __call__(self):
+        return self.now
+
+
+class TestInstallationTokenManager:
+    """Test token caching and refresh"""
+    
+    @pytest.fixture
+    def clock(self):
+        return FakeClock()
+    
+    @pytest.fixture
+    def minted(self):
+        """Installation IDs passed to the mint function"""
+        return []
+    
+    @pytest.fixture
+    def manager(self, clock, minted):
+        """Token manager whose tokens live for one hour"""
+        async def mint(installation_id):
+            minted.append(installation_id)
+            await asyncio.sleep(0)
+            return f"token-{len(minted)}", clock.now + 3600
+        
+        return InstallationTokenManager(mint, refresh_margin=300, clock=clock)
+    
+    @pytest.mark.asyncio
+    async def test_token_cached_until_expiry(self, manager, clock, minted):
+        """Test that tokens are reused until close to their real expiry"""
+        assert await manager.get(1) == "token-1"
+        clock.now += 3500
+        assert await manager.get(1) == "token-1"
+        clock.now += 60
+        assert await manager.get(1) == "token-2"
+        assert minted == [1, 1]
+    
+    @pytest.mark.asyncio
+    async def test_single_flight(self, manager, minted):
+        """Test that concurrent callers share one mint call"""
+        tokens = await asyncio.gather(*(manager.get(1) for _ in range(10)))
+        
+        assert set(tokens) == {"token-1"}
+        assert minted == [1]
+        assert manager.stats()['refreshes'] == 1
+    
+    @pytest.mark.asyncio
+    async def test_background_refresh_before_expiry(self, manager, clock, minted):
+        """Test that in-use tokens are re-minted ahead of expiry"""
+        await manager.get(1)
+        clock.now += 1
+        await manager.get(1)
+        clock.now += 3400
+        
+        assert await manager.refresh_expiring() == 1
+        assert await manager.get(1) == "token-2"
+        assert manager.stats()['background_refreshes'] == 1
+    
+    @pytest.mark.asyncio
+    async def test_unused_tokens_not_refreshed(self, manager, clock, minted):
+        """Test that installations idle for a whole token lifetime are left to expire"""
+        await manager.get(1)
+        clock.now += 3400
+        assert await manager.refresh_expiring() == 1
+        
+        clock.now += 3400
+        assert await manager.refresh_expiring() == 0
+        assert manager.stats()['cached'] == 0
+    
+    @pytest.mark.asyncio
+    async def test_hit_miss_counters(self, manager):
+        """Test hit and miss accounting"""
+        await manager.get(1)
+        await manager.get(1)
+        
+        stats = manager.stats()
+        assert stats['hits'] == 1
+        assert stats['misses'] == 1
+    
+    @pytest.mark.asyncio
+    async def test_shared_token_reused_across_workers(self, clock, minted):
+        """Test that a token minted by one worker is adopted by another"""
+        async def mint(installation_id):
+            minted.append(installation_id)
+            return f"token-{len(minted)}", clock.now + 3600
+        
+        shared = MemoryStateStore(clock=clock)
+        first = InstallationTokenManager(mint, clock=clock, shared=shared)
+        second = InstallationTokenManager(mint, clock=clock, shared=shared)
+        
+        assert await first.get(1) == "token-1"
+        assert await second.get(1) == "token-1"
+        assert minted == [1]
+        assert second.stats()['shared_hits'] == 1
+        
+        # Near expiry the shared token is not adopted but replaced
+        clock.now += 3550
+        assert await second.get(1) == "token-2"
+        assert await first.get(1) == "token-2"
+        assert minted == [1, 1]
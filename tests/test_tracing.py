@@ -0,0 +1,125 @@
+"""
+Tests for request tracing
+"""
+import httpx
+import pytest
+import sys
+import os
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from mercur_e.github_client import GitHubClient
+from mercur_e.tracing import NOOP_SPAN, Tracer, trace_id_for_delivery, tracer as global_tracer
+
+
+class RecordingExporter:
+    """Exporter keeping finished spans in memory"""
+    
+    def __init__(self):
+        self.spans = []
+    
+    def export(self, span):
+        self.spans.append(span)
+
+
+@pytest.fixture
+def exporter():
+    return RecordingExporter()
+
+
+def test_trace_id_for_delivery():
+    """Test that delivery GUIDs become trace IDs, and other IDs are hashed"""
+    trace_id = trace_id_for_delivery("72d3162e-cc78-11e3-81ab-4c9367dc0958")
+    assert trace_id == "72d3162ecc7811e381ab4c9367dc0958"
+    assert len(trace_id_for_delivery("redelivery-1")) == 32
+    assert trace_id_for_delivery("redelivery-1") == trace_id_for_delivery("redelivery-1")
+    assert trace_id_for_delivery(None) is None
+
+
+class TestTracer:
+    """Test span nesting, sampling and export"""
+    
+    def test_child_spans_linked(self, exporter):
+        """Test that spans nest under the current span of the trace"""
+        tracer = Tracer(exporter, sample_rate=1.0)
+        
+        with tracer.start_trace("webhook", "a" * 32) as root:
+            with tracer.span("command /merge") as child:
+                child.set_attribute("outcome", "success")
+        
+        assert [span.name for span in exporter.spans] == ["command /merge", "webhook"]
+        assert child.parent_id == root.span_id
+        assert child.trace_id == root.trace_id == "a" * 32
+        assert child.attributes == {"outcome": "success"}
+        assert root.end_ns >= child.end_ns > 0
+    
+    def test_error_recorded(self, exporter):
+        """Test that an exception marks the span as failed"""
+        tracer = Tracer(exporter)
+        
+        with pytest.raises(RuntimeError):
+            with tracer.start_trace("webhook"):
+                raise RuntimeError("boom")
+        
+        assert exporter.spans[0].to_dict()['status'] == 'error'
+        assert exporter.spans[0].error == "RuntimeError: boom"
+    
+    def test_sampling_follows_trace_id(self, exporter):
+        """Test that the sampling decision is the same wherever a trace is continued"""
+        tracer = Tracer(exporter, sample_rate=0.5)
+        unsampled = next(
+            trace_id for trace_id in (f"{n:032x}" for n in range(100))
+            if not tracer.sampled(trace_id)
+        )
+        
+        assert tracer.sampled(unsampled) is tracer.sampled(unsampled)
+        with tracer.start_trace("webhook", unsampled) as root:
+            with tracer.span("child") as child:
+                pass
+        
+        assert root is NOOP_SPAN and child is NOOP_SPAN
+        assert exporter.spans == []
+    
+    def test_sample_rate_of_delivery_guids(self, exporter):
+        """Test that the sampled share of random delivery GUIDs matches the rate"""
+        tracer = Tracer(exporter, sample_rate=0.1)
+        
+        sampled = sum(
+            tracer.sampled(trace_id_for_delivery(str(uuid.uuid4()))) for _ in range(20000)
+        )
+        
+        assert 0.08 < sampled / 20000 < 0.12
+    
+    def test_spans_outside_trace_not_recorded(self, exporter):
+        """Test that work outside any trace records nothing"""
+        tracer = Tracer(exporter)
+        
+        with tracer.span("GET /repos/{owner}/{repo}") as span:
+            pass
+        
+        assert span is NOOP_SPAN
+        assert exporter.spans == []
+    
+    @pytest.mark.asyncio
+    async def test_github_requests_traced(self, exporter):
+        """Test that outbound GitHub requests become client spans"""
+        http = httpx.AsyncClient(
+            base_url="https://api.github.com",
+            transport=httpx.MockTransport(lambda request: httpx.Response(
+                200, json={"number": 42}, headers={"X-RateLimit-Remaining": "4999"}
+            ))
+        )
+        gh = GitHubClient("test-token", http=http)
+        global_tracer.configure(exporter, 1.0)
+        try:
+            with global_tracer.start_trace("webhook"):
+                await gh.get_pull("octo/bot", 42)
+        finally:
+            global_tracer.configure(None, 1.0)
+        
+        request_span = exporter.spans[0]
+        assert request_span.name == "GET /repos/{owner}/{repo}/pulls/{id}"
+        assert request_span.kind == "client"
+        assert request_span.attributes['http.response.status_code'] == 200
+        assert request_span.attributes['github.ratelimit.remaining'] == 4999
@@ -0,0 +1,223 @@
+"""
+Tests for the durable webhook queue and worker pool
+"""
+import asyncio
+import sqlite3
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from mercur_e.webhook_queue import (
+    MemoryWebhookQueue,
+    QueueFullError,
+    SQLiteWebhookQueue,
+    WebhookWorkerPool,
+)
+
+
+class TestSQLiteWebhookQueue:
+    """Test the SQLite queue backend"""
+    
+    @pytest.fixture
+    def queue(self, tmp_path):
+        """Create a queue in a temporary database"""
+        return SQLiteWebhookQueue(str(tmp_path / "queue.db"))
+    
+    @pytest.mark.asyncio
+    async def test_put_and_claim(self, queue):
+        """Test that a queued delivery can be claimed"""
+        await queue.put("issue_comment", b'{"action": "created"}', "delivery-1")
+        
+        delivery = await queue.claim()
+        
+        assert delivery.event == "issue_comment"
+        assert delivery.body == b'{"action": "created"}'
+        assert delivery.delivery_id == "delivery-1"
+        assert delivery.attempts == 1
+        # Leased deliveries are not handed out twice
+        assert await queue.claim() is None
+    
+    @pytest.mark.asyncio
+    async def test_survives_restart(self, tmp_path):
+        """Test that deliveries persist across queue instances"""
+        path = str(tmp_path / "queue.db")
+        first = SQLiteWebhookQueue(path)
+        await first.put("push", b"{}", "delivery-1")
+        await first.close()
+        
+        second = SQLiteWebhookQueue(path)
+        
+        assert await second.depth() == 1
+        assert (await second.claim()).event == "push"
+    
+    @pytest.mark.asyncio
+    async def test_expired_lease_is_redelivered(self, tmp_path):
+        """Test that a crashed worker's delivery becomes due again"""
+        queue = SQLiteWebhookQueue(str(tmp_path / "queue.db"), lease_seconds=0)
+        await queue.put("push", b"{}")
+        
+        first = await queue.claim()
+        second = await queue.claim()
+        
+        assert second.id == first.id
+        assert second.attempts == 2
+    
+    @pytest.mark.asyncio
+    async def test_ack_and_dead_letter(self, queue):
+        """Test acknowledging and dead-lettering deliveries"""
+        await queue.put("push", b"{}", "ok")
+        await queue.put("push", b"{}", "bad")
+        
+        await queue.ack(await queue.claim())
+        await queue.dead_letter(await queue.claim(), "boom")
+        
+        assert await queue.depth() == 0
+        dead = await queue.list_dead_letters()
+        assert dead[0]['delivery_id'] == "bad"
+        assert dead[0]['error'] == "boom"
+    
+    @pytest.mark.asyncio
+    async def test_max_depth(self, tmp_path):
+        """Test backpressure when the queue is full"""
+        queue = SQLiteWebhookQueue(str(tmp_path / "queue.db"), max_depth=1)
+        await queue.put("push", b"{}")
+        
+        with pytest.raises(QueueFullError):
+            await queue.put("push", b"{}")
+
+
+class TestWebhookWorkerPool:
+    """Test retry and dead-letter handling"""
+    
+    @pytest.mark.asyncio
+    async def test_success_acks(self):
+        """Test that processed deliveries are removed"""
+        queue = MemoryWebhookQueue()
+        seen = []
+        
+        async def handler(event, body):
+            seen.append(event)
+        
+        pool = WebhookWorkerPool(queue, handler)
+        await queue.put("push", b"{}")
+        await pool.process(await queue.claim())
+        
+        assert seen == ["push"]
+        assert await queue.depth() == 0
+    
+    @pytest.mark.asyncio
+    async def test_retryable_failure_is_retried_then_dead_lettered(self):
+        """Test exponential backoff retries and the dead-letter fallback"""
+        queue = MemoryWebhookQueue()
+        
+        async def handler(event, body):
+            raise RuntimeError("GitHub is down")
+        
+        pool = WebhookWorkerPool(queue, handler, max_attempts=2, backoff_base=0)
+        await queue.put("push", b"{}", "delivery-1")
+        
+        await pool.process(await queue.claim())
+        assert await queue.depth() == 1
+        
+        await pool.process(await queue.claim())
+        assert await queue.depth() == 0
+        assert queue.dead_letters[0]['attempts'] == 2
+    
+    @pytest.mark.asyncio
+    async def test_non_retryable_failure_dead_letters_immediately(self):
+        """Test that permanent errors are not retried"""
+        queue = MemoryWebhookQueue()
+        
+        async def handler(event, body):
+            raise ValueError("bad payload")
+        
+        pool = WebhookWorkerPool(queue, handler, is_retryable=lambda exc: False)
+        await queue.put("push", b"{}")
+        await pool.process(await queue.claim())
+        
+        assert len(queue.dead_letters) == 1
+    
+    @pytest.mark.asyncio
+    async def test_worker_survives_settle_errors(self):
+        """Test that a failing ack does not stop the worker"""
+        queue = MemoryWebhookQueue()
+        seen = []
+        done = asyncio.Event()
+        ack = queue.ack
+        failures = [sqlite3.OperationalError("database is locked")]
+        
+        async def flaky_ack(delivery):
+            if failures:
+                raise failures.pop()
+            await ack(delivery)
+        
+        async def handler(event, body):
+            seen.append(body)
+            if len(seen) == 2:
+                done.set()
+        
+        queue.ack = flaky_ack
+        pool = WebhookWorkerPool(queue, handler, workers=1, poll_interval=0.01)
+        await queue.put("push", b"1")
+        await queue.put("push", b"2")
+        pool.start()
+        try:
+            await asyncio.wait_for(done.wait(), timeout=1)
+        finally:
+            await pool.stop()
+        
+        assert seen == [b"1", b"2"]
+    
+    @pytest.mark.asyncio
+    async def test_notify_during_claim_not_lost(self):
+        """Test that a delivery queued while a worker finds the queue empty is picked up at once"""
+        queue = MemoryWebhookQueue()
+        done = asyncio.Event()
+        
+        async def handler(event, body):
+            done.set()
+        
+        pool = WebhookWorkerPool(queue, handler, workers=1, poll_interval=30)
+        claim = queue.claim
+        
+        async def racing_claim():
+            delivery = await claim()
+            if delivery is None and not done.is_set():
+                await queue.put("push", b"{}")
+                pool.notify()
+            return delivery
+        
+        queue.claim = racing_claim
+        pool.start()
+        try:
+            await asyncio.wait_for(done.wait(), timeout=1)
+        finally:
+            await pool.stop()
+    
+    @pytest.mark.asyncio
+    async def test_handler_timeout_before_lease(self):
+        """Test that a handler outliving its timeout fails instead of outliving the lease"""
+        queue = MemoryWebhookQueue(lease_seconds=1)
+        
+        async def handler(event, body):
+            await asyncio.sleep(10)
+        
+        pool = WebhookWorkerPool(queue, handler, is_retryable=lambda exc: False)
+        assert pool.handler_timeout == 0.8
+        pool.handler_timeout = 0.01
+        await queue.put("push", b"{}")
+        await pool.process(await queue.claim())
+        
+        assert "timed out" in queue.dead_letters[0]['error']
+        with pytest.raises(ValueError):
+            WebhookWorkerPool(queue, handler, handler_timeout=1)
+    
+    def test_backoff_grows_exponentially(self):
+        """Test the backoff schedule"""
+        pool = WebhookWorkerPool(MemoryWebhookQueue(), None, backoff_base=1, backoff_max=10)
+        
+        assert 0.8 <= pool.backoff(1) <= 1.2
+        assert 3.2 <= pool.backoff(3) <= 4.8
+        assert pool.backoff(10) <= 12
@@ -0,0 +1,82 @@
+"""
+Tests for the /test workflow index
+"""
+import pytest
+from unittest.mock import AsyncMock
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from mercur_e.state import MemoryStateStore
+from mercur_e.workflows import WorkflowIndex, WorkflowIndexCache
+
+
+WORKFLOWS = [
+    {"id": 1, "name": "CI", "path": ".github/workflows/ci.yml"},
+    {"id": 2, "name": "Release", "path": ".github/workflows/release.yaml"},
+]
+
+
+class TestWorkflowIndex:
+    """Test workflow lookups"""
+    
+    def test_find_by_name_and_path_suffix(self):
+        index = WorkflowIndex(WORKFLOWS)
+        
+        assert index.find("CI")['id'] == 1
+        assert index.find("ci.yml")['id'] == 1
+        assert index.find("workflows/release.yaml")['id'] == 2
+        assert index.find(".github/workflows/release.yaml")['id'] == 2
+        assert index.find("missing.yml") is None
+
+
+class TestWorkflowIndexCache:
+    """Test per-repository caching and invalidation"""
+    
+    @pytest.fixture
+    def gh(self):
+        gh = AsyncMock()
+        gh.get_workflows.return_value = WORKFLOWS
+        return gh
+    
+    @pytest.mark.asyncio
+    async def test_index_built_once(self, gh):
+        """Test that repeated lookups make no API calls"""
+        cache = WorkflowIndexCache()
+        
+        await cache.get(gh, "o/r")
+        await cache.get(gh, "O/R")
+        
+        gh.get_workflows.assert_awaited_once_with("o/r")
+    
+    @pytest.mark.asyncio
+    async def test_push_touching_workflows_invalidates(self, gh):
+        """Test that a push changing .github/workflows/ drops the index"""
+        cache = WorkflowIndexCache()
+        await cache.get(gh, "o/r")
+        
+        assert await cache.handle_push("o/r", {"commits": [{"modified": ["src/app.py"]}]}) is False
+        await cache.get(gh, "o/r")
+        assert gh.get_workflows.await_count == 1
+        
+        push = {"commits": [{"added": [".github/workflows/new.yml"]}]}
+        assert await cache.handle_push("o/r", push) is True
+        await cache.get(gh, "o/r")
+        assert gh.get_workflows.await_count == 2
+    
+    @pytest.mark.asyncio
+    async def test_push_invalidates_other_workers(self, gh):
+        """Test that an invalidation in one worker reaches the others through the shared store"""
+        shared = MemoryStateStore()
+        receiving = WorkflowIndexCache(shared=shared)
+        other = WorkflowIndexCache(shared=shared)
+        await other.get(gh, "o/r")
+        await other.get(gh, "o/r")
+        assert gh.get_workflows.await_count == 1
+        
+        await receiving.handle_push("o/r", {"commits": [{"added": [".github/workflows/new.yml"]}]})
+        await other.get(gh, "o/r")
+        await other.get(gh, "o/r")
+        
+        assert gh.get_workflows.await_count == 2